@@ -0,0 +1,67 @@
+"""Comparison of two benchmark results
+
+Exits with status 1 if the p95 latency of any scenario in the new result
+is more than the tolerated fraction higher than in the baseline:
+
+    python -m benchmark.compare baseline.json result.json --tolerance 0.2
+"""
+import argparse
+import json
+import sys
+
+
+def load(
+        pathname):
+    with open(pathname) as file:
+        results = json.load(file)["results"]
+
+    return {(result["driver"], result["scenario"]): result
+        for result in results}
+
+
+def compare(
+        baseline,
+        result,
+        tolerance):
+    """Return lines describing the differences between *baseline* and
+    *result*, and whether any scenario regressed"""
+    lines = []
+    regressed = False
+
+    for key in sorted(set(baseline) & set(result)):
+        old = baseline[key]["p95"]
+        new = result[key]["p95"]
+
+        if not old or new is None:
+            continue
+
+        change = (new - old) / old
+        regression = change > tolerance
+        regressed = regressed or regression
+        lines.append("{:8} {:16} p95 {:9.2f} ms -> {:9.2f} ms ({:+.1%}){}"
+            .format(key[0], key[1], 1000 * old, 1000 * new, change,
+                "  REGRESSION" if regression else ""))
+
+    return lines, regressed
+
+
+def main(
+        argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare two benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("result")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+        help="tolerated increase of the p95 latency, as a fraction "
+            "(default: %(default)s)")
+    arguments = parser.parse_args(argv)
+
+    lines, regressed = compare(load(arguments.baseline),
+        load(arguments.result), arguments.tolerance)
+    print("\n".join(lines))
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
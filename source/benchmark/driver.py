@@ -0,0 +1,221 @@
+import configparser
+import http.client
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+def child_pids(
+        pid):
+    """Return the ids of the child processes of process *pid*"""
+    pathname = "/proc/{0}/task/{0}/children".format(pid)
+
+    try:
+        with open(pathname) as file:
+            return [int(child) for child in file.read().split()]
+    except OSError:
+        return []
+
+
+def peak_rss(
+        pids):
+    """Return the sum of the peak resident set sizes of processes *pids*,
+    in KiB, or None if not available"""
+    total = 0
+
+    for pid in pids:
+        try:
+            with open("/proc/{}/status".format(pid)) as file:
+                for line in file:
+                    if line.startswith("VmHWM:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            return None
+
+    return total
+
+
+def reset_peak_rss(
+        pids):
+    """Reset the peak resident set sizes of processes *pids*, if
+    supported"""
+    for pid in pids:
+        try:
+            with open("/proc/{}/clear_refs".format(pid), "w") as file:
+                file.write("5")
+        except OSError:
+            pass
+
+
+class ClientDriver:
+    """Driver sending requests through the Flask test client, in the
+    current process"""
+
+    name = "client"
+
+
+    def __init__(self,
+            app):
+        self.client = app.test_client()
+
+
+    def request(self,
+            method,
+            path,
+            body):
+        response = self.client.open(path, method=method, data=body,
+            content_type="application/json" if body is not None else None)
+
+        # Consume streamed responses.
+        response.get_data()
+
+        return response.status_code
+
+
+    def pids(self):
+        return [os.getpid()]
+
+
+class HttpDriver:
+    """Driver sending requests to an HTTP server, using a connection per
+    thread"""
+
+    name = "uwsgi"
+
+
+    def __init__(self,
+            host,
+            port,
+            pids):
+        self.host = host
+        self.port = port
+        self._pids = pids
+        self.local = threading.local()
+
+
+    def connection(self):
+        if not hasattr(self.local, "connection"):
+            self.local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=60)
+
+        return self.local.connection
+
+
+    def request(self,
+            method,
+            path,
+            body):
+        headers = {"Content-Type": "application/json"} \
+            if body is not None else {}
+        connection = self.connection()
+
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            # Start over with a new connection next time.
+            connection.close()
+            del self.local.connection
+            raise
+
+        return response.status
+
+
+    def pids(self):
+        return self._pids()
+
+
+class UwsgiServer:
+    """uWSGI serving the app, configured as in uwsgi.ini, listening on
+    *port* of the loopback interface"""
+
+    def __init__(self,
+            source_directory,
+            port,
+            environment):
+        self.source_directory = source_directory
+        self.port = port
+        self.environment = environment
+        self.process = None
+
+
+    @staticmethod
+    def available():
+        return shutil.which("uwsgi") is not None
+
+
+    def command(self):
+        parser = configparser.ConfigParser(strict=False,
+            interpolation=None)
+        parser.read(os.path.join(self.source_directory, "uwsgi.ini"))
+        command = ["uwsgi"]
+
+        for name, value in parser["uwsgi"].items():
+            if name != "http":
+                command += ["--{}".format(name), value]
+
+        return command + [
+            "--http", "127.0.0.1:{}".format(self.port),
+            "--die-on-term",
+            "--disable-logging",
+        ]
+
+
+    def start(self,
+            timeout=30):
+        self.process = subprocess.Popen(self.command(),
+            cwd=self.source_directory,
+            env=dict(os.environ, **self.environment),
+            stdout=subprocess.DEVNULL, stderr=sys.stderr)
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            try:
+                connection = http.client.HTTPConnection(
+                    "127.0.0.1", self.port, timeout=1)
+                connection.request("GET", "/ping")
+
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+
+            if self.process.poll() is not None:
+                raise RuntimeError("uWSGI exited with status {}".format(
+                    self.process.returncode))
+
+            time.sleep(0.1)
+
+        self.stop()
+        raise RuntimeError("uWSGI did not start within {} seconds".format(
+            timeout))
+
+
+    def pids(self):
+        """Return the ids of the master and worker processes"""
+        pids = [self.process.pid]
+
+        for pid in child_pids(self.process.pid):
+            pids.append(pid)
+            pids += child_pids(pid)
+
+        return pids
+
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+        self.process = None
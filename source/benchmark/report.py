@@ -0,0 +1,111 @@
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+
+
+def percentile(
+        sorted_values,
+        fraction):
+    """Return the *fraction* percentile of *sorted_values*, using the
+    nearest-rank method"""
+    if not sorted_values:
+        return None
+
+    rank = max(int(math.ceil(fraction * len(sorted_values))), 1)
+
+    return sorted_values[rank - 1]
+
+
+def summarize(
+        driver,
+        scenario,
+        latencies,
+        nr_errors,
+        duration,
+        peak_rss):
+    """Return the result of running *scenario* with *driver*
+
+    Latencies are in seconds, peak RSS in KiB.
+    """
+    latencies = sorted(latencies)
+
+    return {
+        "driver": driver,
+        "scenario": scenario,
+        "requests": len(latencies),
+        "errors": nr_errors,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "throughput": len(latencies) / duration if duration > 0 else None,
+        "peak_rss_kib": peak_rss,
+    }
+
+
+def git_revision(
+        directory):
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+            cwd=directory, stderr=subprocess.DEVNULL).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(
+        arguments,
+        directory):
+    return {
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "revision": git_revision(directory),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "arguments": arguments,
+    }
+
+
+def format_milliseconds(
+        seconds):
+    return "-" if seconds is None else "{:.2f}".format(1000 * seconds)
+
+
+def format_table(
+        results):
+    """Return the results as a text table"""
+    header = ("driver", "scenario", "requests", "errors", "p50 ms",
+        "p95 ms", "p99 ms", "req/s", "peak RSS MiB")
+    rows = [header]
+
+    for result in results:
+        rows.append((
+            result["driver"],
+            result["scenario"],
+            str(result["requests"]),
+            str(result["errors"]),
+            format_milliseconds(result["p50"]),
+            format_milliseconds(result["p95"]),
+            format_milliseconds(result["p99"]),
+            "-" if result["throughput"] is None else
+                "{:.1f}".format(result["throughput"]),
+            "-" if result["peak_rss_kib"] is None else
+                "{:.1f}".format(result["peak_rss_kib"] / 1024),
+        ))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths))
+        for row in rows)
+
+
+def write(
+        pathname,
+        meta,
+        results):
+    with open(pathname, "w") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=2)
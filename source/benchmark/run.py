@@ -0,0 +1,192 @@
+"""Benchmark of the plan REST endpoints
+
+Seeds a database with plans, sends requests of each scenario to the app,
+through the Flask test client and/or a local uWSGI server, and reports
+latency percentiles, throughput and peak RSS. Results are written as
+JSON, for comparison with benchmark.compare.
+
+Run from the source directory:
+
+    python -m benchmark.run --plans 100000 --output result.json
+"""
+import argparse
+import concurrent.futures
+import os
+import random
+import sys
+import tempfile
+import time
+from . import report
+from .driver import ClientDriver, HttpDriver, peak_rss, reset_peak_rss, \
+    UwsgiServer
+
+
+source_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_arguments(
+        argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the plan REST endpoints")
+    parser.add_argument("--plans", type=int, default=10000,
+        help="number of plans to seed (default: %(default)s)")
+    parser.add_argument("--users", type=int, default=100,
+        help="number of users owning the plans (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42,
+        help="seed of the random number generator (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=500,
+        help="number of requests per scenario (default: %(default)s)")
+    parser.add_argument("--warmup", type=int, default=10,
+        help="number of requests per scenario, before measuring "
+            "(default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=4,
+        help="number of concurrent clients of uWSGI (default: %(default)s)")
+    parser.add_argument("--drivers", default="client,uwsgi",
+        help="comma separated drivers: client, uwsgi (default: %(default)s)")
+    parser.add_argument("--scenarios", default=None,
+        help="comma separated scenarios (default: all)")
+    parser.add_argument("--database-uri", default="sqlite:///" +
+            os.path.join(tempfile.gettempdir(), "plan-benchmark.sqlite"),
+        help="database to seed (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=3131,
+        help="port of the uWSGI server (default: %(default)s)")
+    parser.add_argument("--output", default=None,
+        help="pathname of the JSON results")
+
+    return parser.parse_args(argv)
+
+
+def run_scenario(
+        driver,
+        scenario,
+        dataset,
+        arguments,
+        concurrency):
+    """Send the requests of *scenario* using *driver* and return a
+    summary of the results"""
+    from .scenario import make_request
+
+    def send(
+            rng,
+            nr_requests):
+        latencies = []
+        nr_errors = 0
+
+        for _ in range(nr_requests):
+            request = make_request(scenario, rng, dataset)
+            start = time.perf_counter()
+
+            try:
+                status = driver.request(*request)
+            except Exception:
+                status = None
+
+            latencies.append(time.perf_counter() - start)
+
+            if status is None or status >= 400:
+                nr_errors += 1
+
+        return latencies, nr_errors
+
+
+    send(random.Random(arguments.seed), arguments.warmup)
+    reset_peak_rss(driver.pids())
+
+    # Each client sends its share of the requests, using its own random
+    # number generator.
+    shares = [arguments.requests // concurrency +
+            (1 if i < arguments.requests % concurrency else 0)
+        for i in range(concurrency)]
+    start = time.perf_counter()
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(send,
+                random.Random("{}-{}".format(arguments.seed, i)), share)
+            for i, share in enumerate(shares)]
+        outcomes = [future.result() for future in futures]
+
+    duration = time.perf_counter() - start
+
+    return report.summarize(driver.name, scenario.__name__,
+        [latency for latencies, _ in outcomes for latency in latencies],
+        sum(nr_errors for _, nr_errors in outcomes),
+        duration, peak_rss(driver.pids()))
+
+
+def main(
+        argv=None):
+    arguments = parse_arguments(argv)
+
+    # The configuration is read from the environment when nc_plan is
+    # imported.
+    environment = {
+        "NC_CONFIGURATION": "production",
+        "NC_PLAN_DATABASE_URI": arguments.database_uri,
+        "NC_PLAN_METRICS_DIRECTORY": os.path.join(tempfile.gettempdir(),
+            "nc_plan-benchmark-metrics"),
+    }
+    os.environ.update(environment)
+
+    from nc_plan import create_app, db
+    from nc_plan.bootstrap import bootstrap
+    from .scenario import scenarios
+    from .seed import seed
+
+    drivers = arguments.drivers.split(",")
+    names = arguments.scenarios.split(",") if arguments.scenarios \
+        else list(scenarios)
+
+    for name in names:
+        if name not in scenarios:
+            sys.exit("Invalid scenario: {}".format(name))
+
+    app = create_app("production")
+    results = []
+
+    for driver_name in drivers:
+        bootstrap(app)
+
+        with app.app_context():
+            print("Seeding {} plans of {} users".format(
+                arguments.plans, arguments.users), file=sys.stderr)
+            dataset = seed(arguments.plans, arguments.users, arguments.seed)
+            db.session.remove()
+
+        if driver_name == "client":
+            with app.app_context():
+                driver = ClientDriver(app)
+
+                for name in names:
+                    results.append(run_scenario(driver, scenarios[name],
+                        dataset, arguments, 1))
+                    print(report.format_table(results[-1:]), file=sys.stderr)
+        elif driver_name == "uwsgi":
+            if not UwsgiServer.available():
+                print("uWSGI is not installed: skipping", file=sys.stderr)
+                continue
+
+            server = UwsgiServer(source_directory, arguments.port,
+                environment)
+            server.start()
+
+            try:
+                driver = HttpDriver("127.0.0.1", arguments.port, server.pids)
+
+                for name in names:
+                    results.append(run_scenario(driver, scenarios[name],
+                        dataset, arguments, arguments.concurrency))
+                    print(report.format_table(results[-1:]), file=sys.stderr)
+            finally:
+                server.stop()
+        else:
+            sys.exit("Invalid driver: {}".format(driver_name))
+
+    print(report.format_table(results))
+
+    if arguments.output is not None:
+        report.write(arguments.output,
+            report.metadata(vars(arguments), source_directory), results)
+
+
+if __name__ == "__main__":
+    main()
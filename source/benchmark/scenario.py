@@ -0,0 +1,160 @@
+import json
+from nc_plan.api.model import statuses
+from .seed import random_uuid
+
+
+# Number of plans per bulk request.
+bulk_size = 100
+
+
+def plan_payload(
+        rng,
+        user):
+    return {
+        "user": str(user),
+        "pathname": "/data/plans/{}.png".format(random_uuid(rng).hex),
+        "status": "uploaded",
+    }
+
+
+def list_all_page(
+        rng,
+        dataset):
+    return "GET", "/plans?limit=100", None
+
+
+def list_all_stream(
+        rng,
+        dataset):
+    return "GET", "/plans?stream=true&status=uploaded", None
+
+
+def list_user(
+        rng,
+        dataset):
+    # The user with most plans.
+    return "GET", "/plans/{}".format(dataset.users[0]), None
+
+
+def list_user_page(
+        rng,
+        dataset):
+    user = rng.choice(dataset.users)
+
+    return "GET", "/plans/{}?limit=100&status=registered".format(user), None
+
+
+def get(
+        rng,
+        dataset):
+    user, id = rng.choice(dataset.sample)
+
+    return "GET", "/plans/{}/{}".format(user, id), None
+
+
+def statistics(
+        rng,
+        dataset):
+    return "GET", "/plans/stats", None
+
+
+def changes(
+        rng,
+        dataset):
+    return "GET", "/plans/changes?user={}".format(dataset.users[0]), None
+
+
+def patch(
+        rng,
+        dataset):
+    user, id = rng.choice(dataset.sample)
+
+    return "PATCH", "/plans/{}/{}".format(user, id), {
+        "layer_name": "layer_{}".format(rng.randrange(1000000)),
+    }
+
+
+def patch_user(
+        rng,
+        dataset):
+    user = rng.choice(dataset.users[len(dataset.users) // 2:])
+
+    return "PATCH", "/plans/{}?status=registered".format(user), {
+        "status": "georeferenced",
+    }
+
+
+def patch_bulk(
+        rng,
+        dataset):
+    plans = rng.sample(dataset.sample, min(bulk_size, len(dataset.sample)))
+
+    return "PATCH", "/plans", {
+        "plans": [{
+                "id": str(id),
+                "user": str(user),
+                "status": rng.choice(statuses),
+            } for user, id in plans]
+    }
+
+
+def post(
+        rng,
+        dataset):
+    return "POST", "/plans", {
+        "plan": plan_payload(rng, rng.choice(dataset.users)),
+    }
+
+
+def post_bulk(
+        rng,
+        dataset):
+    return "POST", "/plans", {
+        "plans": [plan_payload(rng, rng.choice(dataset.users))
+            for _ in range(bulk_size)],
+    }
+
+
+def claim(
+        rng,
+        dataset):
+    return "POST", "/plans/claim", {
+        "claim": {
+            "status": "uploaded",
+            "owner": "benchmark",
+            "limit": 10,
+            "duration": 1,
+        },
+    }
+
+
+# Scenarios, by name. Reads come first, so they run against the seeded
+# plans, before they are changed by writes.
+scenarios = {
+    function.__name__: function for function in [
+        list_all_page,
+        list_all_stream,
+        list_user,
+        list_user_page,
+        get,
+        statistics,
+        changes,
+        patch,
+        patch_user,
+        patch_bulk,
+        post,
+        post_bulk,
+        claim,
+    ]
+}
+
+
+def make_request(
+        scenario,
+        rng,
+        dataset):
+    """Return the method, path and JSON body (or None) of a request of
+    *scenario*"""
+    method, path, body = scenario(rng, dataset)
+
+    return method, path, json.dumps(body) if body is not None else None
@@ -0,0 +1,89 @@
+import datetime
+import random
+import uuid
+from nc_plan import db
+from nc_plan.api.model import change_table, plan_table, statuses
+
+
+# Share of the plans in each status. Most plans have been processed.
+status_weights = (0.1, 0.2, 0.3, 0.4)
+
+# Number of plans inserted per statement.
+batch_size = 10000
+
+
+def random_uuid(
+        rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+class Dataset:
+    """Plans seeded in the database
+
+    Users are ordered by the number of plans they own, most first.
+    *sample* contains (user, id) tuples of a random sample of the plans.
+    """
+
+    def __init__(self,
+            users,
+            sample):
+        self.users = users
+        self.sample = sample
+
+
+def seed(
+        nr_plans,
+        nr_users,
+        random_seed,
+        sample_size=1000):
+    """Fill the plan table with *nr_plans* plans of *nr_users* users
+
+    The number of plans per user is skewed: the plans of the user ranked
+    i-th are drawn with weight 1 / i. Statuses are skewed as well. The
+    same seed results in the same plans.
+    """
+    rng = random.Random(random_seed)
+    users = [random_uuid(rng) for _ in range(nr_users)]
+    user_weights = [1.0 / (i + 1) for i in range(nr_users)]
+    stamp = datetime.datetime(2020, 1, 1)
+    sample = []
+
+    db.session.execute(change_table.delete())
+    db.session.execute(plan_table.delete())
+
+    for offset in range(0, nr_plans, batch_size):
+        count = min(batch_size, nr_plans - offset)
+        plan_users = rng.choices(users, weights=user_weights, k=count)
+        plan_statuses = rng.choices(statuses, weights=status_weights, k=count)
+        plans = []
+
+        for i in range(count):
+            id = random_uuid(rng)
+            create_stamp = stamp + datetime.timedelta(seconds=offset + i)
+            plans.append({
+                "id": id,
+                "user": plan_users[i],
+                "pathname": "/data/plans/{}.png".format(id.hex),
+                "layer_name": "layer_{}".format(offset + i),
+                "status": plan_statuses[i],
+                "create_stamp": create_stamp,
+                "edit_stamp": create_stamp,
+            })
+
+        db.session.execute(plan_table.insert(), plans)
+
+        # Reservoir sample of the plans.
+        for i, plan in enumerate(plans):
+            position = offset + i
+
+            if len(sample) < sample_size:
+                sample.append((plan["user"], plan["id"]))
+            else:
+                j = rng.randrange(position + 1)
+
+                if j < sample_size:
+                    sample[j] = (plan["user"], plan["id"])
+
+    db.session.commit()
+
+    return Dataset(users, sample)
@@ -5,10 +5,16 @@ set -e
 
 echo "Starting service in $NC_CONFIGURATION mode"
 
+# Create the database schema, or bring it up to date, once, before the
+# service is started.
+FLASK_APP=server.py flask bootstrap
+
 if [[ "$NC_CONFIGURATION" == @("development"|"test") ]]; then
     python -m unittest discover /test *_test.py
     exec python server_flask.py
 else
     # Acceptance, production
+    # Metrics of previous runs, see uwsgi.ini
+    rm -rf /tmp/nc_plan-metrics
     exec uwsgi uwsgi.ini
 fi
@@ -1,20 +1,33 @@
-from flask import Flask, jsonify
+import os
+from flask import Flask
 from flask_marshmallow import Marshmallow
-from flask_sqlalchemy import SQLAlchemy
+from .bootstrap import bootstrap_command, convert_ids_command, \
+    init_migrations
+from .caching import Cache
+from .compression import Compression
 from .configuration import configuration
+from .engine import configure_engine
+from .group_commit import GroupCommit
+from .json_provider import JSONProvider
+from .metrics import Metrics
+from .replica import replicas, SQLAlchemy
 
 
 def app_errorhandler(
         exception):
-    response = jsonify({
+    return json_provider.response({
             "status_code": exception.code,
             "message": exception.description,
-        })
-    return response, exception.code
+        }, exception.code)
 
 
 db = SQLAlchemy()
 ma = Marshmallow()
+cache = Cache()
+compression = Compression()
+group_commit = GroupCommit()
+json_provider = JSONProvider()
+metrics = Metrics()
 
 
 def create_app(
@@ -23,6 +36,7 @@ def create_app(
     configuration_ = configuration[configuration_name]
     app.config.from_object(configuration_)
     configuration_.init_app(app)
+    app.logger.setLevel(app.config["LOG_LEVEL"])
 
 
     @app.errorhandler(400)
@@ -51,20 +65,34 @@ def create_app(
 
 
     # Order matters.
+    metrics.init_app(app)
     db.init_app(app)
     ma.init_app(app)
 
+    # The database schema is not created here. It is created and kept up
+    # to date by running the migrations (flask bootstrap), once, before
+    # the service is started. Flask-Migrate is only registered when
+    # running commands (flask db ...).
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        init_migrations(app)
+
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(convert_ids_command)
+    json_provider.init_app(app)
+    cache.init_app(app)
+    group_commit.init_app(app)
+
+    with app.app_context():
+        # Creating the engine does not connect to the database.
+        configure_engine(app, db.engine)
+
+    replicas.init_app(app)
+    compression.init_app(app)
+
 
     # Attach routes and custom error pages.
     from .api import api_blueprint
     app.register_blueprint(api_blueprint)
 
 
-    with app.app_context():
-        # http://stackoverflow.com/questions/19437883/when-scattering-flask-models-runtimeerror-application-not-registered-on-db-w
-        # Extensions like Flask-SQLAlchemy now know what the "current" app
-        # is while within this block.
-        db.create_all()
-
-
     return app
@@ -1,9 +1,23 @@
 from flask import Blueprint
 from flask_restful import Api
+from ..profiling import profiled
 
 
 api_blueprint = Blueprint("api", __name__)
-api_restful = Api(api_blueprint)
+api_restful = Api(api_blueprint, decorators=[profiled])
 
 
-from . import ping, plan
+from .representation import representations
+api_restful.representations.update(representations)
+
+
+@api_blueprint.after_request
+def vary_on_accept(
+        response):
+    # Representations depend on the Accept header.
+    response.vary.add("Accept")
+
+    return response
+
+
+from . import cache, metrics, ping, plan
@@ -0,0 +1,7 @@
+from .. import cache, json_provider
+from . import api_blueprint
+
+
+@api_blueprint.route("/cache")
+def cache_statistics():
+    return json_provider.response(cache.statistics())
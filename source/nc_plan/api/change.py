@@ -0,0 +1,313 @@
+import math
+import threading
+import time
+import uuid
+from flask import current_app, request, Response, stream_with_context
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
+from .. import db, json_provider
+from .model import change_table, plan_table, statuses
+from .query import and_condition
+from .serializer import id_placeholder, url_template, user_placeholder
+from .update import in_clause_size
+
+
+# Key of the PostgreSQL advisory lock serializing the recording of changes.
+change_lock_key = 0x706c616e
+
+
+def record_changes(
+        ids):
+    """Record the current state of plans *ids* in the change feed
+
+    Call this after writing the plans, in the same transaction. The
+    changes are copied from the plans using set-based statements.
+
+    Changes are numbered when they are recorded, but become visible when
+    the transaction commits. On PostgreSQL, transactions may commit in
+    another order than in which they drew their numbers, and a reader
+    could skip changes. Recording changes is therefore serialized, from
+    the moment the changes are recorded until the transaction ends.
+    SQLite serializes all writes already.
+    """
+    ids = list(ids)
+
+    if not ids:
+        return
+
+    if db.session.connection().dialect.name == "postgresql":
+        db.session.execute(
+            db.select([db.func.pg_advisory_xact_lock(change_lock_key)]))
+
+    for i in range(0, len(ids), in_clause_size):
+        db.session.execute(change_table.insert().from_select(
+            ["plan_id", "user", "status", "edit_stamp"],
+            db.select([
+                    plan_table.c.id, plan_table.c.user, plan_table.c.status,
+                    plan_table.c.edit_stamp])
+                .where(plan_table.c.id.in_(ids[i:i + in_clause_size]))))
+
+
+def requested_cursor():
+    """Return the number of the last change the client has seen
+
+    Clients pass it in the query string (since) or, when reconnecting to
+    an event stream, in the Last-Event-ID header. Without a cursor, all
+    changes are returned.
+    """
+    cursor = request.headers.get("Last-Event-ID") or \
+        request.args.get("since", "0")
+
+    try:
+        cursor = int(cursor)
+    except ValueError:
+        raise BadRequest("Invalid cursor")
+
+    if cursor < 0:
+        raise BadRequest("Invalid cursor")
+
+    return cursor
+
+
+def requested_wait():
+    """Return the number of seconds to wait for changes, as requested in
+    the query string"""
+    wait = request.args.get("wait", "0")
+
+    try:
+        wait = float(wait)
+    except ValueError:
+        raise BadRequest("Wait must be a number")
+
+    if not math.isfinite(wait):
+        raise BadRequest("Wait must be finite")
+
+    if wait < 0:
+        raise BadRequest("Wait must not be negative")
+
+    return min(wait, current_app.config["PLAN_CHANGE_WAIT_MAX"])
+
+
+def requested_change_condition():
+    """Return the condition selecting the changes requested in the query
+    string, or None if all changes are requested
+
+    Supported filters:
+
+    - user: user id
+    - status: comma separated list of statuses
+    """
+    condition = None
+    user = request.args.get("user")
+    status = request.args.get("status")
+
+    if user is not None:
+        try:
+            user = uuid.UUID(user)
+        except ValueError:
+            raise BadRequest("Invalid user")
+
+        condition = and_condition(condition, change_table.c.user == user)
+
+    if status is not None:
+        status = status.split(",")
+
+        for name in status:
+            if name not in statuses:
+                raise BadRequest("Invalid status: {}".format(name))
+
+        condition = and_condition(condition,
+            change_table.c.status.in_(status))
+
+    return condition
+
+
+def event_stream_requested():
+    """Return whether the client accepts Server-Sent Events rather than
+    JSON"""
+    return request.accept_mimetypes.best_match(
+        ["application/json", "text/event-stream"]) == "text/event-stream"
+
+
+def select_changes(
+        cursor,
+        condition=None):
+    """Return a batch of the changes satisfying *condition*, recorded
+    after change *cursor*, in order"""
+    condition = and_condition(condition, change_table.c.id > cursor)
+
+    return db.session.execute(db.select([change_table])
+        .where(condition)
+        .order_by(change_table.c.id)
+        .limit(current_app.config["PLAN_CHANGE_BATCH_SIZE"])).fetchall()
+
+
+class TooManyWaiters(ServiceUnavailable):
+    """Exception raised when too many requests wait for changes"""
+
+    description = "Too many clients waiting for changes"
+
+
+    def __init__(self,
+            retry_after):
+        super().__init__()
+        self.retry_after = retry_after
+
+
+    def get_headers(self,
+            environ=None):
+        return super().get_headers(environ) + \
+            [("Retry-After", str(self.retry_after))]
+
+
+def acquire_waiter_slot():
+    """Reserve one of the PLAN_CHANGE_WAITERS_MAX slots of the current
+    process for a request waiting for changes, and return a function
+    releasing it
+
+    Waiting requests occupy a worker thread each. When no slot is
+    available, TooManyWaiters is raised, so threads remain available for
+    other requests.
+    """
+    config = current_app.config
+    slots = current_app.extensions.setdefault("plan_change_waiters",
+        threading.BoundedSemaphore(config["PLAN_CHANGE_WAITERS_MAX"]))
+
+    if not slots.acquire(blocking=False):
+        raise TooManyWaiters(config["PLAN_CHANGE_RETRY_AFTER"])
+
+    return slots.release
+
+
+def release_connection():
+    # Do not keep a connection, or a transaction, while waiting.
+    db.session.rollback()
+
+
+def wait_for_changes(
+        cursor,
+        condition,
+        timeout):
+    """Return the changes satisfying *condition*, recorded after change
+    *cursor*
+
+    If there are none, wait up to *timeout* seconds for them. Changes
+    can be recorded by any worker process, so the database is polled.
+    Waiting requires a waiter slot (see acquire_waiter_slot).
+    """
+    deadline = time.monotonic() + timeout
+    interval = current_app.config["PLAN_CHANGE_POLL_INTERVAL"]
+    changes = select_changes(cursor, condition)
+
+    if changes or time.monotonic() + interval > deadline:
+        return changes
+
+    release_waiter_slot = acquire_waiter_slot()
+
+    try:
+        while True:
+            release_connection()
+            time.sleep(interval)
+            changes = select_changes(cursor, condition)
+
+            if changes or time.monotonic() + interval > deadline:
+                return changes
+    finally:
+        release_waiter_slot()
+
+
+class ChangeSerializer:
+    """Serializer of changes of plans
+
+    Create a serializer per request, inside the request context.
+    """
+
+    def __init__(self):
+        self.plan_template = url_template("api.plan",
+            user_id=user_placeholder, plan_id=id_placeholder)
+
+
+    def serialize(self,
+            change):
+        user = str(change.user)
+
+        return {
+            "id": change.id,
+            "user": user,
+            "status": change.status,
+            "edit_stamp": change.edit_stamp.isoformat(),
+            "_links": {
+                "plan": self.plan_template.format(user=user,
+                    id=change.plan_id),
+            },
+        }
+
+
+    def dump_many(self,
+            changes,
+            cursor):
+        """Return the representation of a batch of changes, including
+        the cursor to pass in to get the next batch"""
+        if changes:
+            cursor = changes[-1].id
+
+        return {
+            "changes": [self.serialize(change) for change in changes],
+            "cursor": cursor,
+        }
+
+
+def stream_changes(
+        cursor,
+        condition):
+    """Return a response streaming the changes satisfying *condition*,
+    recorded after change *cursor*, as Server-Sent Events
+
+    The stream ends after PLAN_CHANGE_STREAM_DURATION seconds, so
+    workers are not occupied forever. Clients reconnect, passing the id
+    of the last event received in the Last-Event-ID header. Streaming
+    requires a waiter slot (see acquire_waiter_slot), which is released
+    when the response is closed.
+    """
+    config = current_app.config
+    serializer = ChangeSerializer()
+    release_waiter_slot = acquire_waiter_slot()
+
+
+    def generate(
+            cursor):
+        end = time.monotonic() + config["PLAN_CHANGE_STREAM_DURATION"]
+        heartbeat = time.monotonic() + config["PLAN_CHANGE_HEARTBEAT_INTERVAL"]
+
+        yield "retry: {}\n\n".format(
+            int(1000 * config["PLAN_CHANGE_POLL_INTERVAL"]))
+
+        while time.monotonic() < end:
+            changes = select_changes(cursor, condition)
+
+            if changes:
+                cursor = changes[-1].id
+                yield "".join(
+                    "id: {}\nevent: change\ndata: {}\n\n".format(change.id,
+                        json_provider.dumps(serializer.serialize(change)))
+                    for change in changes)
+                heartbeat = time.monotonic() + \
+                    config["PLAN_CHANGE_HEARTBEAT_INTERVAL"]
+                continue
+
+            if time.monotonic() >= heartbeat:
+                # Comment, keeping proxies from closing an idle
+                # connection.
+                yield ": heartbeat\n\n"
+                heartbeat = time.monotonic() + \
+                    config["PLAN_CHANGE_HEARTBEAT_INTERVAL"]
+
+            release_connection()
+            time.sleep(config["PLAN_CHANGE_POLL_INTERVAL"])
+
+
+    response = Response(stream_with_context(generate(cursor)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(release_waiter_slot)
+
+    return response
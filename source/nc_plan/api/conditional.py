@@ -0,0 +1,161 @@
+import hashlib
+from flask import request, Response
+from werkzeug.http import http_date, quote_etag
+from .. import db
+from ..compression import decoded_etag
+from .model import PlanModel
+from .representation import etag_suffixes, negotiated_mediatype
+
+
+def plan_etag(
+        id,
+        edit_stamp):
+    """Return the strong entity tag of the representation of a plan
+
+    The representation of a plan changes whenever it is edited, which is
+    recorded in its edit stamp.
+    """
+    key = "{}|{}".format(id.hex,
+        edit_stamp.isoformat() if edit_stamp is not None else "")
+
+    return hashlib.sha1(key.encode("ascii")).hexdigest()
+
+
+def collection_etag(
+        plans,
+        links):
+    """Return the strong entity tag of the representation of a collection
+    of plans, or of a page of it
+
+    *plans* are the rows in the representation, containing at least the
+    id and edit stamp of each plan. Each edit bumps the edit stamp of a
+    plan, so the representation changes whenever the plans in it, their
+    edit stamps, or the links change. Query arguments select different
+    representations of the same collection. The tag is computed from the
+    rows selected anyway, so validating a page costs as much as selecting
+    it, independent of the size of the collection.
+    """
+    hash = hashlib.sha1(request.query_string)
+
+    for plan in plans:
+        hash.update("|{}|{}".format(plan.id.hex,
+            plan.edit_stamp.isoformat() if plan.edit_stamp is not None
+                else "").encode("ascii"))
+
+    if links is not None:
+        for name in sorted(links):
+            hash.update("|{}={}".format(name, links[name]).encode("utf8"))
+
+    return hash.hexdigest()
+
+
+def representation_etag(
+        etag):
+    """Return the entity tag of the representation tagged *etag*, in the
+    media type negotiated
+
+    Each media type is a different representation, with its own strong
+    tag. Tags of JSON representations are passed as is.
+    """
+    return etag + etag_suffixes.get(negotiated_mediatype(), "")
+
+
+def matching_etag(
+        etags,
+        etag):
+    """Return the tag in *etags* of the representation tagged *etag*,
+    compressed or not, or None"""
+    if etags.star_tag:
+        return etag
+
+    for tag in etags:
+        if decoded_etag(tag) == etag:
+            return tag
+
+    return None
+
+
+def is_current(
+        etag):
+    """Return whether If-Match holds the entity tag of a representation
+    of the current state of a resource, tagged *etag*, in any media
+    type or content coding"""
+    tags = [etag] + [etag + suffix for suffix in etag_suffixes.values()]
+
+    return any(matching_etag(request.if_match, tag) is not None
+        for tag in tags)
+
+
+def select_edit_stamp(
+        user,
+        id):
+    """Return the edit stamp of plan *id* of *user*, or None if the plan
+    does not exist"""
+    return db.session.query(PlanModel.edit_stamp) \
+        .filter_by(id=id, user=user) \
+        .scalar()
+
+
+def is_conditional():
+    """Return whether the request is a conditional GET"""
+    return bool(request.if_none_match) or \
+        request.if_modified_since is not None
+
+
+def is_not_modified(
+        etag,
+        last_modified):
+    """Return whether the representation the client has is current
+
+    As required by RFC 7232, If-Modified-Since is ignored when
+    If-None-Match is passed.
+    """
+    if request.if_none_match:
+        return matching_etag(request.if_none_match,
+            representation_etag(etag)) is not None
+
+    if request.if_modified_since is not None and last_modified is not None:
+        # HTTP dates have a resolution of a second.
+        return last_modified.replace(microsecond=0) <= \
+            request.if_modified_since.replace(tzinfo=None)
+
+    return False
+
+
+def validators(
+        etag,
+        last_modified):
+    """Return the headers to pass the validators of a representation"""
+    headers = {
+        "ETag": quote_etag(representation_etag(etag))
+    }
+
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    return headers
+
+
+def not_modified(
+        etag,
+        last_modified):
+    """Return a 304 response"""
+    headers = validators(etag, last_modified)
+
+    if request.if_none_match:
+        # Pass the tag the client has.
+        headers["ETag"] = quote_etag(matching_etag(request.if_none_match,
+            representation_etag(etag)))
+
+    return Response(status=304, headers=headers)
+
+
+def respond(
+        data,
+        etag,
+        last_modified):
+    """Return the response to a GET, given the representation requested"""
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    return data, 200, validators(etag, last_modified)
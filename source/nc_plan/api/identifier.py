@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+import uuid
+import sqlalchemy
+from flask import current_app
+from sqlalchemy_utils import UUIDType
+from .model import change_table, plan_table
+
+
+class TimeOrderedUUIDs:
+    """Generator of time-ordered UUIDs (version 7, RFC 9562)
+
+    The first 48 bits hold the Unix time in milliseconds, followed by a
+    12 bit counter and 62 random bits. The counter starts at a random
+    value each millisecond and is incremented for each UUID generated
+    within it, so UUIDs generated by a process sort in the order in which
+    they were generated. When the counter overflows, or the clock goes
+    back, the time is advanced by a millisecond.
+
+    Stored as 16 bytes, or as a native uuid, these ids sort by time, and
+    new plans are appended to the primary key index.
+    """
+
+    counter_max = 0xfff
+
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timestamp = 0
+        self.counter = 0
+
+
+    def __call__(self):
+        with self.lock:
+            timestamp = time.time_ns() // 1000000
+
+            if timestamp > self.timestamp:
+                # Leave half of the counter values for the UUIDs generated
+                # within this millisecond.
+                self.timestamp = timestamp
+                self.counter = int.from_bytes(os.urandom(2), "big") >> 5
+            elif self.counter < self.counter_max:
+                self.counter += 1
+            else:
+                self.timestamp += 1
+                self.counter = 0
+
+            timestamp, counter = self.timestamp, self.counter
+
+        random = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+
+        return uuid.UUID(int=
+            (timestamp << 80) |
+            (0x7 << 76) |
+            (counter << 64) |
+            (0b10 << 62) |
+            random)
+
+
+uuid7 = TimeOrderedUUIDs()
+
+
+# Generators of plan ids, by name, see PLAN_ID_TYPE
+generators = {
+    "uuid4": uuid.uuid4,
+    "uuid7": uuid7,
+}
+
+
+def new_plan_id():
+    """Return an id for a new plan, generated as configured in
+    PLAN_ID_TYPE"""
+    return generators[current_app.config["PLAN_ID_TYPE"]]()
+
+
+def convert_text_ids(
+        engine,
+        batch_size=1000):
+    """Convert UUIDs stored as text, in the plan tables of the database
+    of *engine*, to 16 byte binary values
+
+    UUIDs are stored as 16 bytes, or as native uuids. Databases created
+    by older versions may contain hexadecimal strings. Only SQLite, which
+    does not enforce column types, can contain them. Each batch of
+    *batch_size* values is converted in its own transaction. Returns a
+    dict mapping the names of the columns to the number of values
+    converted.
+    """
+    counts = {}
+
+    if engine.dialect.name != "sqlite":
+        return counts
+
+    rowid = sqlalchemy.literal_column("rowid")
+
+    for table in [plan_table, change_table]:
+        for column in table.columns:
+            if not isinstance(column.type, UUIDType):
+                continue
+
+            select = sqlalchemy.select([
+                    rowid, sqlalchemy.type_coerce(column, sqlalchemy.Unicode)
+                ]) \
+                .where(sqlalchemy.func.typeof(column) == "text") \
+                .limit(batch_size)
+            update = table.update() \
+                .where(rowid == sqlalchemy.bindparam("rowid_")) \
+                .values({column.name:
+                    sqlalchemy.bindparam("value_", type_=column.type)})
+            count = 0
+
+            while True:
+                with engine.begin() as connection:
+                    rows = connection.execute(select).fetchall()
+
+                    if not rows:
+                        break
+
+                    connection.execute(update, [{
+                            "rowid_": row[0],
+                            "value_": uuid.UUID(row[1]),
+                        } for row in rows])
+
+                count += len(rows)
+
+            counts["{}.{}".format(table.name, column.name)] = count
+
+    return counts
@@ -0,0 +1,9 @@
+from flask import Response
+from .. import metrics
+from . import api_blueprint
+
+
+@api_blueprint.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(),
+        mimetype="text/plain; version=0.0.4")
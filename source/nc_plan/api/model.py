@@ -16,6 +16,26 @@ statuses = [
 
 class PlanModel(db.Model):
 
+    # Any change to the table must be accompanied by a migration in
+    # nc_plan/migrations/versions.
+    __table_args__ = (
+        # Plans by user, in paging order.
+        db.Index("ix_plan_model_user_create_stamp",
+            "user", "create_stamp", "id"),
+
+        # Plans by user and status.
+        db.Index("ix_plan_model_user_status",
+            "user", "status"),
+
+        # Plans by status, in order of last edit.
+        db.Index("ix_plan_model_status_edit_stamp",
+            "status", "edit_stamp"),
+
+        # All plans, in paging order.
+        db.Index("ix_plan_model_create_stamp",
+            "create_stamp", "id"),
+    )
+
     id = db.Column(UUIDType(), primary_key=True)
     user = db.Column(UUIDType())
     pathname = db.Column(db.UnicodeText)
@@ -23,3 +43,38 @@ class PlanModel(db.Model):
     status = db.Column(db.Unicode(20))
     create_stamp = db.Column(db.DateTime)
     edit_stamp = db.Column(db.DateTime)
+
+    # Lease on a plan claimed by a worker, see update.claim_plans.
+    lease_owner = db.Column(db.Unicode(255))
+    lease_expiry = db.Column(db.DateTime)
+    lease_token = db.Column(UUIDType())
+
+
+class PlanChangeModel(db.Model):
+    """Change of a plan, as recorded in the change feed
+
+    Changes are numbered in the order in which they are committed.
+    """
+
+    __tablename__ = "plan_change"
+
+    # Any change to the table must be accompanied by a migration in
+    # nc_plan/migrations/versions.
+    __table_args__ = (
+        # Changes of the plans of a user, in order.
+        db.Index("ix_plan_change_user_id",
+            "user", "id"),
+
+        # Never reuse numbers of changes, also not on SQLite.
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(UUIDType())
+    user = db.Column(UUIDType())
+    status = db.Column(db.Unicode(20))
+    edit_stamp = db.Column(db.DateTime)
+
+
+plan_table = PlanModel.__table__
+change_table = PlanChangeModel.__table__
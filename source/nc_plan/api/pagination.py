@@ -0,0 +1,161 @@
+import base64
+import binascii
+import datetime
+import uuid
+from flask import current_app, request, url_for
+from werkzeug.exceptions import BadRequest
+from .. import db
+from .model import plan_table
+from .query import and_condition, select_plans
+
+
+def encode_cursor(
+        plan):
+    """Return an opaque cursor pointing just past *plan*"""
+    key = "{}|{}".format(plan.create_stamp.isoformat(), plan.id.hex)
+
+    return base64.urlsafe_b64encode(key.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(
+        cursor):
+    """Return the (create_stamp, id) key stored in *cursor*"""
+    try:
+        key = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii")
+        create_stamp, id = key.split("|")
+        create_stamp = datetime.datetime.fromisoformat(create_stamp)
+        id = uuid.UUID(hex=id)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise BadRequest("Invalid cursor")
+
+    return create_stamp, id
+
+
+def page_limit():
+    """Return the page size requested, or None if no paging is requested"""
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+
+    if limit is None and cursor is None:
+        return None
+
+    if limit is None:
+        return current_app.config["PLAN_PAGE_LIMIT_DEFAULT"]
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise BadRequest("Limit must be an integer")
+
+    if limit < 1:
+        raise BadRequest("Limit must be positive")
+
+    return min(limit, current_app.config["PLAN_PAGE_LIMIT_MAX"])
+
+
+def paginate(
+        column_names,
+        condition,
+        endpoint,
+        **values):
+    """Return a page of plans satisfying *condition*, as rows containing
+    columns *column_names*, and the links to add to the envelope
+
+    Rows also contain the id, create stamp and edit stamp of the plans,
+    needed for the cursors and validators.
+
+    Pages are ordered on (create_stamp, id). The position of a page is
+    passed as an opaque cursor, which makes fetching a page equally
+    expensive, independent of its position. When the request does not
+    ask for a page, all plans are returned and no links are added.
+    """
+    limit = page_limit()
+    column_names = list(column_names) + [name for name in
+        ("create_stamp", "id", "edit_stamp") if name not in column_names]
+
+    if limit is None:
+        return db.session.execute(
+            select_plans(column_names, condition)).fetchall(), None
+
+    # The cursor is created from the last plan in the page.
+    cursor = request.args.get("cursor")
+
+    if cursor is not None:
+        create_stamp, id = decode_cursor(cursor)
+        after_cursor = db.or_(
+            plan_table.c.create_stamp > create_stamp,
+            db.and_(
+                plan_table.c.create_stamp == create_stamp,
+                plan_table.c.id > id))
+        condition = and_condition(condition, after_cursor)
+
+    # Select one plan more than requested, to find out whether a next
+    # page exists.
+    plans = db.session.execute(select_plans(column_names, condition)
+        .order_by(plan_table.c.create_stamp, plan_table.c.id)
+        .limit(limit + 1)).fetchall()
+
+    # Links keep all other query arguments.
+    values = dict(request.args.to_dict(), **values)
+    values["limit"] = limit
+    values["cursor"] = cursor
+
+    links = {
+        "self": url_for(endpoint, **values)
+    }
+
+    if len(plans) > limit:
+        plans = plans[:limit]
+        values["cursor"] = encode_cursor(plans[-1])
+        links["next"] = url_for(endpoint, **values)
+
+    return plans, links
+
+
+def paginate_users(
+        condition,
+        endpoint,
+        **values):
+    """Return a page of the ids of the users owning plans satisfying
+    *condition*, and the links to add to the envelope
+
+    Pages are ordered on user id. The cursor is the id of the last user
+    in the previous page. When the request does not ask for a page, the
+    first page, of the default size, is returned.
+    """
+    limit = page_limit() or current_app.config["PLAN_PAGE_LIMIT_DEFAULT"]
+    cursor = request.args.get("cursor")
+
+    if cursor is not None:
+        try:
+            user = uuid.UUID(hex=cursor)
+        except ValueError:
+            raise BadRequest("Invalid cursor")
+
+        condition = and_condition(condition, plan_table.c.user > user)
+
+    select = db.select([plan_table.c.user]).distinct()
+
+    if condition is not None:
+        select = select.where(condition)
+
+    # Select one user more than requested, to find out whether a next
+    # page exists.
+    users = [row.user for row in db.session.execute(select
+        .order_by(plan_table.c.user)
+        .limit(limit + 1))]
+
+    values = dict(request.args.to_dict(), **values)
+    values["limit"] = limit
+    values["cursor"] = cursor
+
+    links = {
+        "self": url_for(endpoint, **values)
+    }
+
+    if len(users) > limit:
+        users = users[:limit]
+        values["cursor"] = users[-1].hex
+        links["next"] = url_for(endpoint, **values)
+
+    return users, links
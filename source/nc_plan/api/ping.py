@@ -1,7 +1,7 @@
-from flask import jsonify
+from .. import json_provider
 from . import api_blueprint
 
 
 @api_blueprint.route("/ping")
 def ping():
-    return jsonify(response="pong"), 200
+    return json_provider.response({"response": "pong"})
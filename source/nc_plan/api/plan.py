@@ -3,12 +3,33 @@ from .resource import *
 
 
 # All plans.
-# - Get all plans
+# - Get all plans, optionally filtered by status, edit stamp and user-id
 # - Post plan by user-id
+# - Post batch of plans
+# - Patch batch of plans
 api_restful.add_resource(PlansAllResource,
     "/plans",
     endpoint="plans_all")
 
+# Statistics about all plans.
+# - Get number of plans per status, overall and by user-id
+api_restful.add_resource(PlansStatisticsResource,
+    "/plans/stats",
+    endpoint="plans_stats")
+
+# Change feed.
+# - Get changes of plans after a cursor, optionally filtered by user-id
+#   and status, waiting for them (long-poll) or as Server-Sent Events
+api_restful.add_resource(PlansChangesResource,
+    "/plans/changes",
+    endpoint="plans_changes")
+
+# Claim of plans by workers.
+# - Lease plans with some status, which are not leased already
+api_restful.add_resource(PlansClaimResource,
+    "/plans/claim",
+    endpoint="plans_claim")
+
 # Plan by user-id and plan-id.
 # - Get plan by user-id and plan-id
 # - Patch plan by user-id and plan-id
@@ -17,7 +38,8 @@ api_restful.add_resource(PlanResource,
     endpoint="plan")
 
 # Plans by user-id.
-# - Get plans by user-id
+# - Get plans by user-id, optionally filtered by status and edit stamp
+# - Patch plans by user-id, optionally filtered by status
 api_restful.add_resource(PlansResource,
     "/plans/<uuid:user_id>",
     endpoint="plans")
@@ -0,0 +1,79 @@
+import datetime
+import uuid
+from flask import request
+from werkzeug.exceptions import BadRequest
+from .. import db
+from .model import plan_table, statuses
+
+
+def select_plans(
+        column_names,
+        condition=None):
+    """Return a Core select of the columns named *column_names* of the
+    plans satisfying *condition*
+
+    Selecting rows instead of ORM instances skips the construction of
+    instances and their bookkeeping in the session.
+    """
+    select = db.select([plan_table.c[name] for name in column_names])
+
+    if condition is not None:
+        select = select.where(condition)
+
+    return select
+
+
+def and_condition(
+        condition,
+        other):
+    return other if condition is None else db.and_(condition, other)
+
+
+def requested_condition(
+        condition=None):
+    """Return *condition*, combined with the filters passed in the query
+    string
+
+    Supported filters:
+
+    - status: comma separated list of statuses
+    - since: edit stamp, in ISO 8601 format. Only plans edited at or
+      after this time are selected. Time stamps without a time zone are
+      in UTC.
+    - user: user id
+    """
+    status = request.args.get("status")
+    since = request.args.get("since")
+    user = request.args.get("user")
+
+    if status is not None:
+        status = status.split(",")
+
+        for name in status:
+            if name not in statuses:
+                raise BadRequest("Invalid status: {}".format(name))
+
+        condition = and_condition(condition, plan_table.c.status.in_(status))
+
+    if since is not None:
+        try:
+            since = datetime.datetime.fromisoformat(since)
+        except ValueError:
+            raise BadRequest("Invalid since time stamp")
+
+        if since.tzinfo is not None:
+            # Edit stamps are stored in UTC, without time zone.
+            since = since.astimezone(datetime.timezone.utc) \
+                .replace(tzinfo=None)
+
+        condition = and_condition(condition, plan_table.c.edit_stamp >= since)
+
+    if user is not None:
+        try:
+            user = uuid.UUID(user)
+        except ValueError:
+            raise BadRequest("Invalid user")
+
+        condition = and_condition(condition, plan_table.c.user == user)
+
+    return condition
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from flask import make_response, request
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
+from .. import json_provider
+from ..metrics import serialization_timer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+json_mediatype = "application/json"
+ndjson_mediatype = "application/x-ndjson"
+msgpack_mediatype = "application/msgpack"
+
+
+# Suffixes of the entity tags of the representations in media types other
+# than JSON, see conditional.representation_etag
+etag_suffixes = {
+    ndjson_mediatype: "-ndjson",
+    msgpack_mediatype: "-msgpack",
+}
+
+
+def envelope_items(
+        data):
+    """Return the items in the envelope *data*: the plans of a collection,
+    the plan of a single plan representation, or *data* itself"""
+    if isinstance(data, dict):
+        if isinstance(data.get("plans"), list):
+            return data["plans"]
+
+        if "plan" in data and len(data) == 1:
+            return [data["plan"]]
+
+    return [data]
+
+
+def link_header(
+        links):
+    return ", ".join('<{}>; rel="{}"'.format(url, rel)
+        for rel, url in links.items())
+
+
+def output_json(
+        data,
+        code,
+        headers=None):
+    """Make a response with a JSON body, encoded by the configured JSON
+    provider"""
+    with serialization_timer():
+        body = json_provider.dumps(data) + "\n"
+
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+
+    return response
+
+
+def output_ndjson(
+        data,
+        code,
+        headers=None):
+    """Make a response with a newline delimited JSON body, containing one
+    plan per line
+
+    Links of a collection, like those to the next page, are passed in
+    a Link header instead of the envelope.
+    """
+    with serialization_timer():
+        body = "".join(
+            json_provider.dumps(item) + "\n" for item in envelope_items(data))
+
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+
+    if isinstance(data, dict) and isinstance(data.get("_links"), dict) \
+            and "plans" in data:
+        response.headers["Link"] = link_header(data["_links"])
+
+    return response
+
+
+def output_msgpack(
+        data,
+        code,
+        headers=None):
+    """Make a response with a MessagePack body, containing the same
+    representation as the JSON body"""
+    with serialization_timer():
+        body = msgpack.packb(data, use_bin_type=True)
+
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+
+    return response
+
+
+# Representations, JSON being the default.
+representations = OrderedDict([
+    (json_mediatype, output_json),
+    (ndjson_mediatype, output_ndjson),
+])
+
+if msgpack is not None:
+    representations[msgpack_mediatype] = output_msgpack
+
+
+def negotiated_mediatype():
+    """Return the media type of the representation to respond with"""
+    return request.accept_mimetypes.best_match(
+        list(representations), default=json_mediatype)
+
+
+def request_data():
+    """Return the body of the request, decoded according to its media
+    type, or None if there is no body
+
+    A newline delimited JSON body is a batch of plans, one per line,
+    without envelope. It is decoded as {"plans": [...]}. Other bodies
+    contain the same data as JSON bodies.
+    """
+    mediatype = request.mimetype
+
+    if mediatype == ndjson_mediatype:
+        try:
+            plans = [json_provider.loads(line) for line in
+                request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            raise BadRequest("Invalid newline delimited JSON")
+
+        return {"plans": plans} if plans else None
+
+    if mediatype == msgpack_mediatype:
+        if msgpack is None:
+            raise UnsupportedMediaType("MessagePack is not supported")
+
+        data = request.get_data()
+
+        if not data:
+            return None
+
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except (ValueError, msgpack.UnpackException):
+            raise BadRequest("Invalid MessagePack")
+
+    if not request.is_json:
+        return None
+
+    try:
+        return json_provider.loads(request.get_data())
+    except ValueError:
+        raise BadRequest("Invalid JSON")
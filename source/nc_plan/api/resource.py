@@ -1,59 +1,150 @@
 from werkzeug.exceptions import *
 from flask_restful import Resource
-from flask import request
-from .. import db
-from .model import PlanModel
-from .schema import PlanSchema
+from flask import current_app, request
+from .. import cache, db, group_commit, replicas
+from .change import ChangeSerializer, event_stream_requested, \
+    record_changes, requested_change_condition, requested_cursor, \
+    requested_wait, stream_changes, wait_for_changes
+from .conditional import collection_etag, is_conditional, is_current, \
+    is_not_modified, not_modified, plan_etag, respond, select_edit_stamp, \
+    validators
+from .model import PlanModel, plan_table, statuses
+from .pagination import paginate, paginate_users
+from .query import and_condition, requested_condition, select_plans
+from .representation import request_data
+from .schema import PlanBatchEditSchema, PlanClaimSchema, PlanEditSchema, \
+    PlanSchema
+from .serializer import PlanSerializer, requested_fields
+from .stream import stream_plans, stream_requested
+from .update import claim_plans, is_leased, update_plan, update_plans, \
+    update_plans_of_user
 
 
 plan_schema = PlanSchema()
+plan_edit_schema = PlanEditSchema()
+plan_batch_edit_schema = PlanBatchEditSchema()
+plan_claim_schema = PlanClaimSchema()
+
+
+def requested_lease_owner():
+    """Return the owner of the leases on the plans edited, as passed in
+    the PLAN_LEASE_OWNER_HEADER header, or None"""
+    return request.headers.get(
+        current_app.config["PLAN_LEASE_OWNER_HEADER"]) or None
+
+
+def leased_conflict(
+        ids):
+    return Conflict("Plans leased by another owner: {}".format(
+        ", ".join(str(id) for id in ids)))
+
+
+def check_bulk_size(
+        json_data):
+
+    if isinstance(json_data, dict) and \
+            isinstance(json_data.get("plans"), list) and \
+            len(json_data["plans"]) > current_app.config["PLAN_BULK_SIZE_MAX"]:
+        raise RequestEntityTooLarge("Too many plans passed in")
 
 
 class PlanResource(Resource):
 
+    @replicas.read_only
     def get(self,
             user_id,
             plan_id):
 
-        # user_id is not needed
-        plan = PlanModel.query.get(plan_id)
+        key = cache.plan_key(user_id, plan_id)
+        representation = cache.get(key)
 
-        if plan is None or plan.user != user_id:
-            raise BadRequest("Plan could not be found")
+        if representation is None:
 
+            if is_conditional():
+                # Find out whether the representation the client has is
+                # current, without selecting and serializing the whole
+                # plan.
+                edit_stamp = select_edit_stamp(user_id, plan_id)
 
-        data, errors = plan_schema.dump(plan)
+                if edit_stamp is not None:
+                    etag = plan_etag(plan_id, edit_stamp)
 
-        if errors:
-            raise InternalServerError(errors)
+                    if is_not_modified(etag, edit_stamp):
+                        return not_modified(etag, edit_stamp)
 
 
-        return data
+            # user_id is not needed
+            plan = PlanModel.query.get(plan_id)
+
+            if plan is None or plan.user != user_id:
+                raise BadRequest("Plan could not be found")
+
+
+            data = PlanSerializer().dump(plan)
+            representation = \
+                data, plan_etag(plan.id, plan.edit_stamp), plan.edit_stamp
+            cache.set(key, *representation)
+
+
+        return respond(*representation)
 
 
     def patch(self,
             user_id,
             plan_id):
 
-        json_data = request.get_json()
+        json_data = request_data()
 
         if json_data is None:
             raise BadRequest("No input data provided")
 
 
-        # user_id is not needed
-        plan = PlanModel.query.get(plan_id)
+        edit, errors = plan_edit_schema.load(json_data)
 
-        if plan is None or plan.user != user_id:
-            raise BadRequest("Plan could not be found")
+        if errors:
+            raise UnprocessableEntity(errors)
 
 
-        # Merge current representation and the edits passed in.
-        for field_name in json_data:
-            if hasattr(plan, field_name):
-                setattr(plan, field_name, json_data[field_name])
+        edit_stamp = None
 
-        db.session.commit()
+        if request.if_match:
+            # Only update the plan if the representation the client has
+            # is current.
+            edit_stamp = select_edit_stamp(user_id, plan_id)
+
+            if edit_stamp is None:
+                raise BadRequest("Plan could not be found")
+
+            if not is_current(plan_etag(plan_id, edit_stamp)):
+                raise PreconditionFailed("Plan has been edited")
+
+
+        # Update the plan and select the new representation, in one go.
+        lease_owner = requested_lease_owner()
+
+        def write():
+            plan = update_plan(user_id, plan_id, edit, edit_stamp=edit_stamp,
+                lease_owner=lease_owner)
+
+            if plan is not None:
+                record_changes([plan_id])
+
+            return plan
+
+
+        plan = group_commit.write(write)
+
+        if plan is None:
+            if is_leased(user_id, plan_id, lease_owner):
+                raise leased_conflict([plan_id])
+
+            if edit_stamp is not None:
+                # Plan was edited after its edit stamp was selected.
+                raise PreconditionFailed("Plan has been edited")
+
+            raise BadRequest("Plan could not be found")
+
+        cache.invalidate([(user_id, plan_id)])
 
 
         data, errors = plan_schema.dump(plan)
@@ -62,52 +153,182 @@ class PlanResource(Resource):
             raise InternalServerError(errors)
 
 
-        return data
+        return data, 200, validators(
+            plan_etag(plan.id, plan.edit_stamp), plan.edit_stamp)
 
 
 class PlansResource(Resource):
 
+    @replicas.read_only
     def get(self,
             user_id):
 
-        plans = PlanModel.query.filter_by(user=user_id)
-        data, errors = plan_schema.dump(plans, many=True)
+        condition = requested_condition(plan_table.c.user == user_id)
+        serializer = PlanSerializer(requested_fields())
+
+        if stream_requested():
+            return stream_plans(
+                select_plans(serializer.column_names(), condition),
+                serializer)
+
+        key = cache.collection_key(user_id, request.query_string)
+        representation = cache.get(key)
+
+        if representation is None:
+            plans, links = paginate(serializer.column_names(), condition,
+                "api.plans", user_id=user_id)
+
+            # The last edit of the plans that left the collection is not
+            # known, so collections are only validated by their entity tag.
+            etag = collection_etag(plans, links)
+
+            if is_not_modified(etag, None):
+                return not_modified(etag, None)
+
+            data = serializer.dump_many(plans)
+
+            if links is not None:
+                data["_links"] = links
+
+            representation = data, etag, None
+            cache.set(key, *representation)
+
+
+        return respond(*representation)
+
+
+    def patch(self,
+            user_id):
+
+        json_data = request_data()
+
+        if json_data is None:
+            raise BadRequest("No input data provided")
+
+
+        status = request.args.get("status")
+
+        if status is not None and status not in statuses:
+            raise BadRequest("Invalid status")
+
+
+        edit, errors = plan_edit_schema.load(json_data)
 
         if errors:
-            raise InternalServerError(errors)
+            raise UnprocessableEntity(errors)
 
-        assert isinstance(data, dict), data
 
+        # Edit all selected plans using a single statement.
+        updated, leased = update_plans_of_user(user_id, edit, status=status,
+            lease_owner=requested_lease_owner())
 
-        return data
+        if leased:
+            raise leased_conflict(leased)
+
+        record_changes(updated)
+        db.session.commit()
+        cache.invalidate((user_id, id) for id in updated)
+
+
+        return {
+            "updated": [str(id) for id in updated]
+        }
 
 
 class PlansAllResource(Resource):
 
 
     # TODO Only call this from admin interface!
+    @replicas.read_only
     def get(self):
 
-        plans = PlanModel.query.all()
-        data, errors = plan_schema.dump(plans, many=True)
+        condition = requested_condition()
+        serializer = PlanSerializer(requested_fields())
+
+        if stream_requested():
+            return stream_plans(
+                select_plans(serializer.column_names(), condition),
+                serializer)
+
+        key = cache.collection_key(None, request.query_string)
+        representation = cache.get(key)
+
+        if representation is None:
+            plans, links = paginate(serializer.column_names(), condition,
+                "api.plans_all")
+
+            # The last edit of the plans that left the collection is not
+            # known, so collections are only validated by their entity tag.
+            etag = collection_etag(plans, links)
+
+            if is_not_modified(etag, None):
+                return not_modified(etag, None)
+
+            data = serializer.dump_many(plans)
+
+            if links is not None:
+                data["_links"] = links
+
+            representation = data, etag, None
+            cache.set(key, *representation)
+
+
+        return respond(*representation)
+
+
+    def patch(self):
+
+        json_data = request_data()
+
+        if json_data is None:
+            raise BadRequest("No input data provided")
+
+        check_bulk_size(json_data)
+
+
+        # Validate and deserialize all edits in one pass. Nothing is
+        # written when any edit is invalid.
+        edits, errors = plan_batch_edit_schema.load(json_data, many=True)
 
         if errors:
-            raise InternalServerError(errors)
+            raise UnprocessableEntity(errors)
 
-        assert isinstance(data, dict), data
 
+        # Apply all edits using set-based statements, in a single
+        # transaction.
+        updated, not_found, leased = update_plans(edits,
+            lease_owner=requested_lease_owner())
+
+        if leased:
+            raise leased_conflict(leased)
+
+        record_changes(updated)
+        db.session.commit()
+
+        updated_ids = set(updated)
+        cache.invalidate((edit["user"], edit["id"]) for edit in edits
+            if edit["id"] in updated_ids)
 
-        return data
+
+        return {
+            "updated": [str(id) for id in updated],
+            "not_found": [str(id) for id in not_found]
+        }
 
 
     def post(self):
 
-        json_data = request.get_json()
+        json_data = request_data()
 
         if json_data is None:
             raise BadRequest("No input data provided")
 
 
+        # A batch of plans is passed in as {"plans": [...]}.
+        if isinstance(json_data, dict) and "plans" in json_data:
+            return self.post_many(json_data)
+
+
         # Validate and deserialize input.
         plan, errors = plan_schema.load(json_data)
 
@@ -116,14 +337,160 @@ class PlansAllResource(Resource):
 
 
         # Write plan to database.
-        db.session.add(plan)
-        db.session.commit()
+        def write():
+            db.session.bulk_save_objects([plan])
+            record_changes([plan.id])
+
+
+        group_commit.write(write)
+        cache.invalidate([(plan.user, plan.id)])
+
+
+        # The plan written is complete. There is no need to read it back
+        # from the database.
+        data, errors = plan_schema.dump(plan)
+        assert not errors, errors
+        assert isinstance(data, dict), data
+
+
+        return data, 201
+
+
+    def post_many(self,
+            json_data):
 
+        check_bulk_size(json_data)
+
+
+        # Validate and deserialize all input in one pass. Errors are
+        # reported per plan, by position in the input. Nothing is written
+        # when any plan is invalid.
+        plans, errors = plan_schema.load(json_data, many=True)
+
+        if errors:
+            raise UnprocessableEntity(errors)
 
-        # From record in database to dict representing a plan.
-        data, errors = plan_schema.dump(PlanModel.query.get(plan.id))
+
+        # Write all plans to database, in a single statement and
+        # transaction.
+        def write():
+            db.session.bulk_save_objects(plans)
+            record_changes(plan.id for plan in plans)
+
+
+        group_commit.write(write)
+        cache.invalidate((plan.user, plan.id) for plan in plans)
+
+
+        # The plans written are complete. There is no need to read them
+        # back from the database.
+        data, errors = plan_schema.dump(plans, many=True)
         assert not errors, errors
         assert isinstance(data, dict), data
 
 
         return data, 201
+
+
+class PlansClaimResource(Resource):
+
+    def post(self):
+
+        json_data = request_data()
+
+        if json_data is None:
+            raise BadRequest("No input data provided")
+
+
+        claim, errors = plan_claim_schema.load(json_data)
+
+        if errors:
+            raise UnprocessableEntity(errors)
+
+
+        limit = min(claim["limit"], current_app.config["PLAN_CLAIM_LIMIT_MAX"])
+        duration = min(
+            claim.get("duration",
+                current_app.config["PLAN_LEASE_DURATION_DEFAULT"]),
+            current_app.config["PLAN_LEASE_DURATION_MAX"])
+
+
+        # Select and lease the plans in one go. Leasing does not change
+        # the representations, so cached ones stay valid.
+        plans, expiry = claim_plans(claim["status"], claim["owner"], limit,
+            duration)
+        db.session.commit()
+
+
+        data = PlanSerializer().dump_many(plans)
+        data["lease"] = {
+            "owner": claim["owner"],
+            "expiry": expiry.isoformat(),
+        }
+
+        return data
+
+
+class PlansChangesResource(Resource):
+
+    @replicas.read_only
+    def get(self):
+
+        condition = requested_change_condition()
+        cursor = requested_cursor()
+
+        if event_stream_requested():
+            return stream_changes(cursor, condition)
+
+
+        # Long-poll: wait for changes if there are none yet.
+        changes = wait_for_changes(cursor, condition, requested_wait())
+
+
+        return ChangeSerializer().dump_many(changes, cursor)
+
+
+class PlansStatisticsResource(Resource):
+
+    @replicas.read_only
+    def get(self):
+
+        # Count plans per status, and per user and status, each in a
+        # single query. Filters passed in the query string are applied.
+        # Users are paged.
+        condition = requested_condition()
+        select = db.select([plan_table.c.status, db.func.count()]) \
+            .group_by(plan_table.c.status)
+
+        if condition is not None:
+            select = select.where(condition)
+
+        counts = dict.fromkeys(statuses, 0)
+
+        for status, count in db.session.execute(select):
+            counts[status] = counts.get(status, 0) + count
+
+
+        users, links = paginate_users(condition, "api.plans_stats")
+        counts_by_user = {
+            str(user): dict.fromkeys(statuses, 0) for user in users
+        }
+
+        if users:
+            select = db.select([
+                    plan_table.c.user, plan_table.c.status, db.func.count()]) \
+                .where(and_condition(condition,
+                    plan_table.c.user.in_(users))) \
+                .group_by(plan_table.c.user, plan_table.c.status)
+
+            for user, status, count in db.session.execute(select):
+                counts_by_user[str(user)][status] = count
+
+
+        return {
+            "statistics": {
+                "statuses": counts,
+                "users": counts_by_user,
+            },
+            "_links": links,
+        }
@@ -1,8 +1,9 @@
 import datetime
-import uuid
-from marshmallow import fields, post_dump, post_load, pre_load, ValidationError
-from marshmallow.validate import Length, OneOf
+from marshmallow import fields, post_dump, post_load, pre_load, \
+    validates_schema, ValidationError
+from marshmallow.validate import Length, OneOf, Range
 from .. import ma
+from .identifier import new_plan_id
 from .model import PlanModel, statuses
 
 
@@ -87,7 +88,7 @@ class PlanSchema(ma.Schema):
             data):
 
         return PlanModel(
-            id=uuid.uuid4(),
+            id=new_plan_id(),
             user=data["user"],
             pathname=data["pathname"],
             layer_name=data.get("layer_name", ""),
@@ -95,3 +96,72 @@ class PlanSchema(ma.Schema):
             create_stamp=datetime.datetime.utcnow(),
             edit_stamp=datetime.datetime.utcnow()
         )
+
+
+class PlanEditSchema(ma.Schema):
+    """Schema for the edits of a plan
+
+    Only the fields that may change during the lifetime of a plan can be
+    edited. All of them are optional, but at least one must be passed.
+    Other fields are ignored.
+    """
+
+    pathname = fields.Str(validate=Length(min=1))
+    layer_name = fields.Str(validate=Length(min=1))
+    status = fields.Str(validate=OneOf(statuses))
+
+
+    @validates_schema(
+        skip_on_field_errors=True)
+    def validate_not_empty(self,
+            data):
+
+        if not any(name in data for name in
+                ("pathname", "layer_name", "status")):
+            raise ValidationError("No fields to edit passed in")
+
+
+class PlanBatchEditSchema(PlanEditSchema):
+    """Schema for the edits of a batch of plans
+
+    Each edit identifies the plan to edit by its id and user.
+    """
+
+    id = fields.UUID(required=True)
+    user = fields.UUID(required=True)
+
+
+    @pre_load(
+        pass_many=True)
+    def unwrap(self,
+            data,
+            many):
+
+        if not isinstance(data, dict) or "plans" not in data:
+            raise ValidationError("Input data must have a plans key")
+
+        return data["plans"]
+
+
+
+class PlanClaimSchema(ma.Schema):
+    """Schema for a claim of plans by a worker
+
+    A worker claims up to limit plans with some status, for duration
+    seconds. When duration is not passed, the configured default is used.
+    """
+
+    status = fields.Str(required=True, validate=OneOf(statuses))
+    owner = fields.Str(required=True, validate=Length(min=1, max=255))
+    limit = fields.Int(missing=1, validate=Range(min=1))
+    duration = fields.Int(validate=Range(min=1))
+
+
+    @pre_load
+    def unwrap(self,
+            data):
+
+        if not isinstance(data, dict) or "claim" not in data:
+            raise ValidationError("Input data must have a claim key")
+
+        return data["claim"]
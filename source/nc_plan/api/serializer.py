@@ -0,0 +1,169 @@
+import uuid
+from flask import request, url_for
+from werkzeug.exceptions import BadRequest
+from ..metrics import serialization_timer
+
+
+# Placeholders substituted for the ids in the URLs of the links.
+user_placeholder = uuid.UUID(int=1)
+id_placeholder = uuid.UUID(int=2)
+
+
+def url_template(
+        endpoint,
+        **values):
+    """Return a format string for the URL of *endpoint*, with fields
+    {user} and {id} for the user id and plan id"""
+    url = url_for(endpoint, **values)
+
+    return url \
+        .replace("{", "{{").replace("}", "}}") \
+        .replace(str(user_placeholder), "{user}") \
+        .replace(str(id_placeholder), "{id}")
+
+
+def requested_fields():
+    """Return the names of the fields to include in the representations,
+    as requested in the query string, or None if all fields are
+    requested
+
+    At least one field must be requested.
+    """
+    fields = request.args.get("fields")
+
+    if fields is None:
+        return None
+
+    fields = tuple(name for name in fields.split(",") if name)
+
+    if not fields:
+        raise BadRequest("No fields requested")
+
+    for name in fields:
+        if name not in PlanSerializer.fields:
+            raise BadRequest("Invalid field: {}".format(name))
+
+    return fields
+
+
+class PlanSerializer:
+    """Serializer creating the same representations of plans as PlanSchema
+
+    Where PlanSchema dispatches to a field object per attribute and builds
+    the URLs of the links per plan, this serializer builds the URL
+    templates once, when it is created. Create a serializer per request,
+    inside the request context.
+
+    Plans can be passed as ORM instances or Core rows. Values can also be
+    passed as a tuple of column values (see columns).
+
+    If *fields* is passed, representations only contain the fields
+    named. Only the columns returned by column_names are needed then.
+    """
+
+    # Fields of a representation.
+    fields = ("user", "pathname", "layer_name", "status", "_links")
+
+    # Columns needed, in the order expected by serialize_values.
+    columns = ("id", "user", "pathname", "layer_name", "status")
+
+
+    def __init__(self,
+            fields=None):
+        self.self_template = url_template("api.plan",
+            user_id=user_placeholder, plan_id=id_placeholder)
+        self.collection_template = url_template("api.plans",
+            user_id=user_placeholder)
+
+        if fields is not None and set(fields) == set(self.fields):
+            fields = None
+
+        self.selected_fields = fields
+
+
+    def column_names(self):
+        """Return the names of the columns needed to serialize plans"""
+        if self.selected_fields is None:
+            return self.columns
+
+        names = set(self.selected_fields) - {"_links"}
+
+        if "_links" in self.selected_fields:
+            names |= {"id", "user", "status"}
+
+        # Keep the order of the table.
+        return tuple(name for name in self.columns if name in names)
+
+
+    def links(self,
+            id,
+            user,
+            status):
+        self_url = self.self_template.format(user=user, id=id)
+        links = {
+            "self": self_url,
+            "collection": self.collection_template.format(user=user),
+        }
+
+        # Same links as inserted by PlanSchema.wrap_links.
+        if status == "registered":
+            links["georeference"] = self_url + "/georeference"
+        elif status == "georeferenced":
+            links["colors"] = self_url + "/colors"
+            links["classify"] = self_url + "/classify"
+
+        return links
+
+
+    def serialize_values(self,
+            id,
+            user,
+            pathname,
+            layer_name,
+            status):
+        """Return the representation of a plan, without envelope"""
+        user = str(user)
+
+        return {
+            "user": user,
+            "pathname": pathname,
+            "layer_name": layer_name,
+            "status": status,
+            "_links": self.links(id, user, status),
+        }
+
+
+    def serialize(self,
+            plan):
+        """Return the representation of a plan, without envelope"""
+        if self.selected_fields is None:
+            return self.serialize_values(plan.id, plan.user, plan.pathname,
+                plan.layer_name, plan.status)
+
+        data = {}
+
+        for name in self.selected_fields:
+            if name == "_links":
+                data[name] = self.links(plan.id, plan.user, plan.status)
+            elif name == "user":
+                data[name] = str(plan.user)
+            else:
+                data[name] = getattr(plan, name)
+
+        return data
+
+
+    def dump(self,
+            plan):
+        with serialization_timer():
+            return {
+                "plan": self.serialize(plan)
+            }
+
+
+    def dump_many(self,
+            plans):
+        with serialization_timer():
+            return {
+                "plans": [self.serialize(plan) for plan in plans]
+            }
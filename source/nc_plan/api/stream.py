@@ -0,0 +1,81 @@
+from flask import current_app, request, Response, stream_with_context
+from werkzeug.exceptions import BadRequest
+from .. import db, json_provider
+from .representation import msgpack, msgpack_mediatype, \
+    negotiated_mediatype, ndjson_mediatype
+
+
+def stream_requested():
+    """Return whether the request asks for a streamed response"""
+    stream = request.args.get("stream", "false").lower()
+
+    if stream in ("1", "true", "yes"):
+        return True
+    elif stream in ("0", "false", "no"):
+        return False
+    else:
+        raise BadRequest("Stream must be a boolean")
+
+
+def stream_plans(
+        select,
+        serializer):
+    """Return a chunked response containing the plans selected by *select*
+
+    Plans are read from the database in batches and serialized one at a
+    time, using *serializer*. Memory usage and time to first byte do not
+    depend on the number of plans.
+
+    The JSON envelope is the same as the one created by PlanSchema.wrap.
+    Newline delimited JSON contains a plan per line. MessagePack contains
+    a sequence of plans, without envelope.
+    """
+    batch_size = current_app.config["PLAN_STREAM_BATCH_SIZE"]
+    mediatype = negotiated_mediatype()
+
+
+    def batches():
+        result = db.session.execute(
+            select.execution_options(stream_results=True))
+
+        while True:
+            plans = result.fetchmany(batch_size)
+
+            if not plans:
+                break
+
+            yield [serializer.serialize(plan) for plan in plans]
+
+
+    def generate_json():
+        yield '{"plans":['
+
+        separator = ""
+
+        for plans in batches():
+            yield separator + ",".join(
+                json_provider.dumps(plan) for plan in plans)
+            separator = ","
+
+        yield "]}"
+
+
+    def generate_ndjson():
+        for plans in batches():
+            yield "".join(
+                json_provider.dumps(plan) + "\n" for plan in plans)
+
+
+    def generate_msgpack():
+        packer = msgpack.Packer(use_bin_type=True)
+
+        for plans in batches():
+            yield b"".join(packer.pack(plan) for plan in plans)
+
+
+    generate = {
+        ndjson_mediatype: generate_ndjson,
+        msgpack_mediatype: generate_msgpack,
+    }.get(mediatype, generate_json)
+
+    return Response(stream_with_context(generate()), mimetype=mediatype)
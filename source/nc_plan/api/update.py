@@ -0,0 +1,285 @@
+import datetime
+import uuid
+from .. import db
+from .model import plan_table
+
+# Maximum number of values passed in an IN clause. Some backends (SQLite)
+# limit the number of parameters per statement.
+in_clause_size = 500
+
+# Values of the lease columns of a plan that is not claimed.
+no_lease = {
+    "lease_owner": None,
+    "lease_expiry": None,
+    "lease_token": None,
+}
+
+
+def release_lease(
+        edit):
+    """Return *edit*, releasing the lease on the plan if it changes the
+    status
+
+    A worker claims plans in some status and moves them on to the next
+    one. Once it has done so, the plans can be claimed again, by the
+    workers of the next stage.
+    """
+    if "status" in edit:
+        edit = dict(edit, **no_lease)
+
+    return edit
+
+
+def editable(
+        owner,
+        now):
+    """Return the condition selecting the plans *owner* may edit at *now*
+
+    Plans leased by another owner can only be edited once their lease has
+    expired. *owner* is None for clients that have not claimed plans.
+    """
+    condition = db.or_(
+        plan_table.c.lease_expiry == None,
+        plan_table.c.lease_expiry <= now)
+
+    if owner is not None:
+        condition = db.or_(condition, plan_table.c.lease_owner == owner)
+
+    return condition
+
+
+def is_leased(
+        user,
+        id,
+        owner):
+    """Return whether plan *id* of *user* is leased by another owner than
+    *owner*"""
+    return db.session.execute(db.select([plan_table.c.id]).where(db.and_(
+            plan_table.c.id == id,
+            plan_table.c.user == user,
+            db.not_(editable(owner, datetime.datetime.utcnow())))
+        )).first() is not None
+
+
+def select_leased(
+        ids,
+        owner,
+        now):
+    """Return the ids in *ids* of the plans leased by another owner than
+    *owner*"""
+    ids = list(ids)
+    leased = []
+
+    for i in range(0, len(ids), in_clause_size):
+        leased += [row.id for row in db.session.execute(
+            db.select([plan_table.c.id]).where(db.and_(
+                plan_table.c.id.in_(ids[i:i + in_clause_size]),
+                db.not_(editable(owner, now)))))]
+
+    return leased
+
+
+def select_owners(
+        ids):
+    """Return a dict mapping the ids in *ids* to the user of the plan
+
+    The plans are locked for update, on backends that support it. Ids of
+    plans that do not exist are not included.
+    """
+    ids = list(ids)
+    owners = {}
+
+    for i in range(0, len(ids), in_clause_size):
+        owners.update(db.session.execute(
+            db.select([plan_table.c.id, plan_table.c.user])
+                .where(plan_table.c.id.in_(ids[i:i + in_clause_size]))
+                .with_for_update()).fetchall())
+
+    return owners
+
+
+def update_plan(
+        user,
+        id,
+        edit,
+        edit_stamp=None,
+        lease_owner=None):
+    """Apply *edit* to plan *id* of *user*, on behalf of *lease_owner*
+
+    If *edit_stamp* is passed, the plan is only updated if it was last
+    edited at that time.
+
+    Return the updated plan, as a row, or None if the plan does not exist,
+    is not owned by the user, was edited at another time, or is leased by
+    another owner. On backends supporting RETURNING, the plan is updated
+    and selected in a single statement.
+    """
+    now = datetime.datetime.utcnow()
+    condition = db.and_(plan_table.c.id == id, plan_table.c.user == user,
+        editable(lease_owner, now))
+
+    if edit_stamp is not None:
+        condition = db.and_(condition, plan_table.c.edit_stamp == edit_stamp)
+    statement = plan_table.update().where(condition).values(
+        edit_stamp=now, **release_lease(edit))
+    connection = db.session.connection()
+
+    if connection.dialect.implicit_returning:
+        return connection.execute(statement.returning(*plan_table.c)).first()
+
+    if connection.execute(statement).rowcount == 0:
+        return None
+
+    return connection.execute(
+        db.select([plan_table]).where(db.and_(
+            plan_table.c.id == id, plan_table.c.user == user))).first()
+
+
+def update_plans(
+        edits,
+        lease_owner=None):
+    """Apply *edits* to a batch of plans, on behalf of *lease_owner*
+
+    *edits* is a list of dicts containing the id and user of a plan and
+    the new values of the fields to change. Edits changing the same set
+    of fields are applied using a single UPDATE statement. When a plan
+    is passed more than once, only its last edit is applied. Edits of
+    plans that do not exist, or are not owned by the user, are skipped.
+    When any plan of the users passed is leased by another owner, no plan
+    is updated.
+
+    Return the ids of the plans updated, of the plans not found, and of
+    the plans leased by another owner.
+    """
+    edits = list({(edit["id"], edit["user"]): edit for edit in edits}
+        .values())
+    owners = select_owners(edit["id"] for edit in edits)
+    edit_stamp = datetime.datetime.utcnow()
+
+    # Plans of other users are not found, whether leased or not.
+    leased = select_leased([edit["id"] for edit in edits
+            if owners.get(edit["id"]) == edit["user"]],
+        lease_owner, edit_stamp)
+
+    if leased:
+        return [], [], leased
+
+    updated = []
+    not_found = []
+    edits_by_field_names = {}
+
+    for edit in edits:
+        if owners.get(edit["id"]) != edit["user"]:
+            not_found.append(edit["id"])
+        else:
+            field_names = tuple(sorted(set(edit) - {"id", "user"}))
+            edits_by_field_names.setdefault(field_names, []).append(edit)
+            updated.append(edit["id"])
+
+    for field_names, edits in edits_by_field_names.items():
+        statement = plan_table.update() \
+            .where(plan_table.c.id == db.bindparam("_id")) \
+            .values(edit_stamp=edit_stamp, **release_lease({
+                name: db.bindparam("_" + name) for name in field_names}))
+        parameters = [
+            dict(_id=edit["id"], **{
+                "_" + name: edit[name] for name in field_names})
+            for edit in edits]
+
+        db.session.execute(statement, parameters)
+
+    return updated, not_found, []
+
+
+def update_plans_of_user(
+        user,
+        edit,
+        status=None,
+        lease_owner=None):
+    """Apply *edit* to all plans of *user*, on behalf of *lease_owner*
+
+    If *status* is passed, only plans with this status are edited. All
+    plans are edited using a single UPDATE statement. When any plan is
+    leased by another owner, no plan is updated.
+
+    Return the ids of the plans updated and of the plans leased by
+    another owner.
+    """
+    now = datetime.datetime.utcnow()
+    condition = plan_table.c.user == user
+
+    if status is not None:
+        condition = db.and_(condition, plan_table.c.status == status)
+
+    plans = db.session.execute(db.select([plan_table.c.id,
+            editable(lease_owner, now).label("editable")])
+        .where(condition).with_for_update()).fetchall()
+    leased = [plan.id for plan in plans if not plan.editable]
+
+    if leased:
+        return [], leased
+
+    updated = [plan.id for plan in plans]
+
+    if updated:
+        db.session.execute(plan_table.update()
+            .where(db.and_(condition, editable(lease_owner, now)))
+            .values(edit_stamp=now, **release_lease(edit)))
+
+    return updated, []
+
+
+def claim_plans(
+        status,
+        owner,
+        limit,
+        duration):
+    """Claim up to *limit* plans with *status* for *owner*, for
+    *duration* seconds
+
+    Plans that are not leased, or whose lease has expired, can be
+    claimed. The plans edited least recently are claimed first. Plans
+    are selected and leased using a single UPDATE statement, so
+    concurrent claims never lease the same plan twice. On PostgreSQL,
+    plans locked by a concurrent claim are skipped instead of waited for.
+
+    Return the plans claimed, as rows, and the expiry of their lease.
+    """
+    now = datetime.datetime.utcnow()
+    expiry = now + datetime.timedelta(seconds=duration)
+    token = uuid.uuid4()
+
+    claimable = db.and_(
+        plan_table.c.status == status,
+        db.or_(
+            plan_table.c.lease_expiry == None,
+            plan_table.c.lease_expiry <= now))
+    connection = db.session.connection()
+    candidates = db.select([plan_table.c.id]) \
+        .where(claimable) \
+        .order_by(plan_table.c.edit_stamp) \
+        .limit(limit)
+
+    if connection.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    # The claimable condition is repeated, so a plan leased by a
+    # concurrent claim after it was selected as a candidate is not
+    # leased again.
+    statement = plan_table.update() \
+        .where(db.and_(plan_table.c.id.in_(candidates), claimable)) \
+        .values(lease_owner=owner, lease_expiry=expiry, lease_token=token)
+
+    if connection.dialect.implicit_returning:
+        # Rows returned are not ordered. Order them as the select below
+        # does, with plans without edit stamp first.
+        plans = sorted(
+            connection.execute(statement.returning(*plan_table.c)),
+            key=lambda plan: (plan.edit_stamp is not None, plan.edit_stamp))
+    else:
+        connection.execute(statement)
+        plans = connection.execute(db.select([plan_table])
+            .where(plan_table.c.lease_token == token)
+            .order_by(plan_table.c.edit_stamp)).fetchall()
+
+    return plans, expiry
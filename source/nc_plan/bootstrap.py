@@ -0,0 +1,55 @@
+import os.path
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+migrations_directory = os.path.join(os.path.dirname(__file__), "migrations")
+
+
+def init_migrations(
+        app):
+    """Register Flask-Migrate with *app*
+
+    Flask-Migrate imports Alembic, which is only needed to run the
+    migrations. Processes serving requests do not register it.
+    """
+    from flask_migrate import Migrate
+    from . import db
+
+    Migrate(app, db, directory=migrations_directory, render_as_batch=True)
+
+
+def bootstrap(
+        app):
+    """Create the database schema of *app*, or bring it up to date"""
+    from flask_migrate import upgrade
+
+    if "migrate" not in app.extensions:
+        init_migrations(app)
+
+    with app.app_context():
+        upgrade()
+
+
+@click.command("bootstrap")
+@with_appcontext
+def bootstrap_command():
+    """Create the database schema, or bring it up to date."""
+    bootstrap(current_app._get_current_object())
+
+
+@click.command("convert-ids")
+@click.option("--batch-size", default=1000, show_default=True,
+    help="Number of values converted per transaction.")
+@with_appcontext
+def convert_ids_command(
+        batch_size):
+    """Convert plan ids stored as text to 16 byte binary values."""
+    from . import db
+    from .api.identifier import convert_text_ids
+
+    counts = convert_text_ids(db.engine, batch_size)
+
+    for name, count in counts.items():
+        click.echo("{}: {} values converted".format(name, count))
@@ -0,0 +1,323 @@
+import collections
+import datetime
+import threading
+import time
+import uuid
+from flask import current_app, g, has_request_context
+
+
+class NullBackend:
+    """Backend that does not store anything"""
+
+    def get(self,
+            key):
+        return None
+
+
+    def set(self,
+            key,
+            value,
+            ttl=None):
+        pass
+
+
+    def delete(self,
+            key):
+        pass
+
+
+class SimpleBackend:
+    """Backend storing values in the memory of the current process
+
+    Values expire after *ttl* seconds. When the total size of the values
+    exceeds *size* bytes, the least recently used values are evicted.
+    Values are not shared between processes.
+    """
+
+    def __init__(self,
+            size,
+            ttl):
+        self.size = size
+        self.ttl = ttl
+        self.nr_bytes = 0
+        self.values = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def get(self,
+            key):
+
+        with self.lock:
+            item = self.values.get(key)
+
+            if item is None:
+                return None
+
+            value, expires = item
+
+            if expires <= time.monotonic():
+                self._delete(key)
+                return None
+
+            self.values.move_to_end(key)
+
+            return value
+
+
+    def set(self,
+            key,
+            value,
+            ttl=None):
+
+        if len(value) > self.size:
+            return
+
+        with self.lock:
+            self._delete(key)
+            self.values[key] = (value, time.monotonic() +
+                (ttl if ttl is not None else self.ttl))
+            self.nr_bytes += len(value)
+
+            while self.nr_bytes > self.size:
+                _, (evicted_value, _) = self.values.popitem(last=False)
+                self.nr_bytes -= len(evicted_value)
+
+
+    def delete(self,
+            key):
+
+        with self.lock:
+            self._delete(key)
+
+
+    def _delete(self,
+            key):
+
+        item = self.values.pop(key, None)
+
+        if item is not None:
+            self.nr_bytes -= len(item[0])
+
+
+class UwsgiBackend:
+    """Backend storing values in a uWSGI cache
+
+    The cache is shared by all worker processes. It must be configured
+    in uwsgi.ini. Eviction of least recently used values is handled by
+    uWSGI (purge_lru).
+    """
+
+    def __init__(self,
+            name,
+            ttl):
+        import uwsgi
+
+        self.uwsgi = uwsgi
+        self.name = name
+        self.ttl = ttl
+
+
+    def get(self,
+            key):
+        return self.uwsgi.cache_get(key, self.name)
+
+
+    def set(self,
+            key,
+            value,
+            ttl=None):
+        self.uwsgi.cache_update(key, value,
+            ttl if ttl is not None else self.ttl, self.name)
+
+
+    def delete(self,
+            key):
+        self.uwsgi.cache_del(key, self.name)
+
+
+class CacheState:
+
+    def __init__(self,
+            backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+
+    def count(self,
+            hit):
+
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+def create_backend(
+        app):
+
+    type_ = app.config["PLAN_CACHE_TYPE"]
+    ttl = app.config["PLAN_CACHE_TTL"]
+
+    if type_ == "null":
+        return NullBackend()
+    elif type_ == "simple":
+        return SimpleBackend(app.config["PLAN_CACHE_SIZE"], ttl)
+    elif type_ == "uwsgi":
+        try:
+            return UwsgiBackend(app.config["PLAN_CACHE_UWSGI_NAME"], ttl)
+        except ImportError:
+            # Not running under uWSGI, e.g. when running migrations.
+            app.logger.warning(
+                "uWSGI not available: plan representations are not cached")
+            return NullBackend()
+    else:
+        raise ValueError("Invalid plan cache type: {}".format(type_))
+
+
+class Cache:
+    """Read-through cache of plan representations
+
+    Representations of plans are cached by user id and plan id.
+    Representations of collections are cached by user id (or for all
+    users) and query string. Each key contains a generation token,
+    which is replaced whenever the plan, or a plan in the collection, is
+    written, invalidating all cached representations of it at once.
+
+    Writers must invalidate after committing. Readers must create the key
+    before selecting. A reader that selected a plan before the commit
+    then stores an outdated representation at a key of the previous
+    generation, which is not read anymore.
+
+    Representations read from a read replica may be outdated, also after
+    invalidation, until the replica catches up. They are cached for at
+    most PLAN_CACHE_REPLICA_TTL seconds.
+    """
+
+    def __init__(self,
+            app=None):
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self,
+            app):
+        app.extensions["plan_cache"] = CacheState(create_backend(app))
+
+
+    @property
+    def state(self):
+        return current_app.extensions["plan_cache"]
+
+
+    def get(self,
+            key):
+        """Return the (data, etag, last_modified) tuple stored at *key*,
+        or None"""
+        value = self.state.backend.get(key)
+        self.state.count(value is not None)
+
+        if value is None:
+            return None
+
+        from . import json_provider
+
+        value = json_provider.loads(value)
+        last_modified = value["last_modified"]
+
+        if last_modified is not None:
+            last_modified = datetime.datetime.fromisoformat(last_modified)
+
+        return value["data"], value["etag"], last_modified
+
+
+    def set(self,
+            key,
+            data,
+            etag,
+            last_modified):
+        """Store a representation at *key*"""
+        ttl = None
+
+        if has_request_context() and g.get("replica") is not None:
+            ttl = current_app.config["PLAN_CACHE_REPLICA_TTL"]
+
+        value = {
+            "data": data,
+            "etag": etag,
+            "last_modified": last_modified.isoformat()
+                if last_modified is not None else None
+        }
+        from . import json_provider
+
+        self.state.backend.set(key, json_provider.dumps(value).encode("utf8"),
+            ttl)
+
+
+    def generation(self,
+            key):
+        """Return the token of the current generation of the
+        representations invalidated by deleting *key*"""
+        token = self.state.backend.get(key)
+
+        if token is None:
+            token = uuid.uuid4().hex.encode("ascii")
+            self.state.backend.set(key, token)
+
+        return token.decode("ascii")
+
+
+    def collection_generation_key(self,
+            user):
+        return "generation:{}".format(user if user is not None else "all")
+
+
+    def plan_generation_key(self,
+            user,
+            id):
+        return "generation:{}:{}".format(user, id)
+
+
+    def plan_key(self,
+            user,
+            id):
+        return "plan:{}:{}:{}".format(user, id,
+            self.generation(self.plan_generation_key(user, id)))
+
+
+    def collection_key(self,
+            user=None,
+            query_string=b""):
+        return "plans:{}:{}:{}".format(
+            user if user is not None else "all",
+            self.generation(self.collection_generation_key(user)),
+            query_string.decode("latin1"))
+
+
+    def invalidate(self,
+            plans):
+        """Invalidate the representations affected by writing *plans*
+
+        *plans* is an iterable of (user, id) tuples.
+        """
+        backend = self.state.backend
+        users = set()
+
+        for user, id in plans:
+            backend.delete(self.plan_generation_key(user, id))
+            users.add(user)
+
+        for user in users:
+            backend.delete(self.collection_generation_key(user))
+
+        backend.delete(self.collection_generation_key(None))
+
+
+    def statistics(self):
+        """Return the number of hits and misses in the current process"""
+        return {
+            "hits": self.state.hits,
+            "misses": self.state.misses,
+        }
@@ -0,0 +1,182 @@
+import zlib
+from flask import request
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipCompressor:
+
+    def __init__(self,
+            level):
+        # wbits 31: gzip container
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+    def compress(self,
+            data):
+        return self.compressor.compress(data) + self.compressor.flush()
+
+
+    def compress_chunk(self,
+            data):
+        # Flush, so the client can decompress the chunk without waiting
+        # for the next one.
+        return self.compressor.compress(data) + \
+            self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class ZstdCompressor:
+
+    def __init__(self,
+            level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+
+    def compress(self,
+            data):
+        return self.compressor.compress(data) + self.compressor.flush()
+
+
+    def compress_chunk(self,
+            data):
+        return self.compressor.compress(data) + self.compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def compressors(
+        config):
+    """Return a dict mapping the content codings supported to functions
+    creating compressors, in order of preference"""
+    result = {}
+
+    if zstandard is not None:
+        result["zstd"] = lambda: ZstdCompressor(config["COMPRESS_LEVEL_ZSTD"])
+
+    result["gzip"] = lambda: GzipCompressor(config["COMPRESS_LEVEL_GZIP"])
+
+    return result
+
+
+def coded_etag(
+        etag,
+        encoding):
+    """Return the entity tag of the representation tagged *etag*,
+    compressed using content coding *encoding*"""
+    return "{}-{}".format(etag, encoding)
+
+
+def decoded_etag(
+        etag):
+    """Return the entity tag of the uncompressed representation of the
+    one tagged *etag*"""
+    for encoding in ("zstd", "gzip"):
+        suffix = "-" + encoding
+
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)]
+
+    return etag
+
+
+def compress_chunks(
+        chunks,
+        compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf8")
+
+            if chunk:
+                yield compressor.compress_chunk(chunk)
+
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class Compression:
+    """Compression of responses, negotiated using Accept-Encoding
+
+    Responses of the media types in COMPRESS_MIMETYPES are compressed
+    using zstd, when the zstandard package is installed, or gzip.
+    Buffered responses smaller than COMPRESS_MIN_SIZE bytes are sent
+    as is. Streamed responses are compressed chunk by chunk, so clients
+    receive each chunk as soon as it is produced.
+
+    Compressed representations are different representations, with
+    their own strong entity tags: the tag of the uncompressed one,
+    suffixed with the content coding. Conditional requests compare the
+    tags passed after removing the suffix (see decoded_etag).
+    """
+
+    def __init__(self,
+            app=None):
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self,
+            app):
+        if not app.config["COMPRESS_ENABLED"]:
+            return
+
+        mimetypes = set(app.config["COMPRESS_MIMETYPES"])
+        min_size = app.config["COMPRESS_MIN_SIZE"]
+        compressors_ = compressors(app.config)
+
+
+        @app.after_request
+        def compress(
+                response):
+
+            if response.mimetype not in mimetypes:
+                return response
+
+            response.vary.add("Accept-Encoding")
+
+            if response.status_code < 200 or \
+                    response.status_code in (204, 206, 304) or \
+                    request.method == "HEAD" or \
+                    response.direct_passthrough or \
+                    "Content-Encoding" in response.headers:
+                return response
+
+            encoding = request.accept_encodings.best_match(
+                list(compressors_))
+
+            if encoding is None:
+                return response
+
+            compressor = compressors_[encoding]()
+
+            if response.is_streamed:
+                response.response = compress_chunks(
+                    response.response, compressor)
+                response.headers.pop("Content-Length", None)
+            else:
+                data = response.get_data()
+
+                if len(data) < min_size:
+                    return response
+
+                response.set_data(compressor.compress(data))
+
+            response.headers["Content-Encoding"] = encoding
+            etag, weak = response.get_etag()
+
+            if etag is not None:
+                response.set_etag(coded_etag(etag, encoding), weak)
+
+            return response
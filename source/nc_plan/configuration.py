@@ -1,5 +1,6 @@
 import os
 import tempfile
+from .engine import engine_options
 
 
 class Configuration:
@@ -9,14 +10,166 @@ class Configuration:
         "yabbadabbadoo!"
     JSON_AS_ASCII = False
 
+    LOG_LEVEL = os.environ.get("NC_PLAN_LOG_LEVEL") or "INFO"
+
+    # Encoding and decoding of JSON: orjson, stdlib, or auto (orjson if
+    # installed)
+    JSON_PROVIDER = os.environ.get("NC_PLAN_JSON_PROVIDER") or "auto"
+
     SQLALCHEMY_COMMIT_ON_TEARDOWN = True
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool. Pre-ping and recycle are only used for server
+    # databases.
+    DATABASE_POOL_SIZE = int(
+        os.environ.get("NC_PLAN_DATABASE_POOL_SIZE") or 5)
+    DATABASE_MAX_OVERFLOW = int(
+        os.environ.get("NC_PLAN_DATABASE_MAX_OVERFLOW") or 10)
+    DATABASE_POOL_TIMEOUT = int(
+        os.environ.get("NC_PLAN_DATABASE_POOL_TIMEOUT") or 30)  # seconds
+    DATABASE_POOL_PRE_PING = \
+        (os.environ.get("NC_PLAN_DATABASE_POOL_PRE_PING") or "true").lower() \
+            in ("1", "true", "yes")
+    DATABASE_POOL_RECYCLE = int(
+        os.environ.get("NC_PLAN_DATABASE_POOL_RECYCLE") or 3600)  # seconds
+
+    # Read replicas, as a comma separated list of URIs. Reads by GET
+    # requests are routed to them. Failing replicas are skipped for a
+    # while.
+    SQLALCHEMY_READ_REPLICA_URIS = [uri for uri in
+        (os.environ.get("NC_PLAN_READ_REPLICA_URIS") or "").split(",")
+            if uri]
+    READ_REPLICA_RETRY_INTERVAL = 30  # seconds
+
+    # Pragmas set on each SQLite connection. In WAL mode, readers are not
+    # blocked by writers and commits do not wait for a full fsync.
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,  # milliseconds
+        "cache_size": -16384,  # KiB
+        "mmap_size": 256 * 1024 * 1024,  # bytes
+    }
+
+    # Compression of responses, using zstd (if the zstandard package is
+    # installed) or gzip, as accepted by the client. Smaller responses are
+    # not worth compressing. Streamed responses are always compressed.
+    COMPRESS_ENABLED = \
+        (os.environ.get("NC_PLAN_COMPRESS_ENABLED") or "true").lower() \
+            in ("1", "true", "yes")
+    COMPRESS_MIMETYPES = [
+        "application/json",
+        "application/x-ndjson",
+        "application/msgpack",
+    ]
+    COMPRESS_MIN_SIZE = 1024  # bytes
+    COMPRESS_LEVEL_GZIP = 6
+    COMPRESS_LEVEL_ZSTD = 3
+
+    # Statements taking longer than SLOW_QUERY_THRESHOLD seconds are
+    # logged, with their plan, to the nc_plan.slow_query logger. At most
+    # SLOW_QUERY_LOG_LIMIT statements are logged per
+    # SLOW_QUERY_LOG_INTERVAL seconds, per process.
+    SLOW_QUERY_THRESHOLD = float(
+        os.environ.get("NC_PLAN_SLOW_QUERY_THRESHOLD") or 0.5)  # seconds
+    SLOW_QUERY_EXPLAIN = True
+    SLOW_QUERY_LOG_LIMIT = 10
+    SLOW_QUERY_LOG_INTERVAL = 60  # seconds
+
+    # Profiling of requests handled by the API. When enabled, requests
+    # passing PROFILE_TOKEN in the PROFILE_HEADER header, and a fraction
+    # PROFILE_SAMPLE_RATE of all requests, are profiled. The last
+    # PROFILE_MAX_DUMPS profiles are kept in PROFILE_DIRECTORY.
+    PROFILE_ENABLED = \
+        (os.environ.get("NC_PLAN_PROFILE_ENABLED") or "false").lower() \
+            in ("1", "true", "yes")
+    PROFILE_HEADER = "X-Profile"
+    PROFILE_TOKEN = os.environ.get("NC_PLAN_PROFILE_TOKEN") or None
+    PROFILE_SAMPLE_RATE = float(
+        os.environ.get("NC_PLAN_PROFILE_SAMPLE_RATE") or 0)
+    PROFILE_DIRECTORY = os.environ.get("NC_PLAN_PROFILE_DIRECTORY") or \
+        os.path.join(tempfile.gettempdir(), "nc_plan-profiles")
+    PROFILE_MAX_DUMPS = 100
+
+    # Metrics. Worker processes share their metrics through files in
+    # METRICS_DIRECTORY, if configured (see uwsgi.ini).
+    METRICS_DIRECTORY = os.environ.get("NC_PLAN_METRICS_DIRECTORY") or None
+    METRICS_FLUSH_INTERVAL = 5  # seconds
+
+    # Ids of new plans: uuid4 (random) or uuid7 (time-ordered). Plans
+    # with time-ordered ids are appended to the primary key index, but
+    # their ids reveal when they were created.
+    PLAN_ID_TYPE = os.environ.get("NC_PLAN_ID_TYPE") or "uuid4"
+
+    # Group commit. When enabled, plans posted and patched concurrently by
+    # the threads of a worker process are written in a single
+    # transaction. Writes are collected during at most
+    # GROUP_COMMIT_WINDOW seconds, or until each request being handled by
+    # the process has submitted a write. Groups are at most as large as
+    # the number of threads per process (see uwsgi.ini). Requests fail
+    # when their write is not committed within GROUP_COMMIT_TIMEOUT
+    # seconds.
+    GROUP_COMMIT_ENABLED = \
+        (os.environ.get("NC_PLAN_GROUP_COMMIT_ENABLED") or "false").lower() \
+            in ("1", "true", "yes")
+    GROUP_COMMIT_WINDOW = float(
+        os.environ.get("NC_PLAN_GROUP_COMMIT_WINDOW") or 0.002)  # seconds
+    GROUP_COMMIT_SIZE_MAX = 100
+    GROUP_COMMIT_TIMEOUT = 30  # seconds
+
+    # Paging through plan collections
+    PLAN_PAGE_LIMIT_DEFAULT = 100
+    PLAN_PAGE_LIMIT_MAX = 1000
+
+    # Number of plans read and written per chunk of a streamed response
+    PLAN_STREAM_BATCH_SIZE = 500
+
+    # Maximum number of plans posted or patched in a single request
+    PLAN_BULK_SIZE_MAX = 10000
+
+    # Claiming of plans by workers. Leases expire after the duration
+    # passed in, or the default duration. Until then, only the owner of
+    # the lease, passed in PLAN_LEASE_OWNER_HEADER, can edit the plans.
+    PLAN_CLAIM_LIMIT_MAX = 100
+    PLAN_LEASE_DURATION_DEFAULT = 300  # seconds
+    PLAN_LEASE_DURATION_MAX = 3600  # seconds
+    PLAN_LEASE_OWNER_HEADER = "X-Lease-Owner"
+
+    # Change feed. Long-polls wait at most PLAN_CHANGE_WAIT_MAX seconds,
+    # event streams last PLAN_CHANGE_STREAM_DURATION seconds, after
+    # which clients reconnect. Both occupy a worker thread.
+    PLAN_CHANGE_BATCH_SIZE = 1000
+    PLAN_CHANGE_POLL_INTERVAL = 0.5  # seconds
+    PLAN_CHANGE_WAIT_MAX = 30  # seconds
+    PLAN_CHANGE_STREAM_DURATION = 300  # seconds
+    PLAN_CHANGE_HEARTBEAT_INTERVAL = 15  # seconds
+
+    # Number of long-polls and event streams handled at the same time per
+    # process. Keep it below the number of threads per process (see
+    # uwsgi.ini), so other requests are still handled. Clients exceeding
+    # it are told to retry after PLAN_CHANGE_RETRY_AFTER seconds.
+    PLAN_CHANGE_WAITERS_MAX = int(
+        os.environ.get("NC_PLAN_CHANGE_WAITERS_MAX") or 1)
+    PLAN_CHANGE_RETRY_AFTER = 5  # seconds
+
+    # Caching of plan representations: null, simple (per process) or
+    # uwsgi (shared by all worker processes, see uwsgi.ini)
+    PLAN_CACHE_TYPE = os.environ.get("NC_PLAN_CACHE_TYPE") or "null"
+    PLAN_CACHE_SIZE = 64 * 1024 * 1024  # bytes, simple cache only
+    PLAN_CACHE_TTL = 300  # seconds
+    PLAN_CACHE_REPLICA_TTL = 5  # seconds, representations read from replicas
+    PLAN_CACHE_UWSGI_NAME = "plans"
+
 
     @staticmethod
     def init_app(
             app):
-        pass
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS",
+            engine_options(app.config))
+
+        if app.config["PLAN_ID_TYPE"] not in ("uuid4", "uuid7"):
+            raise ValueError("Invalid plan id type: {}".format(
+                app.config["PLAN_ID_TYPE"]))
 
 
 class DevelopmentConfiguration(Configuration):
@@ -30,6 +183,8 @@ class DevelopmentConfiguration(Configuration):
         "sqlite:///" + os.path.join(tempfile.gettempdir(),
             "plan-dev.sqlite")
 
+    PLAN_CACHE_TYPE = os.environ.get("NC_PLAN_CACHE_TYPE") or "simple"
+
 
     @staticmethod
     def init_app(
@@ -51,6 +206,8 @@ class TestConfiguration(Configuration):
         "sqlite:///" + os.path.join(tempfile.gettempdir(),
             "plan-test.sqlite")
 
+    PLAN_CACHE_TYPE = os.environ.get("NC_PLAN_CACHE_TYPE") or "simple"
+
 
 class ProductionConfiguration(Configuration):
 
@@ -59,6 +216,8 @@ class ProductionConfiguration(Configuration):
         "sqlite:///" + os.path.join(tempfile.gettempdir(),
             "plan.sqlite")
 
+    PLAN_CACHE_TYPE = os.environ.get("NC_PLAN_CACHE_TYPE") or "uwsgi"
+
 
 configuration = {
     "development": DevelopmentConfiguration,
@@ -0,0 +1,113 @@
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+from .metrics import TimedQueuePool, watch_engine
+from .slow_query import log_slow_queries
+
+
+def is_sqlite_memory_database(
+        url):
+    return url.drivername.startswith("sqlite") and \
+        url.database in (None, "", ":memory:")
+
+
+def engine_options(
+        config):
+    """Return the options to create the engine of the database configured
+    in *config* with
+
+    Connections to server databases, and to SQLite database files, are
+    pooled. In-memory SQLite databases are left to Flask-SQLAlchemy.
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+
+    if is_sqlite_memory_database(url):
+        return {}
+
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": config["DATABASE_POOL_SIZE"],
+        "max_overflow": config["DATABASE_MAX_OVERFLOW"],
+        "pool_timeout": config["DATABASE_POOL_TIMEOUT"],
+    }
+
+    if url.drivername.startswith("sqlite"):
+        # Pooled connections are used by multiple threads, one at a time.
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = config["DATABASE_POOL_PRE_PING"]
+        options["pool_recycle"] = config["DATABASE_POOL_RECYCLE"]
+
+    return options
+
+
+def set_sqlite_pragmas(
+        engine,
+        pragmas):
+    """Set *pragmas* on each new connection of *engine*"""
+
+    @event.listens_for(engine, "connect")
+    def connect(
+            dbapi_connection,
+            connection_record):
+        cursor = dbapi_connection.cursor()
+
+        for name, value in pragmas.items():
+            cursor.execute("PRAGMA {} = {}".format(name, value))
+
+        cursor.close()
+
+
+def engine_settings(
+        engine,
+        config):
+    """Return a dict with the effective settings of *engine*"""
+    pool = engine.pool
+    settings = {
+        "url": repr(engine.url),
+        "pool": type(pool).__name__,
+    }
+
+    if isinstance(pool, QueuePool):
+        settings["pool_size"] = pool.size()
+        settings["max_overflow"] = pool._max_overflow
+        settings["pool_timeout"] = pool._timeout
+        settings["pool_recycle"] = pool._recycle
+        settings["pool_pre_ping"] = pool._pre_ping
+
+    if engine.dialect.name == "sqlite":
+        settings["pragmas"] = config["SQLITE_PRAGMAS"]
+
+    return settings
+
+
+def configure_engine(
+        app,
+        engine):
+    """Configure *engine* according to the configuration of *app*, and
+    report its effective settings"""
+    if engine.dialect.name == "sqlite" and \
+            not is_sqlite_memory_database(engine.url):
+        set_sqlite_pragmas(engine, app.config["SQLITE_PRAGMAS"])
+
+    watch_engine(engine)
+    log_slow_queries(app, engine)
+
+    app.logger.info("Database engine: %s",
+        engine_settings(engine, app.config))
+
+
+def dispose_engines(
+        app):
+    """Dispose the connection pools of the primary and read replica
+    engines of *app*
+
+    Pooled connections must not be shared by processes. Call this in a
+    process forked from one that may have connected to a database.
+    """
+    from . import db
+
+    db.get_engine(app).dispose()
+
+    for engine in app.extensions["read_replicas"].engines:
+        engine.dispose()
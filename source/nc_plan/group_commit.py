@@ -0,0 +1,281 @@
+import atexit
+import threading
+import time
+from flask import current_app, g
+from .metrics import count_buckets
+
+
+class Write:
+    """Write submitted for a group commit, and its outcome"""
+
+    def __init__(self,
+            function):
+        self.function = function
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class GroupCommitter:
+    """Committer of the writes of the threads of the current process
+
+    Writes are queued. A single thread collects the writes queued within
+    *window* seconds of the first one, at most *size_max* of them, and
+    executes them, in order, in a single transaction. When a write fails,
+    the transaction is rolled back and the other writes are executed
+    again, without it.
+
+    Threads that may submit writes, like those handling requests, are
+    counted using enter and leave. Once each of them has submitted a
+    write, the group is committed without waiting for the window to end.
+    """
+
+    def __init__(self,
+            app,
+            window,
+            size_max,
+            timeout):
+        self.app = app
+        self.window = window
+        self.size_max = size_max
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.queue = []
+        self.nr_submitters = 0
+        self.thread = None
+        self.stopped = False
+
+
+    def enter(self):
+        """Count the current thread as a thread that may submit writes"""
+        with self.condition:
+            self.nr_submitters += 1
+
+
+    def leave(self):
+        """Stop counting the current thread as a thread that may submit
+        writes"""
+        with self.condition:
+            self.nr_submitters -= 1
+            self.condition.notify()
+
+
+    def submit(self,
+            function):
+        """Queue *function* and wait until it is committed
+
+        Return the result of *function*, or raise the exception it, or the
+        commit, raised. When the write is not committed within *timeout*
+        seconds, TimeoutError is raised. If it was being executed by then,
+        it may still be committed.
+        """
+        write = Write(function)
+
+        with self.condition:
+            if self.stopped:
+                raise RuntimeError("Group commit stopped")
+
+            if self.thread is None:
+                atexit.register(self.stop)
+
+            if self.thread is None or not self.thread.is_alive():
+                # Started in the worker process, on the first write, so it
+                # survives forking.
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+            self.queue.append(write)
+            self.condition.notify()
+
+        if not write.done.wait(self.timeout):
+            with self.condition:
+                if write in self.queue:
+                    self.queue.remove(write)
+
+            raise TimeoutError("Write not committed within {} seconds".format(
+                self.timeout))
+
+        if write.exception is not None:
+            raise write.exception
+
+        return write.result
+
+
+    def next_group(self):
+        """Wait for writes and return the next group of them, or None if
+        stopped"""
+        with self.condition:
+            while not self.queue and not self.stopped:
+                self.condition.wait()
+
+            if not self.queue:
+                return None
+
+            deadline = time.monotonic() + self.window
+
+            while len(self.queue) < min(self.size_max, self.nr_submitters) \
+                    and not self.stopped:
+                timeout = deadline - time.monotonic()
+
+                if timeout <= 0:
+                    break
+
+                self.condition.wait(timeout)
+
+            group = self.queue[:self.size_max]
+            del self.queue[:self.size_max]
+
+        return group
+
+
+    def commit(self,
+            group):
+        """Execute the writes in *group* in a single transaction, and
+        record their outcomes
+
+        The outcome of each write is recorded, also when rolling back
+        fails.
+        """
+        from . import db
+
+        try:
+            self.execute(group)
+        except Exception as exception:
+            self.app.logger.exception("Cannot commit writes")
+            db.session.remove()
+
+            for write in group:
+                if not write.done.is_set():
+                    write.exception = exception
+        finally:
+            for write in group:
+                if not write.done.is_set():
+                    if write.exception is None:
+                        write.exception = RuntimeError("Write not committed")
+
+                    write.done.set()
+
+
+    def execute(self,
+            group):
+        """Execute the writes in *group*, without those failing, and
+        commit them"""
+        from . import db
+
+        while group:
+            results = []
+            failed = None
+
+            try:
+                for write in group:
+                    failed = write
+                    results.append(write.function())
+
+                failed = None
+                db.session.commit()
+            except Exception as exception:
+                db.session.rollback()
+
+                if failed is None:
+                    # The commit failed. None of the writes is committed.
+                    for write in group:
+                        write.exception = exception
+                        write.done.set()
+
+                    return
+
+                failed.exception = exception
+                failed.done.set()
+                group = [write for write in group if write is not failed]
+                continue
+
+            for write, result in zip(group, results):
+                write.result = result
+                write.done.set()
+
+            self.app.extensions["metrics"].observe(
+                "nc_plan_group_commit_size", (), len(group),
+                buckets=count_buckets)
+
+            return
+
+
+    def run(self):
+        with self.app.app_context():
+            while True:
+                group = self.next_group()
+
+                if group is None:
+                    return
+
+                self.commit(group)
+
+
+    def stop(self):
+        """Commit the writes queued, and stop the committing thread"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+            thread = self.thread
+
+        if thread is not None:
+            thread.join()
+
+
+class GroupCommit:
+    """Coalescing of the writes of concurrent requests
+
+    When GROUP_COMMIT_ENABLED is set, writes submitted by the threads of a
+    process are committed together, in groups, by a separate thread with
+    its own session. This trades up to GROUP_COMMIT_WINDOW seconds of
+    latency for fewer transactions, and fewer flushes to disk. Otherwise,
+    writes are committed one by one, in the session of the request.
+
+    Writes must only use the session, not the request, and must be safe
+    to execute again, after a rollback. Each request counts as a thread
+    that may submit a write.
+    """
+
+    def __init__(self,
+            app=None):
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self,
+            app):
+        committer = GroupCommitter(app,
+            app.config["GROUP_COMMIT_WINDOW"],
+            app.config["GROUP_COMMIT_SIZE_MAX"],
+            app.config["GROUP_COMMIT_TIMEOUT"])
+        app.extensions["group_commit"] = committer
+
+
+        @app.before_request
+        def enter():
+            committer.enter()
+            g.group_commit_entered = True
+
+
+        @app.teardown_request
+        def leave(
+                exception):
+            if g.pop("group_commit_entered", False):
+                committer.leave()
+
+
+    def write(self,
+            function):
+        """Execute *function*, writing to the database, and commit
+
+        Return the result of *function*.
+        """
+        if not current_app.config["GROUP_COMMIT_ENABLED"]:
+            from . import db
+
+            result = function()
+            db.session.commit()
+
+            return result
+
+        return current_app.extensions["group_commit"].submit(function)
@@ -0,0 +1,136 @@
+import datetime
+import json
+import uuid
+from flask import current_app, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(
+        obj):
+    """Return a serializable version of *obj*, the same as orjson does for
+    the types it supports natively"""
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(
+            type(obj).__name__))
+
+
+class StdlibProvider:
+    """Provider using the json module of the standard library
+
+    The output is the same as the output of OrjsonProvider: compact, not
+    ASCII-escaped, with UUIDs and date/times as strings.
+    """
+
+    name = "stdlib"
+
+
+    def dumps(self,
+            obj):
+        return json.dumps(obj, default=default, ensure_ascii=False,
+            separators=(",", ":"))
+
+
+    def loads(self,
+            data):
+        return json.loads(data)
+
+
+class OrjsonProvider:
+    """Provider using orjson
+
+    Like the json module, keys which are not strings, like the None
+    status in statistics, are converted to strings.
+    """
+
+    name = "orjson"
+
+
+    def dumps(self,
+            obj):
+        return orjson.dumps(obj, default=default,
+            option=orjson.OPT_NON_STR_KEYS).decode("utf8")
+
+
+    def loads(self,
+            data):
+        return orjson.loads(data)
+
+
+def create_provider(
+        app):
+
+    name = app.config["JSON_PROVIDER"]
+
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+
+    if name == "stdlib":
+        return StdlibProvider()
+    elif name == "orjson":
+        if orjson is None:
+            app.logger.warning(
+                "orjson not available: falling back to stdlib json")
+            return StdlibProvider()
+
+        return OrjsonProvider()
+    else:
+        raise ValueError("Invalid JSON provider: {}".format(name))
+
+
+class JSONProvider:
+    """Encoding and decoding of the JSON in requests and responses
+
+    Uses orjson when it is installed, or the json module of the standard
+    library, as configured in JSON_PROVIDER. Both produce the same output.
+    """
+
+    def __init__(self,
+            app=None):
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self,
+            app):
+        provider = create_provider(app)
+        app.extensions["json_provider"] = provider
+        app.logger.debug("JSON provider: %s", provider.name)
+
+
+    @property
+    def provider(self):
+        return current_app.extensions["json_provider"]
+
+
+    def dumps(self,
+            obj):
+        """Return *obj*, encoded as a JSON string"""
+        return self.provider.dumps(obj)
+
+
+    def loads(self,
+            data):
+        """Return the object encoded in the JSON string or bytes *data*"""
+        return self.provider.loads(data)
+
+
+    def response(self,
+            obj,
+            status=200):
+        """Return a JSON response containing *obj*
+
+        Used instead of jsonify, so all JSON responses are encoded by the
+        same provider.
+        """
+        return Response(self.dumps(obj) + "\n", status,
+            mimetype="application/json")
@@ -0,0 +1,482 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from flask import current_app, g, has_app_context, has_request_context, \
+    request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+# Upper bounds of the buckets of histograms of durations, in seconds.
+duration_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the buckets of histograms of numbers of statements.
+count_buckets = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Type and help text of each metric.
+descriptions = {
+    "nc_plan_http_requests_in_flight": ("gauge",
+        "Number of requests being handled"),
+    "nc_plan_http_request_duration_seconds": ("histogram",
+        "Time spent handling requests, including streaming the response"),
+    "nc_plan_sql_statements_per_request": ("histogram",
+        "Number of SQL statements executed per request"),
+    "nc_plan_sql_duration_seconds_per_request": ("histogram",
+        "Time spent executing SQL statements per request"),
+    "nc_plan_serialization_duration_seconds_per_request": ("histogram",
+        "Time spent serializing representations per request"),
+    "nc_plan_db_pool_wait_seconds": ("histogram",
+        "Time spent waiting for a connection from the pool"),
+    "nc_plan_group_commit_size": ("histogram",
+        "Number of writes committed per group commit"),
+    "nc_plan_cache_hits_total": ("counter",
+        "Number of plan representations found in the cache"),
+    "nc_plan_cache_misses_total": ("counter",
+        "Number of plan representations not found in the cache"),
+}
+
+
+class RequestMetrics:
+    """Measurements of a single request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.status = None
+        self.nr_statements = 0
+        self.sql_duration = 0.0
+        self.serialization_duration = 0.0
+
+
+def request_metrics():
+    """Return the measurements of the current request, or None"""
+    if not has_request_context():
+        return None
+
+    return g.get("request_metrics")
+
+
+class MetricsState:
+    """Metrics of the current process
+
+    Labels are passed as tuples of (name, value) tuples.
+    """
+
+    def __init__(self,
+            directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.flusher = None
+        self.stopped = threading.Event()
+
+
+    def add(self,
+            name,
+            labels,
+            value):
+        with self.lock:
+            key = (name, labels)
+            store = self.gauges \
+                if descriptions[name][0] == "gauge" else self.counters
+            store[key] = store.get(key, 0) + value
+
+
+    def observe(self,
+            name,
+            labels,
+            value,
+            buckets=duration_buckets):
+        with self.lock:
+            key = (name, labels)
+            histogram = self.histograms.get(key)
+
+            if histogram is None:
+                histogram = self.histograms[key] = \
+                    [buckets, [0] * (len(buckets) + 1), 0.0]
+
+            histogram[1][bisect.bisect_left(buckets, value)] += 1
+            histogram[2] += value
+
+
+    def snapshot(self,
+            extra_counters=()):
+        """Return the metrics, as a JSON-serializable dict"""
+        with self.lock:
+            counters = [[name, labels, value]
+                for (name, labels), value in self.counters.items()]
+            gauges = [[name, labels, value]
+                for (name, labels), value in self.gauges.items()]
+            histograms = [[name, labels, list(buckets), list(counts), sum_]
+                for (name, labels), (buckets, counts, sum_)
+                    in self.histograms.items()]
+
+        return {
+            "pid": os.getpid(),
+            "counters": counters + list(extra_counters),
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+
+def is_alive(
+        pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def merge(
+        snapshots):
+    """Merge the *snapshots* of multiple processes
+
+    Counters and histograms of all processes are summed. Gauges of
+    processes that are not running anymore are skipped.
+    """
+    counters = {}
+    gauges = {}
+    histograms = {}
+
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+
+        if snapshot["pid"] == os.getpid() or is_alive(snapshot["pid"]):
+            for name, labels, value in snapshot["gauges"]:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0) + value
+
+        for name, labels, buckets, counts, sum_ in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            histogram = histograms.setdefault(key,
+                [buckets, [0] * len(counts), 0.0])
+
+            for i, count in enumerate(counts):
+                histogram[1][i] += count
+
+            histogram[2] += sum_
+
+    return counters, gauges, histograms
+
+
+def format_labels(
+        labels,
+        **extra):
+
+    labels = list(labels) + list(extra.items())
+
+    if not labels:
+        return ""
+
+    return "{" + ",".join('{}="{}"'.format(name, str(value)
+            .replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for name, value in labels) + "}"
+
+
+def render(
+        counters,
+        gauges,
+        histograms):
+    """Return the metrics in the Prometheus text exposition format"""
+    lines = []
+    names = sorted({name for name, _ in
+        list(counters) + list(gauges) + list(histograms)})
+
+    for name in names:
+        type_, help = descriptions.get(name, ("untyped", name))
+        lines.append("# HELP {} {}".format(name, help))
+        lines.append("# TYPE {} {}".format(name, type_))
+
+        for (name_, labels), value in sorted(counters.items()):
+            if name_ == name:
+                lines.append("{}{} {}".format(
+                    name, format_labels(labels), value))
+
+        for (name_, labels), value in sorted(gauges.items()):
+            if name_ == name:
+                lines.append("{}{} {}".format(
+                    name, format_labels(labels), value))
+
+        for (name_, labels), (buckets, counts, sum_) in \
+                sorted(histograms.items()):
+            if name_ == name:
+                cumulative = 0
+
+                for bound, count in zip(list(buckets) + ["+Inf"], counts):
+                    cumulative += count
+                    lines.append("{}_bucket{} {}".format(name,
+                        format_labels(labels, le=bound), cumulative))
+
+                lines.append("{}_sum{} {}".format(
+                    name, format_labels(labels), sum_))
+                lines.append("{}_count{} {}".format(
+                    name, format_labels(labels), cumulative))
+
+    return "\n".join(lines) + "\n"
+
+
+class TimedQueuePool(QueuePool):
+    """Queue pool measuring the time spent waiting for a connection,
+    including the time spent opening a new one"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+
+        try:
+            return super()._do_get()
+        finally:
+            if has_app_context() and \
+                    "metrics" in current_app.extensions:
+                current_app.extensions["metrics"].observe(
+                    "nc_plan_db_pool_wait_seconds", (),
+                    time.perf_counter() - start)
+
+
+def watch_engine(
+        engine):
+    """Count the statements executed by *engine* per request, and the
+    time spent executing them"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+            connection,
+            cursor,
+            statement,
+            parameters,
+            context,
+            executemany):
+        connection.info.setdefault("metrics_start", []).append(
+            (context, time.perf_counter()))
+
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+            connection,
+            cursor,
+            statement,
+            parameters,
+            context,
+            executemany):
+        _, start = connection.info["metrics_start"].pop()
+        measurements = request_metrics()
+
+        if measurements is not None:
+            measurements.nr_statements += 1
+            measurements.sql_duration += time.perf_counter() - start
+
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(
+            context):
+        # A statement failed: after_cursor_execute is not called. Errors
+        # before the statement is executed, or while fetching its results,
+        # leave nothing to remove.
+        if context.connection is None:
+            return
+
+        starts = context.connection.info.get("metrics_start")
+
+        if starts and starts[-1][0] is context.execution_context:
+            starts.pop()
+
+
+class serialization_timer:
+    """Context manager adding the time spent in its body to the
+    serialization time of the current request"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+
+    def __exit__(self,
+            *exception):
+        measurements = request_metrics()
+
+        if measurements is not None:
+            measurements.serialization_duration += \
+                time.perf_counter() - self.start
+
+
+class Metrics:
+    """Request and SQL instrumentation
+
+    Metrics are kept per process. When METRICS_DIRECTORY is configured,
+    each process writes its metrics to a file in that directory every
+    METRICS_FLUSH_INTERVAL seconds, and the metrics of all processes
+    writing to it, like the uWSGI workers, are merged when they are
+    rendered. The directory must be emptied when the service starts.
+    """
+
+    def __init__(self,
+            app=None):
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self,
+            app):
+        state = MetricsState(app.config["METRICS_DIRECTORY"])
+        app.extensions["metrics"] = state
+
+
+        @app.before_request
+        def start_request():
+            g.request_metrics = RequestMetrics()
+            state.add("nc_plan_http_requests_in_flight", (), 1)
+
+            if state.directory is not None and state.flusher is None:
+                self.start_flusher(app, state)
+
+
+        @app.after_request
+        def record_status(
+                response):
+            measurements = request_metrics()
+
+            if measurements is not None:
+                measurements.status = response.status_code
+
+            return response
+
+
+        @app.teardown_request
+        def finish_request(
+                exception):
+            # Streamed responses are finished when the stream ends.
+            measurements = g.pop("request_metrics", None)
+
+            if measurements is None:
+                return
+
+            endpoint = (("endpoint", request.endpoint or "none"),)
+            labels = (
+                ("method", request.method),
+                ("endpoint", request.endpoint or "none"),
+                ("status", str(measurements.status or 500)),
+            )
+            state.observe("nc_plan_http_request_duration_seconds", labels,
+                time.perf_counter() - measurements.start)
+            state.observe("nc_plan_sql_statements_per_request", endpoint,
+                measurements.nr_statements, buckets=count_buckets)
+            state.observe("nc_plan_sql_duration_seconds_per_request",
+                endpoint, measurements.sql_duration)
+            state.observe(
+                "nc_plan_serialization_duration_seconds_per_request",
+                endpoint, measurements.serialization_duration)
+            state.add("nc_plan_http_requests_in_flight", (), -1)
+
+
+    @property
+    def state(self):
+        return current_app.extensions["metrics"]
+
+
+    def snapshot(self,
+            app,
+            state):
+        cache = app.extensions["plan_cache"]
+
+        return state.snapshot(extra_counters=[
+            ["nc_plan_cache_hits_total", [], cache.hits],
+            ["nc_plan_cache_misses_total", [], cache.misses],
+        ])
+
+
+    def flush(self,
+            app,
+            state):
+        """Write the metrics of the current process to the metrics
+        directory"""
+        pathname = os.path.join(state.directory,
+            "{}.json".format(os.getpid()))
+        temporary_pathname = pathname + ".tmp"
+
+        with open(temporary_pathname, "w") as file:
+            json.dump(self.snapshot(app, state), file)
+
+        os.replace(temporary_pathname, pathname)
+
+
+    def start_flusher(self,
+            app,
+            state):
+        # Started in the worker process, on the first request, so it
+        # survives forking. Stopped when the process exits.
+        with state.lock:
+            if state.flusher is not None:
+                return
+
+            os.makedirs(state.directory, exist_ok=True)
+            interval = app.config["METRICS_FLUSH_INTERVAL"]
+
+
+            def flush():
+                stopped = False
+
+                while not stopped:
+                    # Flush a last time when stopped.
+                    stopped = state.stopped.wait(interval)
+
+                    try:
+                        self.flush(app, state)
+                    except OSError:
+                        app.logger.exception("Cannot write metrics")
+
+
+            state.flusher = threading.Thread(target=flush, daemon=True)
+            state.flusher.start()
+            atexit.register(self.stop, app)
+
+
+    def stop(self,
+            app):
+        """Stop the thread writing the metrics of *app* to the metrics
+        directory, if started, after it wrote them a last time"""
+        state = app.extensions["metrics"]
+
+        with state.lock:
+            flusher = state.flusher
+
+        if flusher is None:
+            return
+
+        state.stopped.set()
+        flusher.join()
+
+
+    def render(self):
+        """Return the metrics of all processes in the Prometheus text
+        exposition format"""
+        app = current_app._get_current_object()
+        state = self.state
+
+        if state.directory is None:
+            return render(*merge([self.snapshot(app, state)]))
+
+        os.makedirs(state.directory, exist_ok=True)
+        self.flush(app, state)
+        snapshots = []
+
+        for name in os.listdir(state.directory):
+            if not name.endswith(".json"):
+                continue
+
+            try:
+                with open(os.path.join(state.directory, name)) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                # Removed, or being replaced.
+                continue
+
+        return render(*merge(snapshots))
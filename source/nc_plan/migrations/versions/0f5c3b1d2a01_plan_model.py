@@ -0,0 +1,39 @@
+"""plan_model
+
+Revision ID: 0f5c3b1d2a01
+Revises: 
+Create Date: 2026-10-18 13:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '0f5c3b1d2a01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created before migrations were introduced already contain
+    # this table. Leave it alone, so they can be upgraded in place.
+    if "plan_model" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('plan_model',
+        sa.Column('id', sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+        sa.Column('user', sqlalchemy_utils.types.uuid.UUIDType(), nullable=True),
+        sa.Column('pathname', sa.UnicodeText(), nullable=True),
+        sa.Column('layer_name', sa.UnicodeText(), nullable=True),
+        sa.Column('status', sa.Unicode(length=20), nullable=True),
+        sa.Column('create_stamp', sa.DateTime(), nullable=True),
+        sa.Column('edit_stamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('plan_model')
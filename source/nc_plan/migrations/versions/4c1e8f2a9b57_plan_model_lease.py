@@ -0,0 +1,34 @@
+"""plan_model lease
+
+Revision ID: 4c1e8f2a9b57
+Revises: 9d2b7e5a1c33
+Create Date: 2026-10-18 16:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1e8f2a9b57'
+down_revision = '9d2b7e5a1c33'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('plan_model',
+        sa.Column('lease_owner', sa.Unicode(length=255), nullable=True))
+    op.add_column('plan_model',
+        sa.Column('lease_expiry', sa.DateTime(), nullable=True))
+    op.add_column('plan_model',
+        sa.Column('lease_token', sqlalchemy_utils.types.uuid.UUIDType(),
+            nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('plan_model') as batch_op:
+        batch_op.drop_column('lease_token')
+        batch_op.drop_column('lease_expiry')
+        batch_op.drop_column('lease_owner')
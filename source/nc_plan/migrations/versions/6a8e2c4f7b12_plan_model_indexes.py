@@ -0,0 +1,31 @@
+"""plan_model indexes
+
+Revision ID: 6a8e2c4f7b12
+Revises: 0f5c3b1d2a01
+Create Date: 2026-10-18 13:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a8e2c4f7b12'
+down_revision = '0f5c3b1d2a01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_plan_model_user_create_stamp', 'plan_model',
+        ['user', 'create_stamp', 'id'], unique=False)
+    op.create_index('ix_plan_model_status_edit_stamp', 'plan_model',
+        ['status', 'edit_stamp'], unique=False)
+    op.create_index('ix_plan_model_create_stamp', 'plan_model',
+        ['create_stamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_plan_model_create_stamp', table_name='plan_model')
+    op.drop_index('ix_plan_model_status_edit_stamp', table_name='plan_model')
+    op.drop_index('ix_plan_model_user_create_stamp', table_name='plan_model')
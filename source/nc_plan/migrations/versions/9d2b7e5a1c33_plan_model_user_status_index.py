@@ -0,0 +1,25 @@
+"""plan_model user status index
+
+Revision ID: 9d2b7e5a1c33
+Revises: 6a8e2c4f7b12
+Create Date: 2026-10-18 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2b7e5a1c33'
+down_revision = '6a8e2c4f7b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_plan_model_user_status', 'plan_model',
+        ['user', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_plan_model_user_status', table_name='plan_model')
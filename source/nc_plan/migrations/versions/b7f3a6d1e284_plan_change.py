@@ -0,0 +1,38 @@
+"""plan_change
+
+Revision ID: b7f3a6d1e284
+Revises: 4c1e8f2a9b57
+Create Date: 2026-10-18 17:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7f3a6d1e284'
+down_revision = '4c1e8f2a9b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('plan_change',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sqlalchemy_utils.types.uuid.UUIDType(),
+            nullable=True),
+        sa.Column('user', sqlalchemy_utils.types.uuid.UUIDType(),
+            nullable=True),
+        sa.Column('status', sa.Unicode(length=20), nullable=True),
+        sa.Column('edit_stamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True
+    )
+    op.create_index('ix_plan_change_user_id', 'plan_change',
+        ['user', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_plan_change_user_id', table_name='plan_change')
+    op.drop_table('plan_change')
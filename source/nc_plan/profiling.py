@@ -0,0 +1,112 @@
+import cProfile
+import datetime
+import functools
+import hmac
+import itertools
+import os
+import random
+import re
+import time
+from flask import current_app, request
+from .metrics import request_metrics
+
+
+# Sequence number of the dumps of the current process.
+counter = itertools.count()
+
+
+def profile_requested(
+        config):
+    """Return whether the current request must be profiled
+
+    Requests are profiled when they pass the configured token in the
+    profiling header, or when they are sampled.
+    """
+    token = config["PROFILE_TOKEN"]
+
+    if token is not None:
+        header = request.headers.get(config["PROFILE_HEADER"])
+
+        # compare_digest only accepts ASCII strings.
+        if header is not None and hmac.compare_digest(
+                header.encode("utf8"), token.encode("utf8")):
+            return True
+
+    rate = config["PROFILE_SAMPLE_RATE"]
+
+    return rate > 0 and random.random() < rate
+
+
+def dump_name(
+        duration):
+    """Return the name of the dump of the profile of the current request
+
+    Names sort in the order in which dumps are written and contain the
+    endpoint, the number of SQL statements executed and the duration.
+    """
+    measurements = request_metrics()
+    endpoint = re.sub(r"[^A-Za-z0-9_.]", "_", request.endpoint or "none")
+
+    return "{}-{}-{:06d}-{}-{}-{}sql-{}ms.prof".format(
+        datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S%f"),
+        os.getpid(), next(counter) % 1000000, endpoint, request.method,
+        measurements.nr_statements if measurements is not None else 0,
+        int(1000 * duration))
+
+
+def remove_old_dumps(
+        directory,
+        max_nr_dumps):
+    """Remove the oldest dumps in *directory*, keeping at most
+    *max_nr_dumps*"""
+    names = sorted(name for name in os.listdir(directory)
+        if name.endswith(".prof"))
+
+    for name in names[:max(len(names) - max_nr_dumps, 0)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            # Removed by another process.
+            pass
+
+
+def profiled(
+        view):
+    """Decorator profiling the resource methods of the API, on demand
+
+    Profiling is enabled by PROFILE_ENABLED. Profiles are written in
+    pstats format (see cProfile), to a ring of at most PROFILE_MAX_DUMPS
+    files in PROFILE_DIRECTORY. The name of the dump is passed in the
+    X-Profile-Dump response header. When profiling is disabled, requests
+    are passed on as is.
+    """
+
+    @functools.wraps(view)
+    def wrapper(
+            *args,
+            **kwargs):
+
+        config = current_app.config
+
+        if not config["PROFILE_ENABLED"] or not profile_requested(config):
+            return view(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+
+        try:
+            response = profile.runcall(view, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            directory = config["PROFILE_DIRECTORY"]
+            name = dump_name(duration)
+
+            os.makedirs(directory, exist_ok=True)
+            profile.dump_stats(os.path.join(directory, name))
+            remove_old_dumps(directory, config["PROFILE_MAX_DUMPS"])
+
+        response.headers["X-Profile-Dump"] = name
+
+        return response
+
+    return wrapper
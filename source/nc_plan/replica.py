@@ -0,0 +1,185 @@
+import functools
+import itertools
+import time
+import flask_sqlalchemy
+import sqlalchemy
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, orm
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.expression import Select
+from .engine import configure_engine, engine_options
+
+
+class ReplicaState:
+    """Read replica engines of an application, and their health"""
+
+    def __init__(self,
+            engines,
+            retry_interval):
+        self.engines = engines
+        self.retry_interval = retry_interval
+        self.unhealthy_until = {}
+        self.counter = itertools.count()
+
+
+    def next_engine(self):
+        """Return the next healthy replica engine, round-robin, or None
+        if no replica is healthy"""
+        now = time.monotonic()
+
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self.counter) % len(self.engines)]
+
+            if self.unhealthy_until.get(engine, 0) <= now:
+                return engine
+
+        return None
+
+
+    def mark_unhealthy(self,
+            engine):
+        """Skip *engine* for the configured retry interval"""
+        self.unhealthy_until[engine] = \
+            time.monotonic() + self.retry_interval
+
+
+class ReadReplicas:
+    """Routing of reads to read replicas
+
+    Statements issued by resource methods decorated with read_only are
+    routed to one of the read replicas configured in
+    SQLALCHEMY_READ_REPLICA_URIS, round-robin. Replicas that fail are
+    skipped for READ_REPLICA_RETRY_INTERVAL seconds. Once a request
+    writes, all its statements go to the primary database.
+
+    Replicas may lag behind the primary database. Representations read
+    from a replica just after a write may be outdated, also in the cache,
+    until they expire.
+    """
+
+    def __init__(self,
+            app=None):
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self,
+            app):
+        engines = []
+
+        for uri in app.config["SQLALCHEMY_READ_REPLICA_URIS"]:
+            config = dict(app.config, SQLALCHEMY_DATABASE_URI=uri)
+            engine = sqlalchemy.create_engine(uri, **engine_options(config))
+            configure_engine(app, engine)
+            engines.append(engine)
+
+        state = ReplicaState(engines,
+            app.config["READ_REPLICA_RETRY_INTERVAL"])
+
+        for engine in engines:
+            self.watch(state, engine)
+
+        app.extensions["read_replicas"] = state
+
+
+    def watch(self,
+            state,
+            engine):
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(
+                context):
+            # Failure to connect, or connection lost.
+            if context.connection is None or context.is_disconnect:
+                state.mark_unhealthy(engine)
+
+
+    @property
+    def state(self):
+        return current_app.extensions["read_replicas"]
+
+
+    def engine(self,
+            clause):
+        """Return the replica engine to execute *clause* on, or None if
+        it must be executed on the primary database"""
+        if not has_request_context() or not g.get("read_only", False):
+            return None
+
+        if not isinstance(clause, Select):
+            # Writes, and everything that follows them in the request,
+            # go to the primary database.
+            g.read_only = False
+            return None
+
+        if "replica" not in g:
+            # Use the same replica for all reads of a request.
+            g.replica = self.state.next_engine()
+
+        return g.replica
+
+
+    def read_only(self,
+            method):
+        """Decorator for resource methods that only read
+
+        When a replica fails while handling the request, the request is
+        handled again, using the primary database.
+        """
+
+        @functools.wraps(method)
+        def wrapper(
+                *args,
+                **kwargs):
+
+            if not self.state.engines:
+                return method(*args, **kwargs)
+
+            # Reads of streamed responses, after returning, are routed
+            # as well.
+            g.read_only = True
+
+            try:
+                return method(*args, **kwargs)
+            except OperationalError:
+                replica = g.pop("replica", None)
+
+                if replica is None:
+                    raise
+
+                from . import db
+
+                self.state.mark_unhealthy(replica)
+                db.session.rollback()
+                g.read_only = False
+
+                return method(*args, **kwargs)
+
+        return wrapper
+
+
+replicas = ReadReplicas()
+
+
+class RoutingSession(flask_sqlalchemy.SignallingSession):
+
+    def get_bind(self,
+            mapper=None,
+            clause=None):
+
+        if not self._flushing:
+            engine = replicas.engine(clause)
+
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause)
+
+
+class SQLAlchemy(flask_sqlalchemy.SQLAlchemy):
+    """Flask-SQLAlchemy extension whose sessions route reads to read
+    replicas"""
+
+    def create_session(self,
+            options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
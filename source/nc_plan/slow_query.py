@@ -0,0 +1,199 @@
+import json
+import logging
+import threading
+import time
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+
+
+logger = logging.getLogger("nc_plan.slow_query")
+
+
+class RateLimiter:
+    """At most *limit* events per *interval* seconds
+
+    The number of events suppressed since the last event allowed is
+    kept, so it can be reported.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.window_start = 0.0
+        self.nr_events = 0
+        self.nr_suppressed = 0
+
+
+    def allow(self,
+            limit,
+            interval):
+        """Return the number of events suppressed before this one, or
+        None if this event is suppressed"""
+        with self.lock:
+            now = time.monotonic()
+
+            if now - self.window_start >= interval:
+                self.window_start = now
+                self.nr_events = 0
+
+            if self.nr_events >= limit:
+                self.nr_suppressed += 1
+                return None
+
+            self.nr_events += 1
+            nr_suppressed = self.nr_suppressed
+            self.nr_suppressed = 0
+
+            return nr_suppressed
+
+
+def redact(
+        parameters):
+    """Return *parameters*, with each value replaced by the name of its
+    type"""
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__
+            for name, value in parameters.items()}
+
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+
+    return type(parameters).__name__
+
+
+def origin():
+    """Return the resource method handling the current request, or None"""
+    if not has_request_context() or request.endpoint is None:
+        return None
+
+    view = current_app.view_functions.get(request.endpoint)
+    view_class = getattr(view, "view_class", None)
+
+    if view_class is None:
+        return request.endpoint
+
+    return "{}.{}".format(view_class.__name__, request.method.lower())
+
+
+def explain(
+        cursor,
+        dialect,
+        statement,
+        parameters):
+    """Return the plan of *statement*, as a list of rows
+
+    The statement is explained on the connection of *cursor*, using a new
+    DBAPI cursor, so no events are fired. Statements are not executed. On
+    server databases, the statement is explained in a savepoint, so a
+    failure does not abort the transaction.
+    """
+    if not statement.lstrip().upper().startswith(
+            ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+        return None
+
+    explain_cursor = cursor.connection.cursor()
+
+    try:
+        if dialect.name == "sqlite":
+            explain_cursor.execute("EXPLAIN QUERY PLAN " + statement,
+                parameters)
+        else:
+            explain_cursor.execute("SAVEPOINT slow_query_explain")
+
+            try:
+                explain_cursor.execute("EXPLAIN " + statement, parameters)
+            except Exception:
+                explain_cursor.execute(
+                    "ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+
+            explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+
+        return [[str(value) for value in row]
+            for row in explain_cursor.fetchall()]
+    finally:
+        explain_cursor.close()
+
+
+def log_slow_queries(
+        app,
+        engine):
+    """Log the statements executed by *engine* that take longer than
+    SLOW_QUERY_THRESHOLD seconds
+
+    Each statement is logged as a JSON record, containing the statement,
+    the types of its parameters, the resource method executing it, its
+    duration and the plan of the backend. At most SLOW_QUERY_LOG_LIMIT
+    statements are logged per SLOW_QUERY_LOG_INTERVAL seconds. The number
+    of statements not logged is reported in the next record.
+    """
+    config = app.config
+    limiter = RateLimiter()
+
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+            connection,
+            cursor,
+            statement,
+            parameters,
+            context,
+            executemany):
+        connection.info.setdefault("slow_query_start", []).append(
+            (context, time.perf_counter()))
+
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+            connection,
+            cursor,
+            statement,
+            parameters,
+            context,
+            executemany):
+        _, start = connection.info["slow_query_start"].pop()
+        duration = time.perf_counter() - start
+        threshold = config["SLOW_QUERY_THRESHOLD"]
+
+        if threshold is None or duration < threshold:
+            return
+
+        nr_suppressed = limiter.allow(config["SLOW_QUERY_LOG_LIMIT"],
+            config["SLOW_QUERY_LOG_INTERVAL"])
+
+        if nr_suppressed is None:
+            return
+
+        record = {
+            "event": "slow_query",
+            "duration": duration,
+            "threshold": threshold,
+            "statement": statement,
+            "parameters": redact(parameters[0]
+                if executemany and parameters else parameters),
+            "executemany": executemany,
+            "origin": origin(),
+            "suppressed": nr_suppressed,
+        }
+
+        if config["SLOW_QUERY_EXPLAIN"]:
+            try:
+                record["plan"] = explain(cursor, connection.dialect,
+                    statement, parameters[0] if executemany else parameters)
+            except Exception as exception:
+                record["plan_error"] = str(exception)
+
+        logger.warning("%s", json.dumps(record), extra={"slow_query": record})
+
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(
+            context):
+        # A statement failed: after_cursor_execute is not called (see
+        # metrics.watch_engine).
+        if context.connection is None:
+            return
+
+        starts = context.connection.info.get("slow_query_start")
+
+        if starts and starts[-1][0] is context.execution_context:
+            starts.pop()
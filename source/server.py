@@ -1,7 +1,21 @@
 import os
 from nc_plan import create_app
+from nc_plan.engine import dispose_engines
 
 
 os.environ["NC_CONFIGURATION"] = \
     os.environ.get("NC_CONFIGURATION") or "production"
 app = create_app(os.getenv("NC_CONFIGURATION"))
+
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    # Not running in uWSGI
+    pass
+else:
+    # uWSGI loads the app in the master process, before forking the
+    # workers (see uwsgi.ini). Each worker opens its own connections.
+    @postfork
+    def dispose_inherited_engines():
+        dispose_engines(app)
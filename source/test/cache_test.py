@@ -0,0 +1,190 @@
+import time
+import unittest
+import uuid
+from flask import g, json
+from nc_plan import cache, create_app, db
+from nc_plan.caching import SimpleBackend
+
+
+class SimpleBackendTestCase(unittest.TestCase):
+
+
+    def test_get_set_delete(self):
+        backend = SimpleBackend(size=100, ttl=60)
+
+        self.assertEqual(backend.get("a"), None)
+
+        backend.set("a", b"1234")
+
+        self.assertEqual(backend.get("a"), b"1234")
+
+        backend.delete("a")
+
+        self.assertEqual(backend.get("a"), None)
+        self.assertEqual(backend.nr_bytes, 0)
+
+
+    def test_evict_least_recently_used(self):
+        backend = SimpleBackend(size=10, ttl=60)
+
+        backend.set("a", b"1234")
+        backend.set("b", b"1234")
+        backend.get("a")
+        backend.set("c", b"1234")
+
+        self.assertEqual(backend.get("a"), b"1234")
+        self.assertEqual(backend.get("b"), None)
+        self.assertEqual(backend.get("c"), b"1234")
+        self.assertEqual(backend.nr_bytes, 8)
+
+        # Too large to cache.
+        backend.set("d", 11 * b"1")
+
+        self.assertEqual(backend.get("d"), None)
+
+
+    def test_expire(self):
+        backend = SimpleBackend(size=10, ttl=0.01)
+
+        backend.set("a", b"1234")
+        time.sleep(0.02)
+
+        self.assertEqual(backend.get("a"), None)
+        self.assertEqual(backend.nr_bytes, 0)
+
+
+class CacheTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def post_plan(self):
+        payload = {
+            "user": self.user,
+            "pathname": "/some_path/plan.png",
+            "status": "uploaded",
+        }
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": payload}),
+            content_type="application/json")
+        data = json.loads(response.data.decode("utf8"))
+
+        return data["plan"]["_links"]["self"]
+
+
+    def get(self,
+            uri):
+        response = self.client.get(uri)
+
+        self.assertEqual(response.status_code, 200)
+
+        return json.loads(response.data.decode("utf8"))
+
+
+    def test_get_plan(self):
+        uri = self.post_plan()
+
+        data1 = self.get(uri)
+        data2 = self.get(uri)
+
+        self.assertEqual(data1, data2)
+        self.assertEqual(cache.statistics(), {"hits": 1, "misses": 1})
+
+        self.client.patch(uri,
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+        data = self.get(uri)
+
+        self.assertEqual(data["plan"]["status"], "registered")
+
+
+    def test_get_plans(self):
+        uris = ["/plans", "/plans/{}".format(self.user)]
+        self.post_plan()
+
+        for uri in uris:
+            self.assertEqual(len(self.get(uri)["plans"]), 1)
+            self.assertEqual(len(self.get(uri)["plans"]), 1)
+
+        self.assertEqual(cache.statistics()["hits"], 2)
+
+        self.post_plan()
+
+        for uri in uris:
+            self.assertEqual(len(self.get(uri)["plans"]), 2)
+
+        self.client.patch("/plans/{}".format(self.user),
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+
+        for uri in uris:
+            self.assertEqual([plan["status"] for plan in
+                self.get(uri)["plans"]], 2 * ["registered"])
+
+
+    def test_get_plan_concurrent_patch(self):
+        uri = self.post_plan()
+        user, id = uri.split("/")[-2:]
+
+        # A reader creates the key and selects the plan, before a writer
+        # commits and invalidates, and stores the outdated representation
+        # afterwards.
+        key = cache.plan_key(user, id)
+        data = self.get(uri)
+        self.client.patch(uri,
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+        cache.set(key, data, "etag", None)
+
+        self.assertEqual(self.get(uri)["plan"]["status"], "registered")
+
+
+    def test_replica_ttl(self):
+        self.app.config["PLAN_CACHE_REPLICA_TTL"] = 0.01
+
+        with self.app.test_request_context():
+            g.replica = object()
+            cache.set("replica", {}, "etag", None)
+            g.replica = None
+            cache.set("primary", {}, "etag", None)
+
+        time.sleep(0.02)
+
+        self.assertEqual(cache.get("replica"), None)
+        self.assertNotEqual(cache.get("primary"), None)
+
+
+    def test_get_cached_plan_if_none_match(self):
+        uri = self.post_plan()
+        etag = self.client.get(uri).headers["ETag"]
+
+        response = self.client.get(uri, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(cache.statistics()["hits"], 1)
+
+
+    def test_statistics(self):
+        data = self.get("/cache")
+
+        self.assertEqual(data, {"hits": 0, "misses": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import gzip
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db
+
+
+class CompressionTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def post_plans(self,
+            nr_plans):
+        payloads = [
+            {
+                "user": str(self.user),
+                "pathname": "/some_path/plan{}.png".format(i),
+                "status": "uploaded",
+            } for i in range(nr_plans)
+        ]
+        response = self.client.post("/plans",
+            data=json.dumps({"plans": payloads}),
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+
+
+    def test_compress(self):
+        self.post_plans(50)
+
+        response = self.client.get("/plans",
+            headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertTrue("Accept-Encoding" in response.vary)
+        self.assertEqual(int(response.headers["Content-Length"]),
+            len(response.data))
+
+        data = json.loads(gzip.decompress(response.data).decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 50)
+
+        # Compressed representations have their own tag.
+        etag = response.headers["ETag"]
+
+        self.assertTrue(etag.endswith('-gzip"'))
+        self.assertNotEqual(etag, self.client.get("/plans").headers["ETag"])
+
+        # Not modified responses have no body to compress.
+        response = self.client.get("/plans",
+            headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": etag,
+            })
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertFalse("Content-Encoding" in response.headers)
+
+        # Edits are conditional on the tag of the plan, compressed or not.
+        uri = data["plans"][0]["_links"]["self"]
+        etag = self.client.get(uri).headers["ETag"]
+        response = self.client.patch(uri,
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json",
+            headers={"If-Match": etag[:-1] + '-gzip"'})
+
+        self.assertEqual(response.status_code, 200)
+
+
+    def test_compress_streamed(self):
+        self.post_plans(50)
+
+        response = self.client.get("/plans?stream=true",
+            headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+
+        data = json.loads(gzip.decompress(response.data).decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 50)
+
+
+    def test_do_not_compress(self):
+        self.post_plans(50)
+
+        # Not accepted by the client.
+        response = self.client.get("/plans")
+
+        self.assertFalse("Content-Encoding" in response.headers)
+        self.assertEqual(len(json.loads(response.data)["plans"]), 50)
+
+        # Too small.
+        response = self.client.get("/ping",
+            headers={"Accept-Encoding": "gzip"})
+
+        self.assertFalse("Content-Encoding" in response.headers)
+        self.assertEqual(json.loads(response.data), {"response": "pong"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from sqlalchemy.pool import QueuePool
+from nc_plan import create_app, db
+from nc_plan.configuration import Configuration
+from nc_plan.engine import dispose_engines, engine_options
+from nc_plan.metrics import TimedQueuePool
+
+
+class EngineTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+
+    def tearDown(self):
+        db.session.remove()
+        self.app_context.pop()
+
+
+    def config(self,
+            uri):
+        config = {
+            name: getattr(Configuration, name) for name in dir(Configuration)
+                if name.isupper()
+        }
+        config["SQLALCHEMY_DATABASE_URI"] = uri
+
+        return config
+
+
+    def test_engine_options_server_database(self):
+        options = engine_options(self.config("postgresql://host/plan"))
+
+        self.assertEqual(options["poolclass"], TimedQueuePool)
+        self.assertEqual(options["pool_size"],
+            Configuration.DATABASE_POOL_SIZE)
+        self.assertEqual(options["max_overflow"],
+            Configuration.DATABASE_MAX_OVERFLOW)
+        self.assertEqual(options["pool_pre_ping"],
+            Configuration.DATABASE_POOL_PRE_PING)
+        self.assertEqual(options["pool_recycle"],
+            Configuration.DATABASE_POOL_RECYCLE)
+
+
+    def test_engine_options_sqlite_database(self):
+        options = engine_options(self.config("sqlite:////tmp/plan.sqlite"))
+
+        self.assertEqual(options["poolclass"], TimedQueuePool)
+        self.assertEqual(options["connect_args"],
+            {"check_same_thread": False})
+        self.assertTrue("pool_pre_ping" not in options)
+
+        self.assertEqual(engine_options(self.config("sqlite://")), {})
+
+
+    def test_sqlite_pragmas(self):
+        self.assertTrue(isinstance(db.engine.pool, QueuePool))
+
+        with db.engine.connect() as connection:
+            self.assertEqual(
+                connection.execute("PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(
+                connection.execute("PRAGMA synchronous").scalar(), 1)
+            self.assertEqual(
+                connection.execute("PRAGMA busy_timeout").scalar(),
+                Configuration.SQLITE_PRAGMAS["busy_timeout"])
+
+
+    def test_dispose_engines(self):
+        with db.engine.connect() as connection:
+            connection.execute("SELECT 1")
+
+        self.assertEqual(db.engine.pool.checkedin(), 1)
+
+        dispose_engines(self.app)
+
+        self.assertEqual(db.engine.pool.checkedin(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
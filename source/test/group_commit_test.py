@@ -0,0 +1,270 @@
+import threading
+import time
+import unittest
+import uuid
+from flask import json
+from werkzeug.exceptions import BadRequest
+from nc_plan import create_app, db
+from nc_plan.api.model import change_table, plan_table
+
+
+class GroupCommitTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app.config["GROUP_COMMIT_ENABLED"] = True
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+
+
+    def tearDown(self):
+        self.app.extensions["group_commit"].stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def plan_payload(self,
+            i):
+        return {
+            "user": str(self.user),
+            "pathname": "/some_path/plan{}.png".format(i),
+            "status": "uploaded",
+        }
+
+
+    def group_sizes(self):
+        """Return the number of groups committed and the number of writes
+        in them"""
+        histogram = self.app.extensions["metrics"].histograms.get(
+            ("nc_plan_group_commit_size", ()))
+
+        if histogram is None:
+            return 0, 0
+
+        return sum(histogram[1]), histogram[2]
+
+
+    def concurrently(self,
+            functions):
+        """Call *functions*, each in its own thread, and return their
+        results"""
+        results = [None] * len(functions)
+
+        def call(
+                i):
+            results[i] = functions[i]()
+
+        threads = [threading.Thread(target=call, args=(i,))
+            for i in range(len(functions))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return results
+
+
+    def test_post_plan(self):
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": self.plan_payload(0)}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+        self.assertEqual(response.status_code, 201, data)
+
+        plan = json.loads(data)["plan"]
+        self.assertEqual(plan["pathname"], "/some_path/plan0.png")
+
+        response = self.client.get(plan["_links"]["self"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode("utf8"))["plan"],
+            plan)
+
+        self.assertEqual(self.group_sizes(), (1, 1))
+
+
+    def test_post_plan_alone(self):
+        # A write is committed as soon as each request has submitted one.
+        self.app.extensions["group_commit"].window = 10
+        start = time.monotonic()
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": self.plan_payload(0)}),
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(time.monotonic() - start, 5)
+
+
+    def test_concurrent_writes(self):
+        # Collect all writes in a single group.
+        self.app.extensions["group_commit"].window = 5
+        nr_plans = 8
+        barrier = threading.Barrier(nr_plans)
+
+        @self.app.before_request
+        def wait_for_other_requests():
+            barrier.wait()
+
+        def post(
+                i):
+            def send():
+                response = self.app.test_client().post("/plans",
+                    data=json.dumps({"plan": self.plan_payload(i)}),
+                    content_type="application/json")
+                return response.status_code, \
+                    json.loads(response.data.decode("utf8"))
+
+            return send
+
+        results = self.concurrently([post(i) for i in range(nr_plans)])
+
+        self.assertEqual([status for status, _ in results], [201] * nr_plans)
+        self.assertEqual(sorted(data["plan"]["pathname"]
+                for _, data in results),
+            sorted("/some_path/plan{}.png".format(i)
+                for i in range(nr_plans)))
+        self.assertEqual(db.session.execute(
+            db.select([db.func.count()]).select_from(plan_table)).scalar(),
+            nr_plans)
+        self.assertEqual(db.session.execute(
+            db.select([db.func.count()]).select_from(change_table)).scalar(),
+            nr_plans)
+
+        self.assertEqual(self.group_sizes(), (1, nr_plans))
+
+
+    def test_failing_write(self):
+        # Writes failing do not affect the other writes in the group.
+        committer = self.app.extensions["group_commit"]
+        committer.window = 0.5
+        id = uuid.uuid4()
+
+        def insert(
+                pathname):
+            def write():
+                db.session.execute(plan_table.insert().values(
+                    id=uuid.uuid4(), user=self.user, pathname=pathname,
+                    status="uploaded"))
+                return pathname
+
+            return lambda: committer.submit(write)
+
+        def fail():
+            db.session.execute(plan_table.insert().values(
+                id=id, user=self.user, pathname="failed", status="uploaded"))
+            raise BadRequest("Failed")
+
+        def submit_fail():
+            try:
+                committer.submit(fail)
+            except BadRequest as exception:
+                return exception
+
+        # Each thread submits a write.
+        for _ in range(3):
+            committer.enter()
+
+        results = self.concurrently(
+            [insert("a"), submit_fail, insert("b")])
+
+        for _ in range(3):
+            committer.leave()
+
+        self.assertEqual(results[0], "a")
+        self.assertTrue(isinstance(results[1], BadRequest))
+        self.assertEqual(results[2], "b")
+        self.assertEqual(sorted(row.pathname for row in db.session.execute(
+            plan_table.select())), ["a", "b"])
+
+
+    def test_failing_commit(self):
+        committer = self.app.extensions["group_commit"]
+        metrics = self.app.extensions["metrics"]
+        observe = metrics.observe
+
+        def fail(
+                *args,
+                **kwargs):
+            raise OSError("Failed")
+
+        # Failing to record the metrics does not affect the writes, and
+        # the committing thread keeps running.
+        metrics.observe = fail
+
+        try:
+            self.assertEqual(committer.submit(lambda: 1), 1)
+        finally:
+            metrics.observe = observe
+
+        self.assertEqual(committer.submit(lambda: 2), 2)
+
+        # Neither does failing to roll back. The session is replaced.
+        def fail_write():
+            db.session().rollback = fail
+            raise BadRequest("Failed")
+
+        with self.assertRaises(OSError):
+            committer.submit(fail_write)
+
+        self.assertEqual(committer.submit(lambda: 3), 3)
+
+
+    def test_timeout(self):
+        committer = self.app.extensions["group_commit"]
+        committer.timeout = 0.1
+        done = threading.Event()
+
+        with self.assertRaises(TimeoutError):
+            committer.submit(lambda: done.wait(10))
+
+        done.set()
+        committer.timeout = 10
+
+        self.assertEqual(committer.submit(lambda: 1), 1)
+
+
+    def test_stop(self):
+        committer = self.app.extensions["group_commit"]
+
+        self.assertEqual(committer.submit(lambda: 1), 1)
+
+        committer.stop()
+
+        self.assertFalse(committer.thread.is_alive())
+
+        with self.assertRaises(RuntimeError):
+            committer.submit(lambda: 2)
+
+
+    def test_patch_plan(self):
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": self.plan_payload(0)}),
+            content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        plan = json.loads(response.data.decode("utf8"))["plan"]
+
+        response = self.client.patch(plan["_links"]["self"],
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+        self.assertEqual(response.status_code, 200, data)
+        self.assertEqual(json.loads(data)["plan"]["status"], "registered")
+
+        response = self.client.patch("/plans/{}/{}".format(
+                self.user, uuid.uuid4()),
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import datetime
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db, json_provider
+from nc_plan.api.model import plan_table
+from nc_plan.json_provider import orjson, OrjsonProvider, StdlibProvider
+
+
+class RecordingProvider(StdlibProvider):
+    """Provider recording the objects it encodes"""
+
+    def __init__(self):
+        self.dumped = []
+
+
+    def dumps(self,
+            obj):
+        self.dumped.append(obj)
+
+        return super().dumps(obj)
+
+
+class JSONProviderTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.data = {
+            "plans": [
+                {
+                    "id": uuid.UUID("c4b5a2e8-3f1d-4a36-9d2b-7e5a1c33f0a1"),
+                    "pathname": "/some_path/plän.png",
+                    "edit_stamp": datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+                    "create_stamp": datetime.datetime(2020, 1, 2, 3, 4, 5),
+                    "layer_name": None,
+                    "count": 5,
+                    "valid": True,
+                },
+            ],
+        }
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def test_stdlib(self):
+        provider = StdlibProvider()
+        dumped = provider.dumps(self.data)
+
+        self.assertEqual(dumped,
+            '{"plans":[{'
+                '"id":"c4b5a2e8-3f1d-4a36-9d2b-7e5a1c33f0a1",'
+                '"pathname":"/some_path/plän.png",'
+                '"edit_stamp":"2020-01-02T03:04:05.000006",'
+                '"create_stamp":"2020-01-02T03:04:05",'
+                '"layer_name":null,'
+                '"count":5,'
+                '"valid":true'
+            '}]}')
+        self.assertEqual(provider.loads(dumped.encode("utf8")),
+            json.loads(dumped))
+
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        # Same output as the fallback.
+        self.assertEqual(OrjsonProvider().dumps(self.data),
+            StdlibProvider().dumps(self.data))
+
+        data = {None: 1, "uploaded": 2, 3: [None]}
+
+        self.assertEqual(OrjsonProvider().dumps(data),
+            StdlibProvider().dumps(data))
+
+
+    def test_providers_responses(self):
+        # Plans without status are counted under a null key.
+        db.session.execute(plan_table.insert().values(
+            id=uuid.uuid4(), user=uuid.uuid4(),
+            pathname="/some_path/plan.png"))
+        db.session.commit()
+
+        providers = [StdlibProvider()]
+
+        if orjson is not None:
+            providers.append(OrjsonProvider())
+
+        bodies = []
+
+        for provider in providers:
+            self.app.extensions["json_provider"] = provider
+            response = self.client.get("/plans/stats")
+
+            self.assertEqual(response.status_code, 200)
+
+            bodies.append(response.data)
+
+        self.assertEqual(len(set(bodies)), 1)
+        self.assertEqual(
+            json.loads(bodies[0])["statistics"]["statuses"]["null"], 1)
+
+        # Errors handled by the app, and other JSON responses, are
+        # encoded by the provider too.
+        provider = RecordingProvider()
+        self.app.extensions["json_provider"] = provider
+
+        for uri, status_code in [("/no_such_resource", 404), ("/ping", 200)]:
+            response = self.client.get(uri)
+
+            self.assertEqual(response.status_code, status_code)
+            self.assertEqual(response.mimetype, "application/json")
+            self.assertEqual(provider.dumped[-1], json.loads(response.data))
+
+
+    def test_responses(self):
+        response = self.client.post("/plans",
+            data=json_provider.dumps({"plan": {
+                "user": uuid.uuid4(),
+                "pathname": "/some_path/plan.png",
+                "status": "uploaded",
+            }}),
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get("/plans")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(data,
+            json_provider.dumps(json_provider.loads(data)) + "\n")
+
+        response = self.client.post("/plans",
+            data="{invalid",
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
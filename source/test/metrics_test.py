@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db, metrics
+
+
+class MetricsTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def post_plan(self):
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": {
+                "user": self.user,
+                "pathname": "/some_path/plan.png",
+                "status": "uploaded",
+            }}),
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+
+
+    def metrics(self):
+        response = self.client.get("/metrics")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, data)
+        self.assertEqual(response.mimetype, "text/plain")
+
+        return data.splitlines()
+
+
+    def test_metrics(self):
+        self.post_plan()
+        self.client.get("/plans/{}".format(self.user))
+        self.client.get("/plans/{}".format(self.user))
+
+        lines = self.metrics()
+
+        self.assertTrue(
+            "# TYPE nc_plan_http_request_duration_seconds histogram"
+            in lines)
+        self.assertTrue(
+            'nc_plan_http_request_duration_seconds_count{method="GET",'
+            'endpoint="api.plans",status="200"} 2' in lines)
+        self.assertTrue(
+            'nc_plan_http_request_duration_seconds_bucket{method="POST",'
+            'endpoint="api.plans_all",status="201",le="+Inf"} 1' in lines)
+
+        # The request for the metrics is in flight.
+        self.assertTrue("nc_plan_http_requests_in_flight 1" in lines)
+
+        # Posting a plan executes statements.
+        self.assertFalse(
+            'nc_plan_sql_statements_per_request_bucket{'
+            'endpoint="api.plans_all",le="0"} 1' in lines)
+
+        # The second get is served from the cache.
+        self.assertTrue("nc_plan_cache_hits_total 1" in lines)
+        self.assertTrue(any(line.startswith(
+            "nc_plan_serialization_duration_seconds_per_request_count")
+            for line in lines))
+
+
+    def test_metrics_of_multiple_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(metrics.stop, self.app)
+        self.app.extensions["metrics"].directory = directory
+
+        # Metrics of a worker process that is not running anymore.
+        with open(os.path.join(directory, "999999999.json"), "w") as file:
+            json.dump({
+                "pid": 999999999,
+                "counters": [["nc_plan_cache_hits_total", [], 5]],
+                "gauges": [["nc_plan_http_requests_in_flight", [], 3]],
+                "histograms": [[
+                    "nc_plan_sql_statements_per_request",
+                    [["endpoint", "api.plan"]], [1, 2], [2, 0, 1], 5]],
+            }, file)
+
+        lines = self.metrics()
+
+        self.assertTrue("nc_plan_cache_hits_total 5" in lines)
+        self.assertTrue("nc_plan_http_requests_in_flight 1" in lines)
+        self.assertTrue(
+            'nc_plan_sql_statements_per_request_bucket{endpoint="api.plan",'
+            'le="2"} 2' in lines)
+        self.assertTrue(
+            'nc_plan_sql_statements_per_request_count{endpoint="api.plan"} 3'
+            in lines)
+        pathname = os.path.join(directory, "{}.json".format(os.getpid()))
+
+        self.assertTrue(os.path.exists(pathname))
+
+        # The flusher writes the metrics a last time when stopped.
+        state = self.app.extensions["metrics"]
+        os.remove(pathname)
+        metrics.stop(self.app)
+
+        self.assertFalse(state.flusher.is_alive())
+        self.assertTrue(os.path.exists(pathname))
+
+
+    def test_failed_statement(self):
+        with db.engine.connect() as connection:
+            with self.assertRaises(Exception):
+                connection.execute("SELECT * FROM no_such_table")
+
+            # The start of the failed statement is not kept.
+            self.assertEqual(connection.info["metrics_start"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import uuid
+from flask_migrate import upgrade
+from nc_plan import create_app, db
+from nc_plan.bootstrap import init_migrations
+
+
+class MigrationTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        init_migrations(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.drop_schema()
+
+
+    def tearDown(self):
+        self.drop_schema()
+        self.app_context.pop()
+
+
+    def drop_schema(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.execute("DROP TABLE IF EXISTS alembic_version")
+
+
+    def index_names(self):
+        return {index["name"] for index in
+            db.inspect(db.engine).get_indexes("plan_model")}
+
+
+    def test_upgrade_empty_database(self):
+        upgrade()
+
+        self.assertTrue("plan_model" in db.engine.table_names())
+        self.assertTrue("plan_change" in db.engine.table_names())
+        self.assertEqual(self.index_names(), {
+            "ix_plan_model_user_create_stamp",
+            "ix_plan_model_user_status",
+            "ix_plan_model_status_edit_stamp",
+            "ix_plan_model_create_stamp",
+        })
+
+
+    def test_upgrade_unversioned_database(self):
+        # Database created by db.create_all(), before indexes and
+        # migrations were introduced.
+        db.engine.execute("""
+            CREATE TABLE plan_model (
+                id CHAR(32) NOT NULL,
+                user CHAR(32),
+                pathname TEXT,
+                layer_name TEXT,
+                status VARCHAR(20),
+                create_stamp DATETIME,
+                edit_stamp DATETIME,
+                PRIMARY KEY (id)
+            )""")
+        id = uuid.uuid4().hex
+        db.engine.execute(
+            "INSERT INTO plan_model (id, status) VALUES (?, ?)",
+            id, "uploaded")
+
+        upgrade()
+
+        self.assertEqual(len(self.index_names()), 4)
+        self.assertEqual(
+            db.engine.execute("SELECT id FROM plan_model").scalar(), id)
+
+
+    def test_bootstrap_command(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["bootstrap"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue("plan_model" in db.engine.table_names())
+        self.assertTrue("plan_change" in db.engine.table_names())
+
+        # Running it again is a no-op.
+        result = runner.invoke(args=["bootstrap"])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+import threading
+import time
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db
+
+
+class PlanChangeTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app.config["PLAN_CHANGE_POLL_INTERVAL"] = 0.01
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user1 = uuid.uuid4()
+        self.user2 = uuid.uuid4()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def post_plan(self,
+            user):
+        payload = {
+            "user": user,
+            "pathname": "/some_path/plan.png",
+            "status": "uploaded",
+        }
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": payload}),
+            content_type="application/json")
+        data = json.loads(response.data.decode("utf8"))
+
+        return data["plan"]["_links"]["self"]
+
+
+    def get_changes(self,
+            query_string=""):
+        response = self.client.get("/plans/changes" + query_string)
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        return json.loads(data)
+
+
+    def test_get_changes(self):
+        uri1 = self.post_plan(self.user1)
+        uri2 = self.post_plan(self.user2)
+        self.client.patch(uri1,
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+
+        data = self.get_changes()
+        changes = data["changes"]
+
+        self.assertEqual([change["_links"]["plan"] for change in changes],
+            [uri1, uri2, uri1])
+        self.assertEqual([change["status"] for change in changes],
+            ["uploaded", "uploaded", "registered"])
+        self.assertEqual(data["cursor"], changes[-1]["id"])
+
+        # Only changes after the cursor are returned.
+        data = self.get_changes("?since={}".format(changes[0]["id"]))
+
+        self.assertEqual(len(data["changes"]), 2)
+
+        data = self.get_changes("?since={}".format(changes[-1]["id"]))
+
+        self.assertEqual(data["changes"], [])
+        self.assertEqual(data["cursor"], changes[-1]["id"])
+
+        # Changes can be filtered.
+        data = self.get_changes("?user={}&status=registered".format(
+            self.user1))
+
+        self.assertEqual(len(data["changes"]), 1)
+        self.assertEqual(data["changes"][0]["user"], str(self.user1))
+
+
+    def test_get_changes_of_batches(self):
+        payloads = [
+            {
+                "user": self.user1,
+                "pathname": "/some_path/plan{}.png".format(i),
+                "status": "uploaded",
+            } for i in range(3)
+        ]
+        self.client.post("/plans",
+            data=json.dumps({"plans": payloads}),
+            content_type="application/json")
+        self.client.patch("/plans/{}".format(self.user1),
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+
+        data = self.get_changes("?user={}".format(self.user1))
+
+        self.assertEqual([change["status"] for change in data["changes"]],
+            3 * ["uploaded"] + 3 * ["registered"])
+
+
+    def test_wait_for_changes(self):
+        self.post_plan(self.user1)
+        cursor = self.get_changes()["cursor"]
+
+        # No changes arrive while waiting.
+        data = self.get_changes("?since={}&wait=0.05".format(cursor))
+
+        self.assertEqual(data["changes"], [])
+
+
+    def test_wait_for_arriving_changes(self):
+        self.post_plan(self.user1)
+        cursor = self.get_changes()["cursor"]
+
+        def post_plan():
+            time.sleep(0.1)
+
+            with self.app.app_context():
+                self.post_plan(self.user2)
+
+        thread = threading.Thread(target=post_plan)
+        thread.start()
+
+        # The change is returned as soon as it arrives.
+        start = time.monotonic()
+        data = self.get_changes("?since={}&wait=10".format(cursor))
+        thread.join()
+
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual([change["user"] for change in data["changes"]],
+            [str(self.user2)])
+
+
+    def test_wait_for_changes_too_many_waiters(self):
+        self.app.config["PLAN_CHANGE_WAITERS_MAX"] = 1
+        self.app.config["PLAN_CHANGE_STREAM_DURATION"] = 0.05
+
+        # Streams hold a waiter slot until they are closed.
+        stream = self.client.get("/plans/changes",
+            headers={"Accept": "text/event-stream"}, buffered=False)
+
+        self.assertEqual(stream.status_code, 200)
+
+        for headers in [{}, {"Accept": "text/event-stream"}]:
+            response = self.client.get("/plans/changes?wait=1",
+                headers=headers)
+
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers["Retry-After"],
+                str(self.app.config["PLAN_CHANGE_RETRY_AFTER"]))
+
+        # Requests not waiting do not need a slot.
+        self.get_changes()
+
+        stream.close()
+
+        self.get_changes("?wait=0.05")
+
+
+    def test_stream_changes(self):
+        self.app.config["PLAN_CHANGE_STREAM_DURATION"] = 0.05
+        self.post_plan(self.user1)
+        self.post_plan(self.user2)
+
+        response = self.client.get(
+            "/plans/changes?user={}".format(self.user2),
+            headers={"Accept": "text/event-stream"})
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+        self.assertEqual(response.mimetype, "text/event-stream")
+
+        events = [event for event in data.split("\n\n")
+            if event.startswith("id: ")]
+
+        self.assertEqual(len(events), 1)
+
+        id, event, data = events[0].split("\n")
+        change = json.loads(data[len("data: "):])
+
+        self.assertEqual(id, "id: {}".format(change["id"]))
+        self.assertEqual(event, "event: change")
+        self.assertEqual(change["user"], str(self.user2))
+
+        # Resume after the last event received.
+        response = self.client.get("/plans/changes",
+            headers={
+                "Accept": "text/event-stream",
+                "Last-Event-ID": str(change["id"]),
+            })
+
+        self.assertFalse("id: " in response.data.decode("utf8"))
+
+
+    def test_get_changes_bad_request(self):
+        for query_string in ["?since=abc", "?since=-1", "?wait=abc",
+                "?wait=nan", "?wait=inf", "?user=abc", "?status=invalid"]:
+            response = self.client.get("/plans/changes" + query_string)
+
+            self.assertEqual(response.status_code, 400, query_string)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db
+
+
+class PlanConditionalTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def post_plan(self):
+        payload = {
+            "user": self.user,
+            "pathname": "/some_path/plan.png",
+            "status": "uploaded",
+        }
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": payload}),
+            content_type="application/json")
+        data = json.loads(response.data.decode("utf8"))
+
+        return data["plan"]["_links"]["self"]
+
+
+    def patch_plan(self,
+            uri,
+            payload,
+            headers=None):
+        return self.client.patch(uri,
+            data=json.dumps(payload),
+            content_type="application/json",
+            headers=headers)
+
+
+    def test_get_plan_if_none_match(self):
+        uri = self.post_plan()
+
+        response = self.client.get(uri)
+
+        self.assertEqual(response.status_code, 200)
+
+        etag = response.headers["ETag"]
+
+        self.assertTrue(etag)
+        self.assertTrue(response.headers["Last-Modified"])
+
+        response = self.client.get(uri, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.data, b"")
+
+        self.patch_plan(uri, {"status": "registered"})
+
+        response = self.client.get(uri, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+
+    def test_get_plan_if_modified_since(self):
+        uri = self.post_plan()
+
+        response = self.client.get(uri)
+        last_modified = response.headers["Last-Modified"]
+
+        response = self.client.get(uri,
+            headers={"If-Modified-Since": last_modified})
+
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(uri,
+            headers={"If-Modified-Since": "Sat, 01 Jan 2000 00:00:00 GMT"})
+
+        self.assertEqual(response.status_code, 200)
+
+
+    def test_get_plans_if_none_match(self):
+        uris = ["/plans", "/plans/{}".format(self.user)]
+        self.post_plan()
+
+        for uri in uris:
+            response = self.client.get(uri)
+
+            self.assertEqual(response.status_code, 200)
+
+            etag = response.headers["ETag"]
+            response = self.client.get(uri, headers={"If-None-Match": etag})
+
+            self.assertEqual(response.status_code, 304)
+
+            # Other query arguments select another representation.
+            response = self.client.get(uri + "?limit=1",
+                headers={"If-None-Match": etag})
+
+            self.assertEqual(response.status_code, 200)
+
+        etags = [self.client.get(uri).headers["ETag"] for uri in uris]
+        self.post_plan()
+
+        for uri, etag in zip(uris, etags):
+            response = self.client.get(uri, headers={"If-None-Match": etag})
+
+            self.assertEqual(response.status_code, 200)
+
+
+    def test_get_page_if_none_match(self):
+        uris = [self.post_plan(), self.post_plan()]
+        uri = "/plans?limit=1"
+        response = self.client.get(uri)
+        etag = response.headers["ETag"]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse("Last-Modified" in response.headers)
+
+        # Plans added to other pages do not change the page.
+        self.post_plan()
+        response = self.client.get(uri, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+        # Edits of plans in the page do.
+        self.patch_plan(uris[0], {"status": "registered"})
+        response = self.client.get(uri, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+
+    def test_get_plan_without_edit_stamp(self):
+        uri = self.post_plan()
+        db.session.execute("UPDATE plan_model SET edit_stamp = NULL")
+        db.session.commit()
+
+        for uri in [uri, "/plans"]:
+            response = self.client.get(uri)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers["ETag"])
+
+
+    def test_patch_plan_if_match(self):
+        uri = self.post_plan()
+        etag = self.client.get(uri).headers["ETag"]
+
+        response = self.patch_plan(uri, {"status": "registered"},
+            headers={"If-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+
+        new_etag = response.headers["ETag"]
+
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(self.client.get(uri).headers["ETag"], new_etag)
+
+        # Representation used is outdated.
+        response = self.patch_plan(uri, {"status": "georeferenced"},
+            headers={"If-Match": etag})
+
+        self.assertEqual(response.status_code, 412)
+
+        data = json.loads(self.client.get(uri).data.decode("utf8"))
+
+        self.assertEqual(data["plan"]["status"], "registered")
+
+
+if __name__ == "__main__":
+    unittest.main()
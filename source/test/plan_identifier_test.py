@@ -0,0 +1,155 @@
+import datetime
+import time
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db
+from nc_plan.api.identifier import convert_text_ids, TimeOrderedUUIDs
+from nc_plan.api.model import change_table, plan_table
+
+
+class PlanIdentifierTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def post_plans(self,
+            nr_plans):
+        response = self.client.post("/plans",
+            data=json.dumps({"plans": [{
+                    "user": str(uuid.uuid4()),
+                    "pathname": "/some_path/plan{}.png".format(i),
+                    "status": "uploaded",
+                } for i in range(nr_plans)]}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+        self.assertEqual(response.status_code, 201, data)
+
+        return [plan["_links"]["self"].rsplit("/", 1)[1]
+            for plan in json.loads(data)["plans"]]
+
+
+    def test_uuid7(self):
+        generate = TimeOrderedUUIDs()
+        before = time.time_ns() // 1000000
+        id = generate()
+        after = time.time_ns() // 1000000
+
+        self.assertEqual(id.version, 7)
+        self.assertEqual(id.variant, uuid.RFC_4122)
+        self.assertTrue(before <= id.int >> 80 <= after)
+
+
+    def test_uuid7_order(self):
+        generate = TimeOrderedUUIDs()
+
+        # Many ids within the same millisecond, overflowing the counter.
+        ids = [generate() for _ in range(10000)]
+
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(sorted(ids), ids)
+        self.assertEqual(sorted(id.bytes for id in ids),
+            [id.bytes for id in ids])
+
+
+    def test_post_plans_uuid4(self):
+        ids = [uuid.UUID(id) for id in self.post_plans(10)]
+
+        self.assertTrue(all(id.version == 4 for id in ids))
+
+
+    def test_post_plans_uuid7(self):
+        self.app.config["PLAN_ID_TYPE"] = "uuid7"
+        ids = [uuid.UUID(id) for id in self.post_plans(10)]
+
+        self.assertTrue(all(id.version == 7 for id in ids))
+
+        # Ids sort in the order in which the plans were created, also in
+        # the database.
+        self.assertEqual(sorted(ids), ids)
+        self.assertEqual([row.id for row in db.session.execute(
+                plan_table.select().order_by(plan_table.c.id))], ids)
+
+
+    def test_invalid_plan_id_type(self):
+        from nc_plan.configuration import TestConfiguration
+
+        class Configuration(TestConfiguration):
+            PLAN_ID_TYPE = "uuid1"
+
+        from nc_plan.configuration import configuration
+        configuration["invalid"] = Configuration
+
+        try:
+            with self.assertRaises(ValueError):
+                create_app("invalid")
+        finally:
+            del configuration["invalid"]
+
+
+    def test_convert_text_ids(self):
+        id, user = uuid.uuid4(), uuid.uuid4()
+        db.session.execute(
+            "INSERT INTO plan_model "
+            "(id, user, pathname, status, create_stamp, edit_stamp) "
+            "VALUES (:id, :user, '/some_path/plan.png', 'uploaded', "
+            ":stamp, :stamp)",
+            {"id": id.hex, "user": user.hex,
+                "stamp": datetime.datetime.utcnow()})
+        db.session.execute(
+            "INSERT INTO plan_change (plan_id, user, status) "
+            "VALUES (:id, :user, 'uploaded')",
+            {"id": id.hex, "user": str(user)})
+        db.session.commit()
+        self.post_plans(2)
+
+        counts = convert_text_ids(db.engine, batch_size=1)
+
+        self.assertEqual(counts, {
+            "plan_model.id": 1,
+            "plan_model.user": 1,
+            "plan_model.lease_token": 0,
+            "plan_change.plan_id": 1,
+            "plan_change.user": 1,
+        })
+
+        plan = db.session.execute(plan_table.select()
+            .where(plan_table.c.id == id)).first()
+        self.assertEqual(plan.user, user)
+        change = db.session.execute(change_table.select()
+            .where(change_table.c.plan_id == id)).first()
+        self.assertEqual(change.user, user)
+
+        response = self.client.get("/plans/{}/{}".format(user, id))
+        self.assertEqual(response.status_code, 200,
+            response.data.decode("utf8"))
+
+        # Converting again is a no-op.
+        counts = convert_text_ids(db.engine)
+        self.assertEqual(sum(counts.values()), 0)
+
+
+    def test_convert_ids_command(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["convert-ids"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue("plan_model.id: 0 values converted" in result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
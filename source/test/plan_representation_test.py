@@ -0,0 +1,176 @@
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db
+from nc_plan.api.representation import msgpack
+
+
+class PlanRepresentationTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+        self.payloads = [
+            {
+                "user": str(self.user),
+                "pathname": "/some_path/plan{}.png".format(i),
+                "status": "uploaded",
+            } for i in range(3)
+        ]
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def post_plans(self):
+        response = self.client.post("/plans",
+            data=json.dumps({"plans": self.payloads}),
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+
+
+    def test_get_plans_ndjson(self):
+        self.post_plans()
+
+        response = self.client.get("/plans/{}?limit=2".format(self.user),
+            headers={"Accept": "application/x-ndjson"})
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertTrue("Accept" in response.vary)
+
+        plans = [json.loads(line) for line in data.splitlines()]
+
+        self.assertEqual(len(plans), 2)
+        self.assertEqual(plans[0]["user"], str(self.user))
+
+        # Links of the page are passed in a header.
+        self.assertTrue('rel="next"' in response.headers["Link"])
+
+
+    def test_get_plan_ndjson(self):
+        self.post_plans()
+
+        response = self.client.get("/plans/{}".format(self.user))
+        uri = json.loads(response.data.decode("utf8"))["plans"][0] \
+            ["_links"]["self"]
+
+        response = self.client.get(uri,
+            headers={"Accept": "application/x-ndjson"})
+        lines = response.data.decode("utf8").splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["_links"]["self"], uri)
+
+
+    def test_stream_plans_ndjson(self):
+        self.post_plans()
+
+        response = self.client.get("/plans?stream=true",
+            headers={"Accept": "application/x-ndjson"})
+        lines = response.data.decode("utf8").splitlines()
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(sorted(json.loads(line)["pathname"]
+            for line in lines),
+            [payload["pathname"] for payload in self.payloads])
+
+
+    def test_post_plans_ndjson(self):
+        response = self.client.post("/plans",
+            data="".join(json.dumps(payload) + "\n"
+                for payload in self.payloads),
+            content_type="application/x-ndjson")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 201, "{}: {}".format(
+            response.status_code, data))
+        self.assertEqual(len(json.loads(data)["plans"]), 3)
+
+        response = self.client.post("/plans",
+            data="{invalid\n",
+            content_type="application/x-ndjson")
+
+        self.assertEqual(response.status_code, 400)
+
+
+    def test_etags(self):
+        self.post_plans()
+
+        collection_uri = "/plans/{}".format(self.user)
+        response = self.client.get(collection_uri)
+        plan_uri = json.loads(response.data.decode("utf8"))["plans"][0] \
+            ["_links"]["self"]
+
+        for uri in [collection_uri, plan_uri]:
+            response = self.client.get(uri)
+            json_etag = response.headers["ETag"]
+            response = self.client.get(uri,
+                headers={"Accept": "application/x-ndjson"})
+            ndjson_etag = response.headers["ETag"]
+
+            # Each representation has its own tag.
+            self.assertNotEqual(ndjson_etag, json_etag)
+
+            response = self.client.get(uri,
+                headers={
+                    "Accept": "application/x-ndjson",
+                    "If-None-Match": json_etag,
+                })
+
+            self.assertEqual(response.status_code, 200)
+
+            response = self.client.get(uri,
+                headers={
+                    "Accept": "application/x-ndjson",
+                    "If-None-Match": ndjson_etag,
+                })
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers["ETag"], ndjson_etag)
+
+        # Edits are conditional on the tag of any representation.
+        response = self.client.patch(plan_uri,
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json",
+            headers={"If-Match": ndjson_etag})
+
+        self.assertEqual(response.status_code, 200)
+
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        response = self.client.post("/plans",
+            data=msgpack.packb({"plans": self.payloads}),
+            content_type="application/msgpack",
+            headers={"Accept": "application/msgpack"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.mimetype, "application/msgpack")
+        self.assertEqual(len(msgpack.unpackb(response.data)["plans"]), 3)
+
+        response = self.client.get("/plans?stream=true",
+            headers={"Accept": "application/msgpack"})
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(response.data)
+
+        self.assertEqual(len(list(unpacker)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import datetime
+import itertools
+import unittest
+import uuid
+from nc_plan import create_app, db
+from nc_plan.api.model import PlanModel, statuses
+from nc_plan.api.schema import PlanSchema
+from nc_plan.api.serializer import PlanSerializer
+
+
+class PlanSerializerTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.schema = PlanSchema()
+        self.serializer = PlanSerializer()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def plans(self):
+        layer_names = ["", "my_layer", None]
+
+        return [
+            PlanModel(
+                id=uuid.uuid4(),
+                user=uuid.uuid4(),
+                pathname="/some_path/plan.png",
+                layer_name=layer_name,
+                status=status,
+                create_stamp=datetime.datetime.utcnow(),
+                edit_stamp=datetime.datetime.utcnow()
+            ) for status, layer_name in
+                itertools.product(statuses, layer_names)
+        ]
+
+
+    def test_dump(self):
+        for plan in self.plans():
+            data, errors = self.schema.dump(plan)
+
+            self.assertFalse(errors)
+            self.assertEqual(self.serializer.dump(plan), data)
+
+
+    def test_dump_many(self):
+        plans = self.plans()
+        data, errors = self.schema.dump(plans, many=True)
+
+        self.assertFalse(errors)
+        self.assertEqual(self.serializer.dump_many(plans), data)
+
+
+    def test_serialize_values(self):
+        plans = self.plans()
+        db.session.add_all(plans)
+        db.session.commit()
+
+        table = PlanModel.__table__
+        columns = [table.c[name] for name in PlanSerializer.columns]
+        rows = db.session.execute(db.select(columns)).fetchall()
+
+        self.assertEqual(len(rows), len(plans))
+
+        for row in rows:
+            plan = PlanModel.query.get(row[0])
+            data, errors = self.schema.dump(plan)
+
+            self.assertEqual(self.serializer.serialize_values(*row),
+                data["plan"])
+
+
+    def test_column_names(self):
+        self.assertEqual(PlanSerializer().column_names(),
+            PlanSerializer.columns)
+        self.assertEqual(
+            PlanSerializer(fields=("status", "pathname")).column_names(),
+            ("pathname", "status"))
+        self.assertEqual(
+            PlanSerializer(fields=("_links",)).column_names(),
+            ("id", "user", "status"))
+
+
+    def test_serialize_fields(self):
+        serializer = PlanSerializer(fields=("layer_name", "user"))
+
+        for plan in self.plans():
+            data, errors = self.schema.dump(plan)
+
+            self.assertEqual(serializer.serialize(plan), {
+                "user": data["plan"]["user"],
+                "layer_name": data["plan"]["layer_name"],
+            })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
+import datetime
 import os.path
 import unittest
 import uuid
 from flask import current_app, json
 from nc_plan import create_app, db
+from nc_plan.api.model import change_table, PlanModel
 from nc_plan.api.schema import *
 
 
@@ -88,6 +90,292 @@ class PlanTestCase(unittest.TestCase):
         self.assertEqual(len(plans), 2)
 
 
+    def test_get_all_plans_paged(self):
+        self.post_plans()
+
+        response = self.client.get("/plans?limit=1")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertTrue("plans" in data)
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(data["plans"][0]["pathname"], "/some_path/plan1.png")
+
+        self.assertTrue("_links" in data)
+
+        links = data["_links"]
+
+        self.assertTrue("self" in links)
+        self.assertTrue("next" in links)
+
+        response = self.client.get(links["next"])
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(data["plans"][0]["pathname"], "/some_path/plan2.png")
+        self.assertTrue("next" not in data["_links"])
+
+
+    def test_get_user_plans_paged(self):
+        self.post_plans()
+
+        response = self.client.get("/plans/{}?limit=10".format(self.user1))
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(data["plans"][0]["user"], str(self.user1))
+        self.assertTrue("next" not in data["_links"])
+
+
+    def test_get_plans_invalid_cursor(self):
+        response = self.client.get("/plans?cursor=meh")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 400, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertTrue("message" in data)
+
+
+    def test_get_all_plans_streamed(self):
+        self.post_plans()
+        self.app.config["PLAN_STREAM_BATCH_SIZE"] = 1
+
+        response = self.client.get("/plans?stream=true")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertTrue("plans" in data)
+
+        plans = data["plans"]
+
+        self.assertEqual(len(plans), 2)
+        self.assertEqual(
+            ["georeference" in plan["_links"] for plan in plans].count(True), 1)
+
+
+    def test_get_user_plans_streamed(self):
+        self.post_plans()
+
+        response = self.client.get("/plans/{}?stream=1".format(self.user2))
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(data["plans"][0]["user"], str(self.user2))
+
+
+    def test_get_plans_projected(self):
+        self.post_plans()
+
+        for uri in ["/plans", "/plans/{}".format(self.user2)]:
+            response = self.client.get(uri + "?fields=status,pathname")
+            data = response.data.decode("utf8")
+
+            self.assertEqual(response.status_code, 200, "{}: {}".format(
+                response.status_code, data))
+
+            data = json.loads(data)
+
+            for plan in data["plans"]:
+                self.assertEqual(set(plan), {"status", "pathname"})
+
+        response = self.client.get("/plans?fields=_links&limit=1")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(set(data["plans"][0]), {"_links"})
+        self.assertTrue("fields=_links" in data["_links"]["next"])
+
+        response = self.client.get(data["_links"]["next"])
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(set(data["plans"][0]), {"_links"})
+        self.assertTrue("georeference" in data["plans"][0]["_links"])
+
+        response = self.client.get("/plans?fields=status&stream=true")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(sorted(plan["status"] for plan in data["plans"]),
+            ["registered", "uploaded"])
+
+
+    def test_get_plans_projected_invalid_field(self):
+        response = self.client.get("/plans?fields=status,id")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 400, "{}: {}".format(
+            response.status_code, data))
+
+
+    def test_get_plans_projected_no_fields(self):
+        self.post_plans()
+
+        for fields in ["", ","]:
+            for query in ["", "&limit=1", "&stream=true"]:
+                response = self.client.get(
+                    "/plans?fields={}{}".format(fields, query))
+                data = response.data.decode("utf8")
+
+                self.assertEqual(response.status_code, 400, "{}: {}".format(
+                    response.status_code, data))
+
+
+    def test_get_plans_filtered(self):
+        self.post_plans()
+
+        response = self.client.get("/plans?status=registered")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(data["plans"][0]["user"], str(self.user2))
+
+        response = self.client.get("/plans?status=registered,uploaded")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 2)
+
+        response = self.client.get("/plans?user={}".format(self.user1))
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(data["plans"][0]["user"], str(self.user1))
+
+        response = self.client.get(
+            "/plans/{}?status=registered".format(self.user1))
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(data["plans"], [])
+
+        response = self.client.get("/plans?since=2000-01-01T00:00:00")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 2)
+
+        response = self.client.get("/plans?since=2999-01-01T00:00:00")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(data["plans"], [])
+
+        # Time stamps with a time zone are converted to UTC.
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        for since, nr_plans in [
+                (now - datetime.timedelta(minutes=1), 2),
+                (now + datetime.timedelta(minutes=1), 0)]:
+            for offset in [5, -5]:
+                since = since.astimezone(datetime.timezone(
+                    datetime.timedelta(hours=offset)))
+                response = self.client.get("/plans",
+                    query_string={"since": since.isoformat()})
+                data = json.loads(response.data.decode("utf8"))
+
+                self.assertEqual(len(data["plans"]), nr_plans)
+
+
+    def test_get_plans_invalid_filter(self):
+        for query in ["status=meh", "since=meh", "user=meh"]:
+            response = self.client.get("/plans?" + query)
+            data = response.data.decode("utf8")
+
+            self.assertEqual(response.status_code, 400, "{}: {}".format(
+                response.status_code, data))
+
+
+    def test_get_statistics(self):
+        self.post_plans()
+        self.post_plans()
+
+        response = self.client.get("/plans/stats")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertTrue("statistics" in data)
+
+        statistics = data["statistics"]
+
+        self.assertEqual(statistics["statuses"], {
+            "uploaded": 2,
+            "registered": 2,
+            "georeferenced": 0,
+            "classified": 0,
+        })
+        self.assertEqual(statistics["users"], {
+            str(self.user1): {
+                "uploaded": 2,
+                "registered": 0,
+                "georeferenced": 0,
+                "classified": 0,
+            },
+            str(self.user2): {
+                "uploaded": 0,
+                "registered": 2,
+                "georeferenced": 0,
+                "classified": 0,
+            },
+        })
+
+        response = self.client.get("/plans/stats?user={}".format(self.user2))
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(data["statistics"]["statuses"]["registered"], 2)
+        self.assertEqual(data["statistics"]["statuses"]["uploaded"], 0)
+        self.assertEqual(list(data["statistics"]["users"]), [str(self.user2)])
+
+
+    def test_get_statistics_paged(self):
+        self.post_plans()
+
+        response = self.client.get("/plans/stats?limit=1")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(response.status_code, 200, data)
+        self.assertEqual(sum(data["statistics"]["statuses"].values()), 2)
+
+        users = list(data["statistics"]["users"])
+        self.assertEqual(len(users), 1)
+
+        response = self.client.get(data["_links"]["next"])
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(response.status_code, 200, data)
+        users += list(data["statistics"]["users"])
+        self.assertEqual(sorted(users), sorted([str(self.user1),
+            str(self.user2)]))
+        self.assertFalse("next" in data["_links"])
+
+        response = self.client.get("/plans/stats?cursor=meh")
+        self.assertEqual(response.status_code, 400)
+
+
     def test_get_plan(self):
         self.post_plans()
 
@@ -201,6 +489,495 @@ class PlanTestCase(unittest.TestCase):
         self.assertTrue("collection" in links)
 
 
+    def test_post_plans(self):
+        payloads = [
+            {
+                "user": self.user1,
+                "pathname": "/some_path/plan{}.png".format(i),
+                "status": "uploaded",
+            } for i in range(3)
+        ]
+        response = self.client.post("/plans",
+            data=json.dumps({"plans": payloads}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 201, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertTrue("plans" in data)
+
+        plans = data["plans"]
+
+        self.assertEqual(len(plans), 3)
+
+        for i in range(3):
+            self.assertEqual(plans[i]["pathname"],
+                "/some_path/plan{}.png".format(i))
+            self.assertTrue("self" in plans[i]["_links"])
+
+        response = self.client.get("/plans/{}".format(self.user1))
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(len(data["plans"]), 3)
+
+
+    def test_post_plans_unprocessable_entity(self):
+        payloads = [
+            {
+                "user": self.user1,
+                "pathname": "/some_path/plan.png",
+                "status": "uploaded",
+            },
+            {
+                "user": self.user1,
+                "pathname": "/some_path/plan.png",
+                "status": "invalid",
+            },
+        ]
+        response = self.client.post("/plans",
+            data=json.dumps({"plans": payloads}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 422, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(data["message"], {
+            "1": {"status": ["Not a valid choice."]}
+        })
+
+        # Nothing is written when part of the input is invalid.
+        response = self.client.get("/plans")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(data["plans"], [])
+
+
+    def test_post_plans_too_many(self):
+        self.app.config["PLAN_BULK_SIZE_MAX"] = 1
+        payload = {
+            "user": self.user1,
+            "pathname": "/some_path/plan.png",
+            "status": "uploaded",
+        }
+        response = self.client.post("/plans",
+            data=json.dumps({"plans": [payload, payload]}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 413, "{}: {}".format(
+            response.status_code, data))
+
+
+    def plan_ids(self,
+            user):
+        response = self.client.get("/plans/{}".format(user))
+        data = json.loads(response.data.decode("utf8"))
+
+        return [os.path.basename(plan["_links"]["self"])
+            for plan in data["plans"]]
+
+
+    def test_patch_plan(self):
+        self.post_plans()
+
+        plan_id = self.plan_ids(self.user1)[0]
+        uri = "/plans/{}/{}".format(self.user1, plan_id)
+        plan = PlanModel.query.get(uuid.UUID(plan_id))
+        create_stamp = plan.create_stamp
+        edit_stamp = plan.edit_stamp
+        db.session.remove()
+
+        response = self.client.patch(uri,
+            data=json.dumps({
+                "status": "registered",
+                "layer_name": "my_layer",
+                "create_stamp": "2000-01-01T00:00:00",
+            }),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertTrue("plan" in data)
+
+        plan = data["plan"]
+
+        self.assertEqual(plan["user"], str(self.user1))
+        self.assertEqual(plan["pathname"], "/some_path/plan1.png")
+        self.assertEqual(plan["layer_name"], "my_layer")
+        self.assertEqual(plan["status"], "registered")
+        self.assertEqual(plan["_links"]["self"], uri)
+        self.assertTrue("georeference" in plan["_links"])
+
+        plan = PlanModel.query.get(uuid.UUID(plan_id))
+
+        # Fields that cannot be edited are left alone.
+        self.assertEqual(plan.create_stamp, create_stamp)
+        self.assertGreater(plan.edit_stamp, edit_stamp)
+
+
+    def test_patch_plan_unprocessable_entity(self):
+        self.post_plans()
+
+        plan_id = self.plan_ids(self.user1)[0]
+        response = self.client.patch("/plans/{}/{}".format(
+                self.user1, plan_id),
+            data=json.dumps({"status": "invalid"}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 422, "{}: {}".format(
+            response.status_code, data))
+
+
+    def test_patch_plan_of_other_user(self):
+        self.post_plans()
+
+        plan_id = self.plan_ids(self.user1)[0]
+        response = self.client.patch("/plans/{}/{}".format(
+                self.user2, plan_id),
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 400, "{}: {}".format(
+            response.status_code, data))
+
+
+    def test_patch_plans(self):
+        self.post_plans()
+
+        plan_id1 = self.plan_ids(self.user1)[0]
+        plan_id2 = self.plan_ids(self.user2)[0]
+        plan_id3 = str(uuid.uuid4())
+
+        payloads = [
+            {
+                "id": plan_id1,
+                "user": self.user1,
+                "status": "registered",
+                "layer_name": "layer1",
+            },
+            {
+                "id": plan_id2,
+                "user": self.user2,
+                "status": "georeferenced",
+            },
+            {
+                "id": plan_id3,
+                "user": self.user1,
+                "status": "georeferenced",
+            },
+            {
+                # Wrong user
+                "id": plan_id2,
+                "user": self.user1,
+                "status": "classified",
+            },
+        ]
+        response = self.client.patch("/plans",
+            data=json.dumps({"plans": payloads}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(data["updated"], [plan_id1, plan_id2])
+        self.assertEqual(data["not_found"], [plan_id3, plan_id2])
+
+        response = self.client.get("/plans/{}/{}".format(
+            self.user1, plan_id1))
+        plan = json.loads(response.data.decode("utf8"))["plan"]
+
+        self.assertEqual(plan["status"], "registered")
+        self.assertEqual(plan["layer_name"], "layer1")
+
+        response = self.client.get("/plans/{}/{}".format(
+            self.user2, plan_id2))
+        plan = json.loads(response.data.decode("utf8"))["plan"]
+
+        self.assertEqual(plan["status"], "georeferenced")
+
+
+    def test_patch_plans_repeated(self):
+        self.post_plans()
+
+        plan_id = self.plan_ids(self.user1)[0]
+        payloads = [
+            {"id": plan_id, "user": self.user1, "layer_name": "layer1"},
+            {"id": plan_id, "user": self.user1, "layer_name": "layer2"},
+        ]
+        response = self.client.patch("/plans",
+            data=json.dumps({"plans": payloads}),
+            content_type="application/json")
+        data = json.loads(response.data.decode("utf8"))
+
+        # The last edit is applied.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["updated"], [plan_id])
+        self.assertEqual(data["not_found"], [])
+        self.assertEqual(
+            PlanModel.query.get(uuid.UUID(plan_id)).layer_name, "layer2")
+        self.assertEqual(db.session.execute(
+            db.select([db.func.count()]).select_from(change_table)
+            .where(change_table.c.plan_id == uuid.UUID(plan_id))).scalar(),
+            2)
+
+
+    def test_patch_plans_unprocessable_entity(self):
+        payloads = [
+            {
+                "id": str(uuid.uuid4()),
+                "status": "registered",
+            },
+        ]
+        response = self.client.patch("/plans",
+            data=json.dumps({"plans": payloads}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 422, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(data["message"], {
+            "0": {"user": ["Missing data for required field."]}
+        })
+
+
+    def test_patch_user_plans(self):
+        self.post_plans()
+        self.post_plans()
+
+        plan_ids = self.plan_ids(self.user2)
+
+        response = self.client.patch(
+            "/plans/{}?status=registered".format(self.user2),
+            data=json.dumps({"status": "georeferenced"}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(sorted(data["updated"]), sorted(plan_ids))
+
+        # Plans of other users are left alone.
+        response = self.client.get("/plans")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(sorted(plan["status"] for plan in data["plans"]),
+            2 * ["georeferenced"] + 2 * ["uploaded"])
+
+        # No plans have status registered anymore.
+        response = self.client.patch(
+            "/plans/{}?status=registered".format(self.user2),
+            data=json.dumps({"status": "classified"}),
+            content_type="application/json")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(data["updated"], [])
+
+
+    def test_patch_empty_edit(self):
+        self.post_plans()
+
+        plan_id = self.plan_ids(self.user1)[0]
+        edit_stamp = PlanModel.query.get(plan_id).edit_stamp
+        nr_changes = db.session.execute(
+            db.select([db.func.count()]).select_from(change_table)).scalar()
+        db.session.remove()
+
+        # Edits without fields that can be edited change nothing.
+        payloads = [{}, {"bogus": 1}, {"plans": [{"status": "classified"}]}]
+
+        for payload in payloads:
+            for url in [
+                    "/plans/{}".format(self.user1),
+                    "/plans/{}/{}".format(self.user1, plan_id)]:
+                response = self.client.patch(url,
+                    data=json.dumps(payload),
+                    content_type="application/json")
+                data = response.data.decode("utf8")
+
+                self.assertEqual(response.status_code, 422, "{}: {}".format(
+                    response.status_code, data))
+
+        response = self.client.patch("/plans",
+            data=json.dumps({"plans": [{"id": plan_id, "user": self.user1}]}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 422, "{}: {}".format(
+            response.status_code, data))
+
+        self.assertEqual(PlanModel.query.get(plan_id).edit_stamp, edit_stamp)
+        self.assertEqual(db.session.execute(
+                db.select([db.func.count()]).select_from(change_table)
+            ).scalar(), nr_changes)
+
+
+    def claim(self,
+            claim):
+        response = self.client.post("/plans/claim",
+            data=json.dumps({"claim": claim}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 200, "{}: {}".format(
+            response.status_code, data))
+
+        return json.loads(data)
+
+
+    def test_claim_plans(self):
+        self.post_plans()
+        self.post_plans()
+
+        data = self.claim(
+            {"status": "registered", "owner": "worker1", "limit": 1})
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(data["plans"][0]["status"], "registered")
+        self.assertEqual(data["lease"]["owner"], "worker1")
+
+        claimed_id = os.path.basename(data["plans"][0]["_links"]["self"])
+
+        # Plans already leased are skipped.
+        data = self.claim(
+            {"status": "registered", "owner": "worker2", "limit": 10})
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertNotEqual(
+            os.path.basename(data["plans"][0]["_links"]["self"]), claimed_id)
+
+        data = self.claim({"status": "registered", "owner": "worker3"})
+
+        self.assertEqual(data["plans"], [])
+
+        # Only the owner of the lease can edit the plan.
+        for owner in [None, "worker2"]:
+            response = self.client.patch("/plans/{}/{}".format(
+                    self.user2, claimed_id),
+                data=json.dumps({"status": "georeferenced"}),
+                content_type="application/json",
+                headers={"X-Lease-Owner": owner} if owner else {})
+
+            self.assertEqual(response.status_code, 409)
+
+        # Moving a plan on to the next status releases the lease.
+        response = self.client.patch("/plans/{}/{}".format(
+                self.user2, claimed_id),
+            data=json.dumps({"status": "georeferenced"}),
+            content_type="application/json",
+            headers={"X-Lease-Owner": "worker1"})
+
+        self.assertEqual(response.status_code, 200)
+
+        plan = PlanModel.query.get(uuid.UUID(claimed_id))
+
+        self.assertIsNone(plan.lease_owner)
+        self.assertIsNone(plan.lease_expiry)
+
+        data = self.claim({"status": "georeferenced", "owner": "worker4"})
+
+        self.assertEqual(len(data["plans"]), 1)
+
+
+    def test_claim_plans_expired_lease(self):
+        self.post_plans()
+
+        data = self.claim({"status": "uploaded", "owner": "worker1"})
+
+        self.assertEqual(len(data["plans"]), 1)
+
+        # Let the lease expire.
+        db.session.execute(db.update(PlanModel.__table__).values(
+            lease_expiry=datetime.datetime.utcnow() -
+                datetime.timedelta(seconds=1)))
+        db.session.commit()
+
+        data = self.claim({"status": "uploaded", "owner": "worker2"})
+
+        self.assertEqual(len(data["plans"]), 1)
+        self.assertEqual(
+            PlanModel.query.filter_by(status="uploaded").one().lease_owner,
+            "worker2")
+
+
+    def test_patch_leased_plans(self):
+        self.post_plans()
+
+        data = self.claim({"status": "uploaded", "owner": "worker1"})
+        plan_id = os.path.basename(data["plans"][0]["_links"]["self"])
+        edits = {"plans": [{
+            "id": plan_id, "user": self.user1, "layer_name": "layer1"}]}
+
+        for owner, status_code in [(None, 409), ("worker1", 200)]:
+            headers = {"X-Lease-Owner": owner} if owner else {}
+            response = self.client.patch("/plans/{}".format(self.user1),
+                data=json.dumps({"layer_name": "layer1"}),
+                content_type="application/json", headers=headers)
+
+            self.assertEqual(response.status_code, status_code)
+
+            response = self.client.patch("/plans",
+                data=json.dumps(edits),
+                content_type="application/json", headers=headers)
+
+            self.assertEqual(response.status_code, status_code)
+
+        plan = PlanModel.query.get(uuid.UUID(plan_id))
+
+        self.assertEqual(plan.layer_name, "layer1")
+        self.assertEqual(plan.lease_owner, "worker1")
+
+        # Plans leased, passed with another user, are not found.
+        plan_id2 = self.plan_ids(self.user2)[0]
+        response = self.client.patch("/plans",
+            data=json.dumps({"plans": [
+                {"id": plan_id, "user": self.user2, "layer_name": "layer2"},
+                {"id": plan_id2, "user": self.user2, "layer_name": "layer2"},
+            ]}),
+            content_type="application/json")
+        data = json.loads(response.data.decode("utf8"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["updated"], [plan_id2])
+        self.assertEqual(data["not_found"], [plan_id])
+        self.assertEqual(
+            PlanModel.query.get(uuid.UUID(plan_id)).layer_name, "layer1")
+
+
+    def test_claim_plans_unprocessable_entity(self):
+        response = self.client.post("/plans/claim",
+            data=json.dumps({"claim": {"status": "invalid", "limit": 0}}),
+            content_type="application/json")
+        data = response.data.decode("utf8")
+
+        self.assertEqual(response.status_code, 422, "{}: {}".format(
+            response.status_code, data))
+
+        data = json.loads(data)
+
+        self.assertEqual(set(data["message"]), {"status", "owner", "limit"})
+
+
     def test_post_bad_request(self):
         response = self.client.post("/plans")
         data = response.data.decode("utf8")
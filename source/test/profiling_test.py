@@ -0,0 +1,94 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+import uuid
+from nc_plan import create_app, db
+
+
+class ProfilingTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app.config["PROFILE_ENABLED"] = True
+        self.app.config["PROFILE_TOKEN"] = "secret"
+        self.app.config["PROFILE_DIRECTORY"] = tempfile.mkdtemp()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.app.config["PROFILE_DIRECTORY"])
+
+
+    def get_plans(self,
+            token="secret"):
+        return self.client.get("/plans/{}".format(self.user),
+            headers={"X-Profile": token})
+
+
+    def dumps(self):
+        return sorted(os.listdir(self.app.config["PROFILE_DIRECTORY"]))
+
+
+    def test_profile(self):
+        response = self.get_plans()
+
+        self.assertEqual(response.status_code, 200)
+
+        name = response.headers["X-Profile-Dump"]
+
+        self.assertEqual(self.dumps(), [name])
+        self.assertTrue("-api.plans-GET-" in name)
+        self.assertTrue("sql-" in name)
+
+        stats = pstats.Stats(
+            os.path.join(self.app.config["PROFILE_DIRECTORY"], name))
+
+        self.assertGreater(stats.total_calls, 0)
+
+
+    def test_profile_ring(self):
+        self.app.config["PROFILE_MAX_DUMPS"] = 2
+
+        names = [self.get_plans().headers["X-Profile-Dump"]
+            for _ in range(3)]
+
+        self.assertEqual(self.dumps(), names[1:])
+
+
+    def test_do_not_profile(self):
+        for token in ["guess", "gü€ss"]:
+            response = self.get_plans(token=token)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse("X-Profile-Dump" in response.headers)
+
+        self.app.config["PROFILE_ENABLED"] = False
+        response = self.get_plans()
+
+        self.assertFalse("X-Profile-Dump" in response.headers)
+        self.assertEqual(self.dumps(), [])
+
+
+    def test_profile_sample(self):
+        self.app.config["PROFILE_SAMPLE_RATE"] = 1.0
+
+        response = self.get_plans(token="")
+
+        self.assertTrue("X-Profile-Dump" in response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
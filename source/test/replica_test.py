@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db
+from nc_plan.configuration import TestConfiguration
+
+
+class ReplicaTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.replica_pathname = os.path.join(tempfile.gettempdir(),
+            "plan-test-replica.sqlite")
+        self.replica_uri = "sqlite:///" + self.replica_pathname
+        self.missing_replica_uri = "sqlite:///" + os.path.join(
+            tempfile.gettempdir(), "does_not_exist", "replica.sqlite")
+
+        self.user = uuid.uuid4()
+
+
+    def tearDown(self):
+        TestConfiguration.SQLALCHEMY_READ_REPLICA_URIS = []
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+        if os.path.exists(self.replica_pathname):
+            os.remove(self.replica_pathname)
+
+
+    def create_app(self,
+            replica_uris):
+        TestConfiguration.SQLALCHEMY_READ_REPLICA_URIS = replica_uris
+
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app.config["PLAN_CACHE_TYPE"] = "null"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+
+    def post_plan(self):
+        payload = {
+            "user": self.user,
+            "pathname": "/some_path/plan.png",
+            "status": "uploaded",
+        }
+        response = self.client.post("/plans",
+            data=json.dumps({"plan": payload}),
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+
+        return json.loads(response.data.decode("utf8"))["plan"]
+
+
+    def get_plans(self):
+        response = self.client.get("/plans/{}".format(self.user))
+
+        self.assertEqual(response.status_code, 200)
+
+        return json.loads(response.data.decode("utf8"))["plans"]
+
+
+    def test_route_reads_to_replica(self):
+        self.create_app([self.replica_uri])
+
+        replica = self.app.extensions["read_replicas"].engines[0]
+        db.metadata.create_all(bind=replica)
+
+        # Writes go to the primary database, which the (empty) replica
+        # does not follow.
+        plan = self.post_plan()
+
+        self.assertEqual(self.get_plans(), [])
+
+        response = self.client.get(plan["_links"]["self"])
+
+        self.assertEqual(response.status_code, 400)
+
+        # Patch reads and writes the primary database.
+        response = self.client.patch(plan["_links"]["self"],
+            data=json.dumps({"status": "registered"}),
+            content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+
+
+    def test_fail_over_to_primary(self):
+        self.create_app([self.missing_replica_uri])
+        self.post_plan()
+
+        self.assertEqual(len(self.get_plans()), 1)
+
+        state = self.app.extensions["read_replicas"]
+
+        self.assertEqual(state.next_engine(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import uuid
+from flask import json
+from nc_plan import create_app, db
+
+
+class SlowQueryTestCase(unittest.TestCase):
+
+
+    def setUp(self):
+        self.app = create_app("test")
+        self.app.config["TESTING"] = True
+        self.app.config["SERVER_NAME"] = "localhost"
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = uuid.uuid4()
+
+        # Log all statements.
+        self.app.config["SLOW_QUERY_THRESHOLD"] = 0
+
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+
+    def records(self,
+            logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+
+    def test_log_slow_query(self):
+        with self.assertLogs("nc_plan.slow_query") as logs:
+            self.client.get("/plans/{}?status=uploaded".format(self.user))
+
+        records = self.records(logs)
+        record = [record for record in records
+            if record["statement"].startswith("SELECT")][0]
+
+        self.assertEqual(record["event"], "slow_query")
+        self.assertEqual(record["origin"], "PlansResource.get")
+        self.assertGreaterEqual(record["duration"], 0)
+        self.assertFalse(record["executemany"])
+
+        # Values of parameters are not logged.
+        self.assertFalse(self.user.hex in json.dumps(record["parameters"]))
+        self.assertTrue(record["plan"])
+        self.assertTrue("ix_plan_model_user_status" in
+            json.dumps(record["plan"]))
+
+
+    def test_rate_limit(self):
+        self.app.config["SLOW_QUERY_LOG_LIMIT"] = 1
+
+        with self.assertLogs("nc_plan.slow_query") as logs:
+            self.client.get("/plans/{}".format(self.user))
+            self.client.get("/plans/{}".format(self.user))
+
+        self.assertEqual(len(logs.records), 1)
+
+
+    def test_failed_statement(self):
+        with db.engine.connect() as connection:
+            with self.assertRaises(Exception):
+                connection.execute("SELECT * FROM no_such_table")
+
+            # The start of the failed statement is not kept.
+            self.assertEqual(connection.info["slow_query_start"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
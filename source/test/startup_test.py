@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+# Time it may take to import the app and create it, in seconds
+startup_budget = float(os.environ.get("NC_PLAN_STARTUP_BUDGET") or 3)
+
+# Modules that are only needed to run commands, or in development
+startup_excluded_modules = ["alembic", "flask_migrate", "flask_debug"]
+
+startup_script = """
+import json, sys, time
+start = time.perf_counter()
+from nc_plan import create_app
+app = create_app("production")
+print(json.dumps({
+    "duration": time.perf_counter() - start,
+    "modules": sorted(name for name in sys.modules if "." not in name),
+}))
+"""
+
+
+class StartupTest(unittest.TestCase):
+
+    def start(self):
+        """Import and create the app in a new interpreter, and return
+        the time it took and the top-level modules imported"""
+        source_directory = os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))
+        environment = dict(os.environ, NC_CONFIGURATION="production",
+            NC_PLAN_DATABASE_URI="sqlite://",
+            NC_PLAN_CACHE_TYPE="null")
+        environment.pop("FLASK_RUN_FROM_CLI", None)
+        output = subprocess.check_output([sys.executable, "-c",
+            startup_script], cwd=source_directory, env=environment)
+
+        return json.loads(output.decode("utf8").splitlines()[-1])
+
+
+    def test_startup_within_budget(self):
+        result = self.start()
+
+        self.assertLess(result["duration"], startup_budget)
+
+
+    def test_startup_modules(self):
+        result = self.start()
+
+        for name in startup_excluded_modules:
+            self.assertNotIn(name, result["modules"])
+
+
+if __name__ == "__main__":
+    unittest.main()